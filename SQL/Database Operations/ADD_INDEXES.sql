@@ -27,3 +27,23 @@ CREATE INDEX IDX_SESSIONS_USER ON SESSIONS(USER_ID);
 -- Improves performance when removing expired sessions
 CREATE INDEX IDX_SESSIONS_EXPIRES ON SESSIONS(EXPIRES_AT);
 
+-- Matchmaking walks USERS in USER_ID order looking for the first eligible partner.
+-- When a renter has a preferred gender, this index lets MySQL read only users of that gender, already in USER_ID order,
+-- so the matchmaker stops after a handful of rows instead of filtering every user.
+CREATE INDEX IDX_USERS_GENDER ON USERS(GENDER, USER_ID);
+
+-- The properties search returns results a page at a time, ordered by rent and then by PROPERTY_ID so the order is stable.
+-- With this index MySQL reads each page straight from the index in sort order and continues after the last row of the previous page,
+-- instead of sorting every matching property for each page.
+CREATE INDEX IDX_RENT_ID ON PROPERTY(RENT_COST, PROPERTY_ID);
+
+-- A conversation is every message between the same two users, in either direction.
+-- USER_LO/USER_HI store the two user ids in a fixed order, so one index range holds the whole conversation in MSG_ID order.
+-- Loading a page of older messages (MSG_ID < before) or polling for new ones (MSG_ID > sinceMsgId) then reads only that page.
+CREATE INDEX IDX_MESSAGE_CONVERSATION ON MESSAGE(USER_LO, USER_HI, MSG_ID);
+
+-- A property's price history is always read by PROPERTY_ID within a range of PRICE_START:
+-- the price chart for a date range, the price in effect when that range starts, and the latest changes for trends.
+-- With this index each of those reads only that property's entries in that range, in time order.
+CREATE INDEX IDX_PRICE_HISTORY_PROPERTY_START ON PROP_PRICE_HISTORY(PROPERTY_ID, PRICE_START);
+
@@ -6,6 +6,24 @@ CREATE TABLE IF NOT EXISTS ADDRESS (
 	ZIPCODE CHAR(5) NOT NULL
 );
 
+CREATE TABLE IF NOT EXISTS CITY_ALIAS (
+  ALIAS VARCHAR(100) PRIMARY KEY,
+  CITY VARCHAR(100) NOT NULL
+);
+
+INSERT IGNORE INTO CITY_ALIAS (ALIAS, CITY) VALUES
+  ('S. Portland', 'South Portland'),
+  ('S Portland', 'South Portland'),
+  ('So. Portland', 'South Portland'),
+  ('So Portland', 'South Portland'),
+  ('S. Berwick', 'South Berwick'),
+  ('S. Thomaston', 'South Thomaston'),
+  ('E. Millinocket', 'East Millinocket'),
+  ('W. Paris', 'West Paris'),
+  ('St. Agatha', 'Saint Agatha'),
+  ('St Agatha', 'Saint Agatha'),
+  ('OOB', 'Old Orchard Beach');
+
 CREATE TABLE IF NOT EXISTS USERS (
 	USER_ID INT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
   USERNAME VARCHAR(50) NOT NULL UNIQUE,
@@ -70,6 +88,8 @@ CREATE TABLE IF NOT EXISTS MESSAGE (
 	TIME_STAMP TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
 	MESSAGE_TEXTS VARCHAR(1000) CHARACTER SET utf8mb4 NOT NULL,
 	IS_READ BOOL NOT NULL DEFAULT 0,
+	USER_LO INT UNSIGNED AS (LEAST(SENDER_ID, RECIPIENT_ID)) STORED,
+	USER_HI INT UNSIGNED AS (GREATEST(SENDER_ID, RECIPIENT_ID)) STORED,
 	FOREIGN KEY (SENDER_ID) 
   REFERENCES USERS(USER_ID)
   ON DELETE CASCADE ON UPDATE CASCADE,
@@ -77,6 +97,32 @@ CREATE TABLE IF NOT EXISTS MESSAGE (
   REFERENCES USERS(USER_ID)
   ON DELETE CASCADE ON UPDATE CASCADE
 );
+
+CREATE TABLE IF NOT EXISTS CONVERSATION (
+    USER_LO INT UNSIGNED NOT NULL,
+    USER_HI INT UNSIGNED NOT NULL,
+    LAST_MSG_ID INT UNSIGNED NOT NULL DEFAULT 0,
+    LAST_TIME_STAMP TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNREAD_LO INT UNSIGNED NOT NULL DEFAULT 0,
+    UNREAD_HI INT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (USER_LO, USER_HI),
+    INDEX IDX_CONVERSATION_LO_RECENT (USER_LO, LAST_MSG_ID),
+    INDEX IDX_CONVERSATION_HI_RECENT (USER_HI, LAST_MSG_ID),
+    FOREIGN KEY (USER_LO)
+        REFERENCES USERS (USER_ID)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (USER_HI)
+        REFERENCES USERS (USER_ID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS USER_UNREAD (
+    USER_ID INT UNSIGNED PRIMARY KEY,
+    UNREAD_COUNT INT UNSIGNED NOT NULL DEFAULT 0,
+    FOREIGN KEY (USER_ID)
+        REFERENCES USERS (USER_ID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
     
 
 CREATE TABLE IF NOT EXISTS NOTIFICATION (
@@ -101,6 +147,8 @@ CREATE TABLE IF NOT EXISTS PROPERTY (
 	PROPERTY_ID INT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
   RENT_COST INT UNSIGNED NOT NULL,
   PROPERTY_RATING FLOAT(2, 1),
+  RATING_SUM DECIMAL(12, 1) NOT NULL DEFAULT 0,
+  RATING_COUNT INT UNSIGNED NOT NULL DEFAULT 0,
   LANDLORD_ID INT UNSIGNED,
   SQFT INT UNSIGNED,
   BATHROOMS FLOAT(2, 1) UNSIGNED,
@@ -159,3 +207,42 @@ CREATE TABLE IF NOT EXISTS PROP_PRICE_HISTORY (
   FOREIGN KEY (PROPERTY_ID)
   REFERENCES PROPERTY (PROPERTY_ID)
 );
+
+CREATE TABLE IF NOT EXISTS PRICE_ROLLUP_MONTHLY (
+    MONTH_START DATE NOT NULL,
+    CITY VARCHAR(100) NOT NULL,
+    BEDROOMS TINYINT NOT NULL,
+    ENTRIES INT UNSIGNED NOT NULL DEFAULT 0,
+    RENT_SUM BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    RENT_MIN INT UNSIGNED NOT NULL,
+    RENT_MAX INT UNSIGNED NOT NULL,
+    PRIMARY KEY (CITY, BEDROOMS, MONTH_START)
+);
+
+CREATE TABLE IF NOT EXISTS CITY_RENT_STATS (
+    CITY VARCHAR(100) PRIMARY KEY,              -- city the average is for
+    AVAILABLE_UNITS INT UNSIGNED NOT NULL,      -- number of available units (CAN_RENT = 0)
+    AVG_RENT DECIMAL(14,4) NOT NULL,            -- average rent of the available units
+    REFRESHED_AT TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS BEST_DEALS (
+    PROPERTY_ID INT UNSIGNED PRIMARY KEY,
+    UNIT_LABEL VARCHAR(50),
+    RENT_COST INT UNSIGNED NOT NULL,
+    BEDROOMS FLOAT(2, 1) UNSIGNED,
+    BATHROOMS FLOAT(2, 1) UNSIGNED,
+    CAN_RENT BOOL NOT NULL,
+    SQFT INT UNSIGNED,
+    CITY VARCHAR(100) NOT NULL,
+    STATE_CODE CHAR(2) NOT NULL,
+    city_avg_rent DECIMAL(14,4) NOT NULL,       -- average rent in this city
+    rent_pct_of_city_avg DECIMAL(10,0) NOT NULL, -- this unit's rent as a percentage of the city average
+    -- deals for one city, best first
+    INDEX IDX_DEALS_CITY_PCT (CITY, rent_pct_of_city_avg, RENT_COST),
+    -- deals across all cities, best first
+    INDEX IDX_DEALS_PCT (rent_pct_of_city_avg, RENT_COST),
+    FOREIGN KEY (PROPERTY_ID)
+        REFERENCES PROPERTY (PROPERTY_ID)
+        ON DELETE CASCADE
+);
@@ -0,0 +1,24 @@
+-- TITLE: ADD_PRICE_ROLLUP
+-- Adds each new PROP_PRICE_HISTORY entry to its month, city and bedroom count in
+-- PRICE_ROLLUP_MONTHLY, so the monthly rollup never has to be rebuilt from the full history.
+
+CREATE TRIGGER ADD_PRICE_ROLLUP
+AFTER INSERT ON PROP_PRICE_HISTORY
+FOR EACH ROW
+INSERT INTO PRICE_ROLLUP_MONTHLY (MONTH_START, CITY, BEDROOMS, ENTRIES, RENT_SUM, RENT_MIN, RENT_MAX)
+SELECT
+    DATE_FORMAT(NEW.PRICE_START, '%Y-%m-01'),
+    A.CITY,
+    COALESCE(FLOOR(P.BEDROOMS), -1),
+    1,
+    NEW.RENT_COST,
+    NEW.RENT_COST,
+    NEW.RENT_COST
+FROM PROPERTY AS P
+JOIN ADDRESS AS A ON A.ADDR_ID = P.ADDR_ID
+WHERE P.PROPERTY_ID = NEW.PROPERTY_ID
+ON DUPLICATE KEY UPDATE
+    ENTRIES = ENTRIES + 1,
+    RENT_SUM = RENT_SUM + VALUES(RENT_SUM),
+    RENT_MIN = LEAST(RENT_MIN, VALUES(RENT_MIN)),
+    RENT_MAX = GREATEST(RENT_MAX, VALUES(RENT_MAX));
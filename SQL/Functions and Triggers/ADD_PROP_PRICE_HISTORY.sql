@@ -1,7 +1,11 @@
 -- NAME: ADD_PROP_PRICE_HISTORY.sql
 -- AUTHOR: Jeffrey Fosgate
 -- COMMIT DATE: December 6, 2025
--- DESCRIPTION: A simple SQL trigger that adds a new listing to the PROP_PRICE_HISTORY table whenever a property is updated.                
+-- DESCRIPTION: A simple SQL trigger that adds a new listing to the PROP_PRICE_HISTORY table whenever a property's rent changes.
+-- Updates that leave RENT_COST alone (availability toggles, rating changes, edits to other columns)
+-- add nothing, so the history grows with real price changes rather than with write traffic.
+-- The starting price is recorded by ADD_PROP_START_PRICE, or here on the first change for a
+-- property that has no history yet.
 
 DELIMITER //
 
@@ -10,8 +14,16 @@ BEFORE UPDATE
 ON PROPERTY
 FOR EACH ROW
 BEGIN
-    INSERT INTO PROP_PRICE_HISTORY (PROPERTY_ID, RENT_COST)
-    VALUES (NEW.PROPERTY_ID, NEW.RENT_COST); -- Duplicate listings are not allowed on MySQL by default, so this will have no effect if the property's price isn't updated.
+    IF NEW.RENT_COST <> OLD.RENT_COST THEN
+        -- a property listed before ADD_PROP_START_PRICE may have no history; record the price it
+        -- is changing from first so the change has something to compare against
+        IF NOT EXISTS (SELECT 1 FROM PROP_PRICE_HISTORY WHERE PROPERTY_ID = OLD.PROPERTY_ID) THEN
+            INSERT INTO PROP_PRICE_HISTORY (PROPERTY_ID, RENT_COST)
+            VALUES (OLD.PROPERTY_ID, OLD.RENT_COST);
+        END IF;
+        INSERT INTO PROP_PRICE_HISTORY (PROPERTY_ID, RENT_COST)
+        VALUES (NEW.PROPERTY_ID, NEW.RENT_COST);
+    END IF;
 END //
 
 DELIMITER ;
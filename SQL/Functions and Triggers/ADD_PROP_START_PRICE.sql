@@ -0,0 +1,10 @@
+-- TITLE: ADD_PROP_START_PRICE
+-- Records the rent a property is listed at as its first PROP_PRICE_HISTORY entry.
+-- ADD_PROP_PRICE_HISTORY only records rent changes, so without this entry the price before a
+-- property's first change would be lost and its trend could not be computed.
+
+CREATE TRIGGER ADD_PROP_START_PRICE
+AFTER INSERT ON PROPERTY
+FOR EACH ROW
+INSERT INTO PROP_PRICE_HISTORY (PROPERTY_ID, RENT_COST)
+VALUES (NEW.PROPERTY_ID, NEW.RENT_COST);
@@ -1,15 +1,56 @@
 -- TITLE: UPDATE_PROPERTY_RATING
 -- AUTHOR: Sophia Priola 
--- Whenever a new review is inserted, this trigger recalculates the avg star rating
--- and updates the property rating 
+-- Keeps PROPERTY.RATING_SUM / RATING_COUNT in step with REVIEW and derives PROPERTY_RATING from them
+-- Each trigger applies only the change made by one review row, so saving a review costs the same
+-- no matter how many reviews the property already has (no AVG(STARS) over all of them).
+-- Inserts, updates (including the ON DUPLICATE KEY UPDATE in the backend's review endpoint) and
+-- deletes are all covered. REBUILD_PROPERTY_RATINGS recomputes the totals from scratch.
+-- MySQL applies single-table UPDATE assignments left to right, so PROPERTY_RATING sees the new totals.
 
 CREATE TRIGGER UPDATE_PROPERTY_RATING
 AFTER INSERT ON REVIEW
 FOR EACH ROW        -- Execute once for each inserted review row
 UPDATE PROPERTY
-SET PROPERTY_RATING = (        -- Recompute the properties avg rating 
-    SELECT AVG(STARS)
-    FROM REVIEW
-    WHERE PROPERTY_ID = NEW.PROPERTY_ID
-)
+SET RATING_SUM = RATING_SUM + NEW.STARS,
+    RATING_COUNT = RATING_COUNT + 1,
+    PROPERTY_RATING = RATING_SUM / RATING_COUNT
 WHERE PROPERTY_ID = NEW.PROPERTY_ID;    -- update the matching PROPERTY row
+
+DELIMITER //
+
+CREATE TRIGGER UPDATE_PROPERTY_RATING_ON_CHANGE
+AFTER UPDATE ON REVIEW
+FOR EACH ROW
+BEGIN
+    IF OLD.PROPERTY_ID = NEW.PROPERTY_ID THEN
+        -- the usual case: the stars of an existing review changed
+        UPDATE PROPERTY
+        SET RATING_SUM = RATING_SUM - OLD.STARS + NEW.STARS,
+            PROPERTY_RATING = RATING_SUM / RATING_COUNT
+        WHERE PROPERTY_ID = NEW.PROPERTY_ID;
+    ELSE
+        -- the review moved to another property
+        UPDATE PROPERTY
+        SET RATING_SUM = RATING_SUM - OLD.STARS,
+            RATING_COUNT = RATING_COUNT - 1,
+            PROPERTY_RATING = IF(RATING_COUNT = 0, NULL, RATING_SUM / RATING_COUNT)
+        WHERE PROPERTY_ID = OLD.PROPERTY_ID;
+
+        UPDATE PROPERTY
+        SET RATING_SUM = RATING_SUM + NEW.STARS,
+            RATING_COUNT = RATING_COUNT + 1,
+            PROPERTY_RATING = RATING_SUM / RATING_COUNT
+        WHERE PROPERTY_ID = NEW.PROPERTY_ID;
+    END IF;
+END //
+
+DELIMITER ;
+
+CREATE TRIGGER UPDATE_PROPERTY_RATING_ON_DELETE
+AFTER DELETE ON REVIEW
+FOR EACH ROW
+UPDATE PROPERTY
+SET RATING_SUM = RATING_SUM - OLD.STARS,
+    RATING_COUNT = RATING_COUNT - 1,
+    PROPERTY_RATING = IF(RATING_COUNT = 0, NULL, RATING_SUM / RATING_COUNT)   -- no reviews left
+WHERE PROPERTY_ID = OLD.PROPERTY_ID;
@@ -2,6 +2,7 @@
 -- AUTHOR: Ashley Pike
 -- Takes the input values and checks if the address is new and if so inserts into address table
 -- Checks if property is new and if so inserts into properties table
+-- City aliases (e.g. 'S. Portland') are stored under their canonical name from CITY_ALIAS
 
 DELIMITER $$
 
@@ -20,12 +21,22 @@ CREATE PROCEDURE ADD_PROPERTY (
 BEGIN
     DECLARE V_ADDR_ID INT;
     DECLARE P_PROPERTY_ID INT;
+    DECLARE V_CITY VARCHAR(100);
+
+    -- Use the canonical city name if P_CITY is a known alias
+    SELECT CITY INTO V_CITY
+    FROM CITY_ALIAS
+    WHERE ALIAS = TRIM(P_CITY);
+
+    IF V_CITY IS NULL THEN
+        SET V_CITY = TRIM(P_CITY);
+    END IF;
 
     -- Check if the address exists
     SELECT ADDR_ID INTO V_ADDR_ID
     FROM ADDRESS
     WHERE STREET = P_STREET
-      AND CITY = P_CITY
+      AND CITY = V_CITY
       AND STATE_CODE = P_STATE_CODE
       AND ZIPCODE = P_ZIP
     LIMIT 1;
@@ -33,7 +44,7 @@ BEGIN
     -- If not, insert a new address
     IF V_ADDR_ID IS NULL THEN
         INSERT INTO ADDRESS (STREET, CITY, STATE_CODE, ZIPCODE)
-        VALUES (P_STREET, P_CITY, P_STATE_CODE, P_ZIP);
+        VALUES (P_STREET, V_CITY, P_STATE_CODE, P_ZIP);
         SET V_ADDR_ID = LAST_INSERT_ID();
     END IF;
 
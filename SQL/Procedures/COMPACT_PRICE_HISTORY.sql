@@ -0,0 +1,42 @@
+-- TITLE: COMPACT_PRICE_HISTORY
+-- Shrinks history older than P_BEFORE to one entry per property per month: the last price
+-- recorded that month. Each property's first entry (its starting price) is kept as well, so a
+-- change made in the month it was listed still has a previous price. Recent history is left
+-- untouched, and the monthly city averages in PRICE_ROLLUP_MONTHLY are already counted, so they
+-- do not change.
+-- Run it by hand, e.g. CALL COMPACT_PRICE_HISTORY(NOW() - INTERVAL 2 YEAR);
+-- or schedule it with the MySQL event scheduler:
+--     CREATE EVENT COMPACT_PRICE_HISTORY_MONTHLY
+--     ON SCHEDULE EVERY 1 MONTH
+--     DO CALL COMPACT_PRICE_HISTORY(NOW() - INTERVAL 2 YEAR);
+
+DELIMITER $$
+
+CREATE PROCEDURE COMPACT_PRICE_HISTORY (
+    IN P_BEFORE DATETIME
+)
+BEGIN
+    -- reads only the old part of each property's history through IDX_PRICE_HISTORY_PROPERTY_START
+    DELETE H
+    FROM PROP_PRICE_HISTORY AS H
+    JOIN (
+        SELECT
+            ENTRY_ID,
+            ROW_NUMBER() OVER (
+                PARTITION BY PROPERTY_ID, DATE_FORMAT(PRICE_START, '%Y-%m-01')
+                ORDER BY PRICE_START DESC, ENTRY_ID DESC
+            ) AS RN,
+            -- every earlier entry is older still, so the first one read here is the property's first
+            ROW_NUMBER() OVER (
+                PARTITION BY PROPERTY_ID
+                ORDER BY PRICE_START, ENTRY_ID
+            ) AS FIRST_RN
+        FROM PROP_PRICE_HISTORY
+        WHERE PRICE_START < P_BEFORE
+    ) AS OLD_ENTRIES
+      ON OLD_ENTRIES.ENTRY_ID = H.ENTRY_ID
+    WHERE OLD_ENTRIES.RN > 1
+      AND OLD_ENTRIES.FIRST_RN > 1;
+END$$
+
+DELIMITER ;
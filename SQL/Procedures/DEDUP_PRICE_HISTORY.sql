@@ -0,0 +1,45 @@
+-- TITLE: DEDUP_PRICE_HISTORY
+-- Removes history entries that repeat the property's previous price. Before ADD_PROP_PRICE_HISTORY
+-- checked for a rent change, every PROPERTY update added an entry, so old history is full of
+-- runs of the same price; only the first entry of each run is kept, so a property's first entry
+-- (its starting price) always stays.
+-- Works through P_BATCH property ids per statement so no single DELETE holds locks for long:
+--     CALL DEDUP_PRICE_HISTORY(10000);
+-- PRICE_ROLLUP_MONTHLY is not changed; the duplicates it already counted stay counted.
+
+DELIMITER $$
+
+CREATE PROCEDURE DEDUP_PRICE_HISTORY (
+    IN P_BATCH INT UNSIGNED
+)
+BEGIN
+    DECLARE V_FROM INT UNSIGNED DEFAULT 0;
+    DECLARE V_MAX INT UNSIGNED;
+
+    -- a batch of 0 (or NULL) would never advance V_FROM
+    IF P_BATCH IS NULL OR P_BATCH = 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'DEDUP_PRICE_HISTORY: P_BATCH must be at least 1';
+    END IF;
+
+    SELECT COALESCE(MAX(PROPERTY_ID), 0) INTO V_MAX FROM PROP_PRICE_HISTORY;
+
+    WHILE V_FROM <= V_MAX DO
+        -- LAG reads each property's entries in time order from IDX_PRICE_HISTORY_PROPERTY_START
+        DELETE H
+        FROM PROP_PRICE_HISTORY AS H
+        JOIN (
+            SELECT
+                ENTRY_ID,
+                RENT_COST,
+                LAG(RENT_COST) OVER (PARTITION BY PROPERTY_ID ORDER BY PRICE_START, ENTRY_ID) AS PREVIOUS_COST
+            FROM PROP_PRICE_HISTORY
+            WHERE PROPERTY_ID >= V_FROM AND PROPERTY_ID < V_FROM + P_BATCH
+        ) AS ENTRIES
+          ON ENTRIES.ENTRY_ID = H.ENTRY_ID
+        WHERE ENTRIES.PREVIOUS_COST = ENTRIES.RENT_COST;
+
+        SET V_FROM = V_FROM + P_BATCH;
+    END WHILE;
+END$$
+
+DELIMITER ;
@@ -26,10 +26,11 @@ BEGIN
         P.CAN_RENT,
         A.CITY,
         A.STATE_CODE,
-        A.ZIP_CODE,
+        A.ZIPCODE,
 
-        -- We also want to display the average rating of the property 
-        GET_AVG_RATING(P.PROPERTY_ID) AS AVG_RATING,
+        -- We also want to display the average rating of the property,
+        -- kept up to date in PROPERTY_RATING by the UPDATE_PROPERTY_RATING trigger
+        P.PROPERTY_RATING AS AVG_RATING,
         -- landlord contact information, may be NULL for scraped properties
         U.DISPLAY_NAME AS LANDLORD_NAME,
         U.EMAIL        AS LANDLORD_EMAIL,
@@ -41,10 +42,9 @@ BEGIN
 
     -- Use LEFT JOIN so scraped properties with no landlord still appear,
     -- but landlord fields are NULL
-    LEFT JOIN LANDLORD AS L
-      ON P.LANDLORD_ID = L.LANDLORD_ID
+    -- PROPERTY.LANDLORD_ID is the landlord's USER_ID
     LEFT JOIN USERS AS U
-      ON L.USER_ID = U.USER_ID
+      ON P.LANDLORD_ID = U.USER_ID
 
     WHERE P.PROPERTY_ID = p_property_id;
 END$$
@@ -0,0 +1,23 @@
+-- TITLE: REBUILD_PROPERTY_RATINGS
+-- Recomputes RATING_SUM, RATING_COUNT and PROPERTY_RATING for every property from REVIEW
+-- in one pass. Run it once after adding the rating columns to an existing database, or to
+-- repair the totals if reviews were changed with the triggers disabled:
+--     CALL REBUILD_PROPERTY_RATINGS();
+
+DELIMITER $$
+
+CREATE PROCEDURE REBUILD_PROPERTY_RATINGS ()
+BEGIN
+    UPDATE PROPERTY AS P
+    LEFT JOIN (
+        SELECT PROPERTY_ID, SUM(STARS) AS STARS_SUM, COUNT(*) AS REVIEWS
+        FROM REVIEW
+        GROUP BY PROPERTY_ID
+    ) AS R
+      ON R.PROPERTY_ID = P.PROPERTY_ID
+    SET P.RATING_SUM = COALESCE(R.STARS_SUM, 0),
+        P.RATING_COUNT = COALESCE(R.REVIEWS, 0),
+        P.PROPERTY_RATING = R.STARS_SUM / R.REVIEWS;     -- NULL when there are no reviews
+END$$
+
+DELIMITER ;
@@ -0,0 +1,79 @@
+-- TITLE: REFRESH_CITY_DEALS / REFRESH_ALL_DEALS
+-- Keep CITY_RENT_STATS and BEST_DEALS (Schema/BEST_DEALS.sql) in step with PROPERTY
+-- REFRESH_CITY_DEALS recomputes one city and is called by the backend whenever a property
+-- is added or its rent or availability changes; only that city's average can move.
+-- REFRESH_ALL_DEALS rebuilds every city and is called after a bulk import.
+-- Neither starts a transaction, so the refresh commits together with the caller's change.
+
+DELIMITER $$
+
+CREATE PROCEDURE REFRESH_CITY_DEALS (
+    IN P_CITY VARCHAR(100)
+)
+BEGIN
+    -- average rent of the available units in this city (uses IDX_CITY)
+    DELETE FROM CITY_RENT_STATS WHERE CITY = P_CITY;
+
+    INSERT INTO CITY_RENT_STATS (CITY, AVAILABLE_UNITS, AVG_RENT)
+    SELECT A.CITY, COUNT(*), AVG(P.RENT_COST)
+    FROM PROPERTY AS P
+    JOIN ADDRESS AS A
+      ON P.ADDR_ID = A.ADDR_ID
+    WHERE A.CITY = P_CITY
+      AND P.CAN_RENT = 0
+    GROUP BY A.CITY;
+
+    -- the units in this city that are under the new average
+    DELETE FROM BEST_DEALS WHERE CITY = P_CITY;
+
+    INSERT INTO BEST_DEALS (
+        PROPERTY_ID, UNIT_LABEL, RENT_COST, BEDROOMS, BATHROOMS, CAN_RENT, SQFT,
+        CITY, STATE_CODE, city_avg_rent, rent_pct_of_city_avg
+    )
+    SELECT
+        P.PROPERTY_ID, P.UNIT_LABEL, P.RENT_COST, P.BEDROOMS, P.BATHROOMS, P.CAN_RENT, P.SQFT,
+        A.CITY, A.STATE_CODE,
+        S.AVG_RENT,
+        ROUND((P.RENT_COST / S.AVG_RENT) * 100, 0)
+    FROM PROPERTY AS P
+    JOIN ADDRESS AS A
+      ON P.ADDR_ID = A.ADDR_ID
+    JOIN CITY_RENT_STATS AS S
+      ON S.CITY = A.CITY
+    WHERE A.CITY = P_CITY
+      AND P.CAN_RENT = 0
+      AND P.RENT_COST < S.AVG_RENT;
+END$$
+
+CREATE PROCEDURE REFRESH_ALL_DEALS ()
+BEGIN
+    DELETE FROM BEST_DEALS;
+    DELETE FROM CITY_RENT_STATS;
+
+    INSERT INTO CITY_RENT_STATS (CITY, AVAILABLE_UNITS, AVG_RENT)
+    SELECT A.CITY, COUNT(*), AVG(P.RENT_COST)
+    FROM PROPERTY AS P
+    JOIN ADDRESS AS A
+      ON P.ADDR_ID = A.ADDR_ID
+    WHERE P.CAN_RENT = 0
+    GROUP BY A.CITY;
+
+    INSERT INTO BEST_DEALS (
+        PROPERTY_ID, UNIT_LABEL, RENT_COST, BEDROOMS, BATHROOMS, CAN_RENT, SQFT,
+        CITY, STATE_CODE, city_avg_rent, rent_pct_of_city_avg
+    )
+    SELECT
+        P.PROPERTY_ID, P.UNIT_LABEL, P.RENT_COST, P.BEDROOMS, P.BATHROOMS, P.CAN_RENT, P.SQFT,
+        A.CITY, A.STATE_CODE,
+        S.AVG_RENT,
+        ROUND((P.RENT_COST / S.AVG_RENT) * 100, 0)
+    FROM PROPERTY AS P
+    JOIN ADDRESS AS A
+      ON P.ADDR_ID = A.ADDR_ID
+    JOIN CITY_RENT_STATS AS S
+      ON S.CITY = A.CITY
+    WHERE P.CAN_RENT = 0
+      AND P.RENT_COST < S.AVG_RENT;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,68 @@
+-- TITLE: BEST_DEALS.sql
+-- Materialized form of the BEST_DEAL_PROPERTIES view (see Queries/BEST_DEAL_PROPS.sql)
+-- CITY_RENT_STATS holds the average rent of available units per city and BEST_DEALS holds
+-- every available unit priced under its city's average. Both are kept up to date by
+-- REFRESH_CITY_DEALS / REFRESH_ALL_DEALS, so "Find me deals!" reads an index range
+-- instead of recomputing the per-city averages over PROPERTY and ADDRESS on every call
+
+CREATE TABLE IF NOT EXISTS CITY_RENT_STATS (
+    CITY VARCHAR(100) PRIMARY KEY,              -- city the average is for
+    AVAILABLE_UNITS INT UNSIGNED NOT NULL,      -- number of available units (CAN_RENT = 0)
+    AVG_RENT DECIMAL(14,4) NOT NULL,            -- average rent of the available units
+    REFRESHED_AT TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS BEST_DEALS (
+    PROPERTY_ID INT UNSIGNED PRIMARY KEY,
+    UNIT_LABEL VARCHAR(50),
+    RENT_COST INT UNSIGNED NOT NULL,
+    BEDROOMS FLOAT(2, 1) UNSIGNED,
+    BATHROOMS FLOAT(2, 1) UNSIGNED,
+    CAN_RENT BOOL NOT NULL,
+    SQFT INT UNSIGNED,
+    CITY VARCHAR(100) NOT NULL,
+    STATE_CODE CHAR(2) NOT NULL,
+    city_avg_rent DECIMAL(14,4) NOT NULL,       -- average rent in this city
+    rent_pct_of_city_avg DECIMAL(10,0) NOT NULL, -- this unit's rent as a percentage of the city average
+    -- deals for one city, best first
+    INDEX IDX_DEALS_CITY_PCT (CITY, rent_pct_of_city_avg, RENT_COST),
+    -- deals across all cities, best first
+    INDEX IDX_DEALS_PCT (rent_pct_of_city_avg, RENT_COST),
+    FOREIGN KEY (PROPERTY_ID)
+        REFERENCES PROPERTY (PROPERTY_ID)
+        ON DELETE CASCADE
+);
+
+-- Builds both tables from the listings added before they existed (the same statements as
+-- REFRESH_ALL_DEALS, which may not be created yet when this runs)
+INSERT INTO CITY_RENT_STATS (CITY, AVAILABLE_UNITS, AVG_RENT)
+SELECT A.CITY, COUNT(*), AVG(P.RENT_COST)
+FROM PROPERTY AS P
+JOIN ADDRESS AS A
+  ON P.ADDR_ID = A.ADDR_ID
+WHERE P.CAN_RENT = 0
+GROUP BY A.CITY
+ON DUPLICATE KEY UPDATE
+    AVAILABLE_UNITS = VALUES(AVAILABLE_UNITS),
+    AVG_RENT = VALUES(AVG_RENT);
+
+INSERT INTO BEST_DEALS (
+    PROPERTY_ID, UNIT_LABEL, RENT_COST, BEDROOMS, BATHROOMS, CAN_RENT, SQFT,
+    CITY, STATE_CODE, city_avg_rent, rent_pct_of_city_avg
+)
+SELECT
+    P.PROPERTY_ID, P.UNIT_LABEL, P.RENT_COST, P.BEDROOMS, P.BATHROOMS, P.CAN_RENT, P.SQFT,
+    A.CITY, A.STATE_CODE,
+    S.AVG_RENT,
+    ROUND((P.RENT_COST / S.AVG_RENT) * 100, 0)
+FROM PROPERTY AS P
+JOIN ADDRESS AS A
+  ON P.ADDR_ID = A.ADDR_ID
+JOIN CITY_RENT_STATS AS S
+  ON S.CITY = A.CITY
+WHERE P.CAN_RENT = 0
+  AND P.RENT_COST < S.AVG_RENT
+ON DUPLICATE KEY UPDATE
+    RENT_COST = VALUES(RENT_COST),
+    city_avg_rent = VALUES(city_avg_rent),
+    rent_pct_of_city_avg = VALUES(rent_pct_of_city_avg);
@@ -0,0 +1,26 @@
+-- Maps alternate spellings of a city to its canonical name (e.g. 'S. Portland' -> 'South Portland')
+-- ADD_PROPERTY and the backend store the canonical name in ADDRESS.CITY, so city searches
+-- can use an exact or prefix match on IDX_CITY instead of LIKE '%city%'
+-- The utf8mb4_0900_ai_ci collation makes ALIAS lookups case-insensitive
+CREATE TABLE IF NOT EXISTS CITY_ALIAS (
+    ALIAS VARCHAR(100) PRIMARY KEY,
+    CITY VARCHAR(100) NOT NULL
+);
+
+INSERT IGNORE INTO CITY_ALIAS (ALIAS, CITY) VALUES
+    ('S. Portland', 'South Portland'),
+    ('S Portland', 'South Portland'),
+    ('So. Portland', 'South Portland'),
+    ('So Portland', 'South Portland'),
+    ('S. Berwick', 'South Berwick'),
+    ('S. Thomaston', 'South Thomaston'),
+    ('E. Millinocket', 'East Millinocket'),
+    ('W. Paris', 'West Paris'),
+    ('St. Agatha', 'Saint Agatha'),
+    ('St Agatha', 'Saint Agatha'),
+    ('OOB', 'Old Orchard Beach');
+
+-- Rewrites addresses that were stored under an alias before this table existed
+UPDATE ADDRESS AS A
+JOIN CITY_ALIAS AS C ON A.CITY = C.ALIAS
+SET A.CITY = C.CITY;
@@ -0,0 +1,54 @@
+-- One row per pair of users who have messaged each other, kept up to date by the backend
+-- when a message is sent or read, so the inbox never has to group the MESSAGE table.
+-- USER_LO/USER_HI are the smaller and larger user id, matching MESSAGE.USER_LO/USER_HI.
+CREATE TABLE IF NOT EXISTS CONVERSATION (
+    USER_LO INT UNSIGNED NOT NULL,
+    USER_HI INT UNSIGNED NOT NULL,
+    LAST_MSG_ID INT UNSIGNED NOT NULL DEFAULT 0,            -- newest message in the conversation
+    LAST_TIME_STAMP TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,   -- when it was sent
+    UNREAD_LO INT UNSIGNED NOT NULL DEFAULT 0,              -- messages USER_LO has not read
+    UNREAD_HI INT UNSIGNED NOT NULL DEFAULT 0,              -- messages USER_HI has not read
+    PRIMARY KEY (USER_LO, USER_HI),
+    -- a user's conversations, most recent first, whichever side of the pair they are on
+    INDEX IDX_CONVERSATION_LO_RECENT (USER_LO, LAST_MSG_ID),
+    INDEX IDX_CONVERSATION_HI_RECENT (USER_HI, LAST_MSG_ID),
+    FOREIGN KEY (USER_LO)
+        REFERENCES USERS (USER_ID)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (USER_HI)
+        REFERENCES USERS (USER_ID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Each user's total unread messages across all conversations, so the unread badge is one primary key read
+CREATE TABLE IF NOT EXISTS USER_UNREAD (
+    USER_ID INT UNSIGNED PRIMARY KEY,
+    UNREAD_COUNT INT UNSIGNED NOT NULL DEFAULT 0,
+    FOREIGN KEY (USER_ID)
+        REFERENCES USERS (USER_ID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Builds both tables from the messages sent before they existed
+INSERT INTO CONVERSATION (USER_LO, USER_HI, LAST_MSG_ID, LAST_TIME_STAMP, UNREAD_LO, UNREAD_HI)
+SELECT
+    M.USER_LO,
+    M.USER_HI,
+    MAX(M.MSG_ID),
+    MAX(M.TIME_STAMP),
+    SUM(M.IS_READ = 0 AND M.RECIPIENT_ID = M.USER_LO AND M.SENDER_ID <> M.RECIPIENT_ID),
+    SUM(M.IS_READ = 0 AND M.RECIPIENT_ID = M.USER_HI AND M.SENDER_ID <> M.RECIPIENT_ID)
+FROM MESSAGE AS M
+GROUP BY M.USER_LO, M.USER_HI
+ON DUPLICATE KEY UPDATE
+    LAST_MSG_ID = VALUES(LAST_MSG_ID),
+    LAST_TIME_STAMP = VALUES(LAST_TIME_STAMP),
+    UNREAD_LO = VALUES(UNREAD_LO),
+    UNREAD_HI = VALUES(UNREAD_HI);
+
+INSERT INTO USER_UNREAD (USER_ID, UNREAD_COUNT)
+SELECT M.RECIPIENT_ID, COUNT(*)
+FROM MESSAGE AS M
+WHERE M.IS_READ = 0 AND M.SENDER_ID <> M.RECIPIENT_ID
+GROUP BY M.RECIPIENT_ID
+ON DUPLICATE KEY UPDATE UNREAD_COUNT = VALUES(UNREAD_COUNT);
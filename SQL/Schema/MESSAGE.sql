@@ -9,6 +9,9 @@ CREATE TABLE IF NOT EXISTS MESSAGE (
 	TIME_STAMP TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,	-- Timestamp for when message sent
 	MESSAGE_TEXTS VARCHAR(1000) CHARACTER SET utf8mb4 NOT NULL,	-- Text within the message 
 	IS_READ TINYINT(1) NOT NULL DEFAULT 0,	-- If message read 1, if not 0
+	-- The two participants in a fixed order, so both directions of a conversation share one key
+	USER_LO INT UNSIGNED AS (LEAST(SENDER_ID, RECIPIENT_ID)) STORED,
+	USER_HI INT UNSIGNED AS (GREATEST(SENDER_ID, RECIPIENT_ID)) STORED,
 	-- SENDER_ID and RECIPIENT_ID foreign from USER
 	FOREIGN KEY (SENDER_ID) 
 		REFERENCES USERS(USER_ID)
@@ -17,3 +20,8 @@ CREATE TABLE IF NOT EXISTS MESSAGE (
 		REFERENCES USERS(USER_ID)
 		ON DELETE CASCADE ON UPDATE CASCADE
 );
+
+-- For a MESSAGE table created before USER_LO/USER_HI existed, run once:
+-- ALTER TABLE MESSAGE
+-- 	ADD COLUMN USER_LO INT UNSIGNED AS (LEAST(SENDER_ID, RECIPIENT_ID)) STORED,
+-- 	ADD COLUMN USER_HI INT UNSIGNED AS (GREATEST(SENDER_ID, RECIPIENT_ID)) STORED;
@@ -0,0 +1,35 @@
+-- Monthly summary of the rents recorded in PROP_PRICE_HISTORY, per city and bedroom count,
+-- so city price charts read one row per month instead of every history entry.
+-- The ADD_PRICE_ROLLUP trigger adds each new history entry to its month as it is written.
+-- BEDROOMS is the whole number of bedrooms (0 = studio) and -1 when it is unknown.
+CREATE TABLE IF NOT EXISTS PRICE_ROLLUP_MONTHLY (
+    MONTH_START DATE NOT NULL,                  -- first day of the month
+    CITY VARCHAR(100) NOT NULL,
+    BEDROOMS TINYINT NOT NULL,
+    ENTRIES INT UNSIGNED NOT NULL DEFAULT 0,    -- history entries recorded in the month
+    RENT_SUM BIGINT UNSIGNED NOT NULL DEFAULT 0,    -- RENT_SUM / ENTRIES is the average rent
+    RENT_MIN INT UNSIGNED NOT NULL,
+    RENT_MAX INT UNSIGNED NOT NULL,
+    -- one city's months in order, for charts
+    PRIMARY KEY (CITY, BEDROOMS, MONTH_START)
+);
+
+-- Builds the rollup from the history recorded before this table existed
+INSERT INTO PRICE_ROLLUP_MONTHLY (MONTH_START, CITY, BEDROOMS, ENTRIES, RENT_SUM, RENT_MIN, RENT_MAX)
+SELECT
+    DATE_FORMAT(H.PRICE_START, '%Y-%m-01'),
+    A.CITY,
+    COALESCE(FLOOR(P.BEDROOMS), -1),
+    COUNT(*),
+    SUM(H.RENT_COST),
+    MIN(H.RENT_COST),
+    MAX(H.RENT_COST)
+FROM PROP_PRICE_HISTORY AS H
+JOIN PROPERTY AS P ON P.PROPERTY_ID = H.PROPERTY_ID
+JOIN ADDRESS AS A ON A.ADDR_ID = P.ADDR_ID
+GROUP BY DATE_FORMAT(H.PRICE_START, '%Y-%m-01'), A.CITY, COALESCE(FLOOR(P.BEDROOMS), -1)
+ON DUPLICATE KEY UPDATE
+    ENTRIES = VALUES(ENTRIES),
+    RENT_SUM = VALUES(RENT_SUM),
+    RENT_MIN = VALUES(RENT_MIN),
+    RENT_MAX = VALUES(RENT_MAX);
@@ -2,7 +2,9 @@
 CREATE TABLE IF NOT EXISTS PROPERTY (
 	PROPERTY_ID INT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
     RENT_COST INT UNSIGNED NOT NULL,
-    PROPERTY_RATING FLOAT(2, 1),
+    PROPERTY_RATING FLOAT(2, 1),            -- RATING_SUM / RATING_COUNT, NULL when there are no reviews
+    RATING_SUM DECIMAL(12, 1) NOT NULL DEFAULT 0,   -- total stars of all reviews (kept by the UPDATE_PROPERTY_RATING triggers)
+    RATING_COUNT INT UNSIGNED NOT NULL DEFAULT 0,   -- number of reviews
     LANDLORD_ID INT UNSIGNED,
     SQFT INT UNSIGNED,
     BATHROOMS FLOAT(2, 1) UNSIGNED,
@@ -16,3 +18,9 @@ CREATE TABLE IF NOT EXISTS PROPERTY (
 		REFERENCES ADDRESS (ADDR_ID),
     CHECK (PROPERTY_RATING >= 0.0 AND PROPERTY_RATING <= 5.0)
 );
+
+-- For a PROPERTY table created before RATING_SUM/RATING_COUNT existed, run once and then
+-- CALL REBUILD_PROPERTY_RATINGS(); to fill them in:
+-- ALTER TABLE PROPERTY
+--     ADD COLUMN RATING_SUM DECIMAL(12, 1) NOT NULL DEFAULT 0,
+--     ADD COLUMN RATING_COUNT INT UNSIGNED NOT NULL DEFAULT 0;
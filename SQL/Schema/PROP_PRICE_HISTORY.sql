@@ -5,9 +5,9 @@
 
 CREATE TABLE IF NOT EXISTS PROP_PRICE_HISTORY (
 	ENTRY_ID INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
-    PROP_ID INT UNSIGNED NOT NULL,
+    PROPERTY_ID INT UNSIGNED NOT NULL,
     RENT_COST INT UNSIGNED NOT NULL,
     PRICE_START DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (PROP_ID)
-    REFERENCES PROPERTY (PROP_ID)
+    FOREIGN KEY (PROPERTY_ID)
+    REFERENCES PROPERTY (PROPERTY_ID)
 );
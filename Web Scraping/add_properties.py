@@ -1,5 +1,8 @@
 import csv
+import json
 import os
+import ssl
+import urllib.request
 import mysql.connector
 from dotenv import load_dotenv
 
@@ -15,9 +18,29 @@ cursor = db.cursor()
 
 csv_file = "./Web Scraping/Sample Data/apartments-properties.csv"
 
+# Tells a running backend to drop its cached search results for the imported cities.
+# If the backend isn't running there is nothing cached, so failures are ignored.
+def invalidate_backend_cache(cities):
+    url = os.getenv("BACKEND_URL", "https://localhost:5000") + "/api/cache/invalidate"
+    request = urllib.request.Request(
+        url,
+        data=json.dumps({"cities": sorted(cities)}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        context = ssl.create_default_context(cafile=os.getenv("CA_PATH")) if url.startswith("https") else None
+        urllib.request.urlopen(request, timeout=5, context=context).close()
+    except (OSError, ValueError):
+        pass
+
+imported_cities = set()
+
 with open(csv_file, newline='', encoding='utf-8') as f:
     reader = csv.DictReader(f)
     for row in reader:
+        imported_cities.add(row['City'])
+
         # Define a helper function to safely convert strings to the desired type or None
         def safe_convert(key, target_type):
             value = row.get(key)
@@ -43,6 +66,11 @@ with open(csv_file, newline='', encoding='utf-8') as f:
             safe_convert('Available', int)      # P_CAN_RENT
         ])
 
+# Rebuild the materialized best deals once for the whole import instead of per row
+cursor.callproc("REFRESH_ALL_DEALS")
+
 db.commit()
 cursor.close()
-db.close()
\ No newline at end of file
+db.close()
+
+invalidate_backend_cache(imported_cities)
\ No newline at end of file
@@ -0,0 +1,390 @@
+# Query plan regression checks.
+#
+# Loads the schema and a generated dataset into a scratch database, then runs EXPLAIN on the
+# canonical queries in SQL/Queries, the SEARCH_PROPERTIES procedure and the statements the
+# backend runs for search, listings, deals, matchmaking, messages and sessions. Each check lists
+# the indexes a table is expected to be read through and how many rows MySQL may estimate for it;
+# any table read with a full scan (access type ALL) fails unless the check allows it. The exit
+# status is 1 when a check fails, so the script can run after every schema or query change:
+#
+#   py benchmarks/check_query_plans.py --properties 100000
+#   py benchmarks/check_query_plans.py --reuse-database --verbose
+#
+# Connection settings come from the root .env; the scratch database (--database) is dropped and
+# recreated unless --reuse-database is given, and may not be DB_NAME. The backend's statements
+# are captured by pointing its slow query log (slow_queries.py) at every statement.
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import generate_dataset  # noqa: E402
+
+BACKEND_DIR = generate_dataset.ROOT / "mainepadfinder-app" / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+from slow_queries import SQL_COMMENT, SlowQueryLog, plan_tables  # noqa: E402
+
+load_dotenv()
+
+QUERIES_DIR = generate_dataset.ROOT / "SQL" / "Queries"
+STORED_SQL = generate_dataset.SQL_DIR / "ADD_STORED.SQL"
+
+RENT_INDEXES = {"IDX_RENT_ID", "IDX_RENT_ADDR"}
+
+
+# What a check expects of one table in a plan, by the alias the query gives it.
+# `keys`      - indexes it may be read through (None for any)
+# `max_rows`  - the most rows MySQL may estimate reading per scan of it
+# `max_share` - the same as a share of `table`'s rows, for reads that grow with the data
+# `scan`      - why a full scan of it is fine, if it is
+class Expect:
+    def __init__(self, alias, keys=None, max_rows=None, max_share=None, table=None, scan=None):
+        self.alias = alias
+        self.keys = set(keys) if keys is not None else None
+        self.max_rows = max_rows
+        self.max_share = max_share
+        self.table = table
+        self.scan = scan
+
+
+# One query to check. `match` picks out the statements the expectations are about when a
+# backend call runs several; every statement is still checked for full scans.
+# `sorted_by_index` checks fail if the matched statements sort their rows instead of reading
+# them in index order.
+class PlanCheck:
+    def __init__(self, name, source, expects=(), match=None, sorted_by_index=False):
+        self.name = name
+        self.source = source
+        self.expects = list(expects)
+        self.match = match
+        self.sorted_by_index = sorted_by_index
+
+
+# The problems with one statement's plan, given the number of rows in each table
+def plan_failures(tables, expects, table_rows):
+    failures = []
+    scans_allowed = {expect.alias for expect in expects if expect.scan}
+
+    for table in tables:
+        if table["access"] == "ALL" and table["table"] not in scans_allowed:
+            failures.append(f"full scan of {table['table']} ({table['rows']} rows)")
+
+    for expect in expects:
+        reads = [table for table in tables if table["table"] == expect.alias]
+        if not reads:
+            failures.append(f"{expect.alias} is not in the plan")
+            continue
+
+        limit = expect.max_rows
+        if expect.max_share is not None:
+            limit = max(1, int(expect.max_share * table_rows[expect.table]))
+
+        for table in reads:
+            if expect.keys is not None and table["access"] != "ALL" and table["key"] not in expect.keys:
+                failures.append(f"{expect.alias} is read through {table['key']}, expected one of {', '.join(sorted(expect.keys))}")
+            if limit is not None and (table["rows"] or 0) > limit:
+                failures.append(f"{expect.alias} is estimated at {table['rows']} rows, expected at most {limit}")
+    return failures
+
+
+def uses_filesort(plan):
+    if isinstance(plan, dict):
+        return plan.get("using_filesort") is True or any(uses_filesort(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(uses_filesort(value) for value in plan)
+    return False
+
+
+def explain(cursor, sql, params=None):
+    cursor.execute("EXPLAIN FORMAT=JSON " + sql, params)
+    return json.loads(cursor.fetchone()[0])
+
+
+# A statement from one of the SQL/Queries files, by position
+def query_file_statement(name, index=0):
+    statements = [sql for sql in generate_dataset.sql_statements(QUERIES_DIR / name) if not re.match(r"USE\s", sql, re.I)]
+    return statements[index]
+
+
+# The SELECT in a stored procedure's body, with its IN parameters turned into named placeholders
+# so it can be explained with values for them (as MySQL sees them when the procedure runs)
+def procedure_select(name):
+    for sql in generate_dataset.sql_statements(STORED_SQL):
+        if re.match(rf"CREATE\s+PROCEDURE\s+{name}\b", sql, re.I):
+            break
+    else:
+        raise LookupError(f"procedure {name} not found in {STORED_SQL.name}")
+
+    header, body = re.split(r"\bBEGIN\b", sql, maxsplit=1, flags=re.I)
+    select = re.search(r"\bSELECT\b.*?;", body, re.S | re.I).group(0)[:-1]
+    for param in re.findall(r"\bIN\s+(\w+)", header, re.I):
+        select = re.sub(rf"\b{param}\b", f"%({param})s", select)
+    return select
+
+
+# The checks run on the SQL files, as (check, sql, params)
+def file_checks():
+    rent_between = query_file_statement("FIND_RENT_BETWEEN.sql")
+    best_deals_view = query_file_statement("BEST_DEAL_PROPS.sql")
+    best_deals_select = re.split(r"\bAS\s+(?=SELECT\b)", best_deals_view, maxsplit=1, flags=re.I)[1]
+
+    yield PlanCheck("FIND_RENT_BETWEEN as written", "SQL/Queries/FIND_RENT_BETWEEN.sql", [
+        Expect("P", keys=RENT_INDEXES, scan="the range matches most listings, where reading the table is cheaper than the index"),
+    ]), rent_between, None
+
+    yield PlanCheck("FIND_RENT_BETWEEN, narrow range", "SQL/Queries/FIND_RENT_BETWEEN.sql", [
+        Expect("P", keys=RENT_INDEXES, max_share=0.15, table="PROPERTY"),
+    ]), re.sub(r"BETWEEN\s+\d+\s+AND\s+\d+", "BETWEEN 2500 AND 2600", rent_between), None
+
+    yield PlanCheck("FIND_TOP_PROPS_IN_CITY, correlated subquery", "SQL/Queries/FIND_TOP_PROPS_IN_CITY.sql", [
+        Expect("A", keys={"IDX_CITY"}, max_share=0.5, table="ADDRESS"),
+        Expect("R", max_rows=100),
+    ]), query_file_statement("FIND_TOP_PROPS_IN_CITY.sql", 0), None
+
+    yield PlanCheck("FIND_TOP_PROPS_IN_CITY, join", "SQL/Queries/FIND_TOP_PROPS_IN_CITY.sql", [
+        Expect("A", keys={"IDX_CITY"}, max_share=0.5, table="ADDRESS"),
+        Expect("R", max_rows=100),
+    ]), query_file_statement("FIND_TOP_PROPS_IN_CITY.sql", 1), None
+
+    yield PlanCheck("BEST_DEAL_PROPERTIES for one city", "SQL/Queries/BEST_DEAL_PROPS.sql", [
+        Expect("A", keys={"IDX_CITY", "PRIMARY"}),
+        Expect("P2", scan="the city averages are computed over every available unit (the app reads BEST_DEALS instead)"),
+        Expect("A2", scan="joined to every available unit for the city averages"),
+        Expect("stats", scan="the materialized averages, one row per city"),
+    ]), best_deals_select + "\n  AND A.CITY = %s", ("Portland",)
+
+    search = procedure_select("SEARCH_PROPERTIES")
+    no_filters = {name: None for name in re.findall(r"%\((\w+)\)s", search)}
+
+    yield PlanCheck("SEARCH_PROPERTIES by city and rent", "SQL/Procedures/SEARCH_PROPERTIES.sql", [
+        Expect("A", keys={"IDX_CITY", "PRIMARY"}),
+        Expect("P", keys=RENT_INDEXES | {"ADDR_ID"}),
+    ]), search, dict(no_filters, P_CITY="Portland", P_MIN_RENT=1200, P_MAX_RENT=1500)
+
+    yield PlanCheck("SEARCH_PROPERTIES by a narrow rent range", "SQL/Procedures/SEARCH_PROPERTIES.sql", [
+        Expect("P", keys=RENT_INDEXES, max_share=0.15, table="PROPERTY"),
+        Expect("A", keys={"PRIMARY"}, max_rows=1),
+    ]), search, dict(no_filters, P_MIN_RENT=2500, P_MAX_RENT=2600)
+
+
+# Finds the users and listings the backend checks run as, so every lookup hits real rows
+def sample_ids(cursor):
+    cursor.execute("SELECT USER_LO, USER_HI FROM MESSAGE GROUP BY USER_LO, USER_HI ORDER BY COUNT(*) DESC LIMIT 1")
+    user_lo, user_hi = cursor.fetchone()
+    cursor.execute(
+        """
+        SELECT S.USER_ID
+        FROM RENTER_SETTINGS AS S
+        JOIN USERS AS U ON U.USER_ID = S.USER_ID
+        WHERE S.GENDER_PREFERRED IN ('M', 'F')
+        ORDER BY S.USER_ID
+        LIMIT 1
+        """
+    )
+    renter = cursor.fetchone()
+    cursor.execute("SELECT PROPERTY_ID FROM PROP_PRICE_HISTORY GROUP BY PROPERTY_ID ORDER BY COUNT(*) DESC LIMIT 1")
+    listing = cursor.fetchone()
+    cursor.execute("SELECT USER_ID, USERNAME FROM USERS WHERE USER_ID IN (%s, %s)", (user_lo, user_hi))
+    usernames = dict(cursor.fetchall())
+    cursor.execute("SELECT USERNAME FROM USERS WHERE USER_ID = %s", (renter[0],))
+    return {
+        "messenger": usernames[user_lo],
+        "correspondent": usernames[user_hi],
+        "renter": cursor.fetchone()[0],
+        "listing": listing[0],
+    }
+
+
+# The checks run through the backend, as (check, call). `call(app, client)` makes the backend
+# run the statements, inside an application context.
+def backend_checks(ids):
+    def logged_in(client, username):
+        response = client.post("/api/login", json={"username": username, "password": generate_dataset.BENCH_PASSWORD})
+        if response.status_code != 200:
+            raise RuntimeError(f"could not log in as {username}: {response.status_code}")
+        return client.get_cookie("token").value
+
+    def search(app, sort, city=None, min_rent=None, max_rent=None, after_key=None):
+        city_filter = app.resolve_city_filter(city)
+        return lambda: app.search_properties_sql(city_filter, min_rent, max_rent, None, None, sort, 21, after_key)
+
+    yield PlanCheck("app search, first page by rent", "app.py search_properties_sql", [
+        Expect("P", keys=RENT_INDEXES),
+        Expect("A", keys={"PRIMARY"}, max_rows=1),
+    ], sorted_by_index=True), lambda app, client: search(app, "rent_asc")()
+
+    yield PlanCheck("app search, later page by rent in a city", "app.py search_properties_sql", [
+        Expect("P", keys=RENT_INDEXES | {"ADDR_ID"}),
+        Expect("A", keys={"IDX_CITY", "PRIMARY"}),
+    ]), lambda app, client: search(app, "rent_asc", "Portland", 800, 2500, after_key=[1200, 0])()
+
+    yield PlanCheck("app search, next page of newest", "app.py search_properties_sql", [
+        Expect("P", keys={"PRIMARY"}),
+        Expect("A", keys={"PRIMARY"}, max_rows=1),
+    ], sorted_by_index=True), lambda app, client: search(app, "newest", after_key=[10 ** 9])()
+
+    def session_lookup(app, client):
+        token = logged_in(client, ids["renter"])
+        app.load_session(token, datetime.now(timezone.utc).replace(tzinfo=None))
+
+    yield PlanCheck("app session lookup", "app.py load_session", [
+        Expect("S", keys={"PRIMARY"}, max_rows=1),
+        Expect("L", keys={"PRIMARY"}, max_rows=1),
+        Expect("R", keys={"PRIMARY"}, max_rows=1),
+    ], match="FROM SESSIONS"), session_lookup
+
+    def thread(app, client):
+        logged_in(client, ids["messenger"])
+        client.get(f"/api/messages/thread?otherUsername={ids['correspondent']}")
+
+    yield PlanCheck("app message thread", "app.py get_message_thread", [
+        Expect("M", keys={"IDX_MESSAGE_CONVERSATION"}, max_rows=1000),
+        Expect("SU", keys={"PRIMARY"}, max_rows=1),
+    ], match="FROM MESSAGE AS M"), thread
+
+    def inbox(app, client):
+        logged_in(client, ids["messenger"])
+        client.get("/api/messages/inbox")
+
+    yield PlanCheck("app inbox", "app.py get_inbox", [
+        Expect("CONVERSATION", keys={"IDX_CONVERSATION_LO_RECENT", "IDX_CONVERSATION_HI_RECENT"}),
+        Expect("C", scan="the two pages of conversations, at most twice the page size"),
+        Expect("U", keys={"PRIMARY"}, max_rows=1),
+        Expect("M", keys={"PRIMARY"}, max_rows=1),
+    ], match="FROM CONVERSATION"), inbox
+
+    def matchmake(app, client):
+        logged_in(client, ids["renter"])
+        client.get("/api/matchmake")
+
+    yield PlanCheck("app matchmaking", "app.py select_matchmaking_partner", [
+        Expect("U", keys={"IDX_USERS_GENDER", "PRIMARY"}),
+        Expect("R", keys={"PRIMARY"}, max_rows=1),
+    ], match="JOIN RENTER AS R"), matchmake
+
+    yield PlanCheck("app listing", "app.py load_listings", [
+        Expect("P", keys={"PRIMARY"}, max_rows=1),
+        Expect("A", keys={"PRIMARY"}, max_rows=1),
+    ], match="WHERE P.PROPERTY_ID IN"), lambda app, client: client.get(f"/api/listing/{ids['listing']}")
+
+    yield PlanCheck("app price history", "app.py get_price_history", [
+        Expect("PROP_PRICE_HISTORY", keys={"IDX_PRICE_HISTORY_PROPERTY_START"}, max_rows=1000),
+    ], match="FROM PROP_PRICE_HISTORY WHERE PROPERTY_ID"), lambda app, client: client.get(f"/api/listing/{ids['listing']}/price-history")
+
+    yield PlanCheck("app deals in a city", "app.py get_property_deals", [
+        Expect("BEST_DEALS", keys={"IDX_DEALS_CITY_PCT"}),
+    ], match="FROM BEST_DEALS", sorted_by_index=True), lambda app, client: client.get("/api/properties/deals?city=Portland")
+
+
+def table_row_counts(cursor):
+    counts = {}
+    for table in ("USERS", "ADDRESS", "PROPERTY", "REVIEW", "MESSAGE", "CONVERSATION", "PROP_PRICE_HISTORY", "BEST_DEALS"):
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cursor.fetchone()[0]
+    return counts
+
+
+# Runs the backend checks: each call's statements are recorded with their plans by the slow query
+# log, with its threshold lowered so that every statement counts as slow
+def run_backend_checks(ids):
+    import app
+    import database
+
+    database.slow_query_log = SlowQueryLog(threshold_ms=1e-9, log_path="", max_fingerprints=10000)
+    client = app.app.test_client()
+    client.environ_base["wsgi.url_scheme"] = "https"   # the session cookie is Secure
+
+    # the city directory reads every city once when first used, which no check is about
+    with app.app.app_context():
+        app.resolve_city_filter("Portland")
+
+    for check, call in backend_checks(ids):
+        database.slow_query_log.clear()
+        with app.app.app_context():
+            call(app, client)
+        statements = []
+        for entry in database.slow_query_log.report(limit=10000, order="count"):
+            if entry["plan"] is None:
+                continue   # CALLs and batched writes, which EXPLAIN can't show
+            statements.append((entry["sql"], entry["plan"]))
+        yield check, statements
+
+
+def format_tables(tables):
+    return [f"    {t['table']}: {t['access']} key={t['key']} rows={t['rows']}" for t in tables]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the application's queries keep their index plans.")
+    parser.add_argument("--database", default="MAINEPAD_PLANS", help="scratch database to load and explain against")
+    parser.add_argument("--properties", type=int, default=100000, help="dataset size passed to generate_dataset.py")
+    parser.add_argument("--reuse-database", action="store_true", help="keep the database from an earlier run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="show the plan of every check, not only failing ones")
+    parser.add_argument("--json", help="write every plan and result to this file")
+    args = parser.parse_args()
+
+    if not args.reuse_database:
+        generate_dataset.prepare_database(args.database, args.properties, args.seed)
+    os.environ["DB_NAME"] = args.database
+
+    conn = generate_dataset.connect(args.database)
+    cursor = conn.cursor()
+    cursor.execute("ANALYZE TABLE ADDRESS, PROPERTY, PROP_PRICE_HISTORY, REVIEW, INTERUSER, MESSAGE, CONVERSATION, USERS, BEST_DEALS")
+    cursor.fetchall()
+    table_rows = table_row_counts(cursor)
+    ids = sample_ids(cursor)
+
+    results = []
+
+    def report(check, statements):
+        failures = []
+        plans = []
+        for sql, plan in statements:
+            if "error" in plan:
+                failures.append(f"EXPLAIN failed: {plan['error']}")
+                continue
+            tables = plan_tables(plan)
+            matched = check.match is None or check.match in sql
+            failures += plan_failures(tables, check.expects if matched else [], table_rows)
+            if matched and check.sorted_by_index and uses_filesort(plan):
+                failures.append("rows are sorted (filesort) instead of read in index order")
+            plans.append({"sql": sql, "tables": tables, "plan": plan})
+        if check.match is not None and not any(check.match in sql for sql, _ in statements):
+            failures.append(f"no statement containing {check.match!r} was run")
+
+        print(f"{'FAIL' if failures else 'ok  '}  {check.name}  ({check.source})")
+        for failure in failures:
+            print(f"    - {failure}")
+        if failures or args.verbose:
+            for item in plans:
+                print(f"    {item['sql'][:160]}")
+                print("\n".join(format_tables(item["tables"])))
+        results.append({"name": check.name, "source": check.source, "failures": failures, "statements": plans})
+
+    for check, sql, params in file_checks():
+        report(check, [(" ".join(SQL_COMMENT.sub(" ", sql).split()), explain(cursor, sql, params))])
+    cursor.close()
+    conn.close()
+
+    for check, statements in run_backend_checks(ids):
+        report(check, statements)
+
+    failed = [result for result in results if result["failures"]]
+    print(f"\n{len(results) - len(failed)} of {len(results)} checks passed "
+          f"({table_rows['PROPERTY']} properties, {table_rows['USERS']} users)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"tableRows": table_rows, "checks": results}, f, indent=2, default=str)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
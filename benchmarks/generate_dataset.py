@@ -0,0 +1,576 @@
+# Generates a synthetic MainePad-Finder dataset at benchmark scale (10k to 10M properties).
+#
+# Rent, bedrooms, bathrooms, square footage, availability, zip codes and street names are learned
+# per city from the scraped samples in "Web Scraping/Sample Data", so the generated units look like
+# the real ones: Portland stays the largest and most expensive market, a 2 bed costs more than a
+# studio in the same city, and units come several to a building. Users, renters, landlords, swipes
+# (INTERUSER), conversations with their messages, reviews and price history are generated around them.
+#
+# The same --seed always produces the same rows. Each table has its own random stream, so changing
+# e.g. --reviews leaves every other table as it was.
+#
+# Either write tab-separated files and a load.sql that bulk loads them with LOAD DATA:
+#   py benchmarks/generate_dataset.py --properties 1000000 --out bench-data
+#   mysql --local-infile=1 -u admin -p -D MAINEPAD_BENCH < bench-data/load.sql
+# or load straight into a database (batched multi-row INSERTs over one connection):
+#   py benchmarks/generate_dataset.py --properties 100000 --load --database MAINEPAD_BENCH --create-schema
+#
+# Rows are loaded with their ids, so the target tables must be empty. The REVIEW and
+# PROP_PRICE_HISTORY loads fire the rating and monthly rollup triggers, which fill in
+# PROPERTY_RATING and PRICE_ROLLUP_MONTHLY as they would in production. The PROPERTY load fires
+# ADD_PROP_START_PRICE, which adds an entry at the current rent, dated at load time, after each
+# property's generated history.
+# Every generated user can log in with their username (user1, user2, ...) and BENCH_PASSWORD.
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_DIR = ROOT / "Web Scraping" / "Sample Data"
+SQL_DIR = ROOT / "SQL" / "Database Operations"
+
+BENCH_PASSWORD = "benchmark-password"
+
+# When the generated history and messages end
+NOW = datetime(2025, 12, 1)
+
+# Columns written for each table, in load order: every table is loaded after the ones it refers to
+TABLES = {
+    "USERS": ("USER_ID", "USERNAME", "PASS_WORD", "EMAIL", "PHONE_NUMBER", "GENDER", "USER_DESC", "PICTURE_URL", "BIRTH_DATE", "DISPLAY_NAME"),
+    "RENTER": ("USER_ID",),
+    "LANDLORD": ("USER_ID",),
+    "RENTER_SETTINGS": ("USER_ID", "DISTANCE_MAX", "GENDER_PREFERRED"),
+    "ADDRESS": ("ADDR_ID", "STREET", "CITY", "STATE_CODE", "ZIPCODE"),
+    "PROPERTY": ("PROPERTY_ID", "RENT_COST", "LANDLORD_ID", "SQFT", "BATHROOMS", "BEDROOMS", "CAN_RENT", "UNIT_LABEL", "ADDR_ID"),
+    "PROP_PRICE_HISTORY": ("PROPERTY_ID", "RENT_COST", "PRICE_START"),
+    "REVIEW": ("USER_ID", "PROPERTY_ID", "COMMENTS", "STARS"),
+    "INTERUSER": ("RENTER_ID", "CONNECTION_ID", "SWIPED", "BLOCKED"),
+    "MESSAGE": ("MSG_ID", "SENDER_ID", "RECIPIENT_ID", "TIME_STAMP", "MESSAGE_TEXTS", "IS_READ"),
+    "CONVERSATION": ("USER_LO", "USER_HI", "LAST_MSG_ID", "LAST_TIME_STAMP", "UNREAD_LO", "UNREAD_HI"),
+    "USER_UNREAD": ("USER_ID", "UNREAD_COUNT"),
+}
+
+FIRST_NAMES = ["Alex", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn", "Sam",
+               "Charlie", "Drew", "Emerson", "Hayden", "Logan", "Parker", "Reese", "Rowan", "Skyler", "Sydney"]
+LAST_NAMES = ["Smith", "Johnson", "Brown", "Pike", "Fosgate", "Priola", "Martin", "Thompson", "White", "Clark",
+              "Lewis", "Walker", "Hall", "Young", "King", "Wright", "Scott", "Green", "Baker", "Adams"]
+MESSAGE_TEXTS = [
+    "Hi! Is the room still available?", "Are utilities included in the rent?", "Would you be open to a tour this week?",
+    "I'm a grad student looking for a quiet place.", "Sure, how about Friday?", "What's the parking situation?",
+    "Is the lease 12 months?", "Are pets allowed?", "Thanks, I'll let you know soon.", "Sounds good to me!",
+    "Do you have a roommate already?", "How far is it from campus?",
+]
+REVIEW_COMMENTS = [
+    "Great location, responsive landlord.", "A bit noisy on weekends.", "Heating works well in winter.",
+    "Would rent again.", "Small kitchen but a fair price.", "Parking is hard to find.", None, None, None,
+]
+USER_DESCRIPTIONS = [None, "Student at USM.", "Quiet, tidy, early riser.", "Looking for a place near campus.", "Night owl, loves cooking."]
+GENDERS = ["M", "F", "X", "?"]
+GENDER_WEIGHTS = [46, 46, 6, 2]
+
+
+# Reads the scraped samples as (city, zip, street, beds, baths, sqft, rent, available) rows.
+# zillow-properties.csv is the raw form of zillow-properties-sanitized.csv, so only the latter is used.
+def read_samples(sample_dir=SAMPLE_DIR):
+    def number(value, kind):
+        try:
+            return kind(value) if value not in (None, "") else None
+        except ValueError:
+            return None
+
+    samples = []
+    with open(sample_dir / "apartments-properties.csv", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            samples.append((row["City"], row["Zipcode"], row["Street"], number(row["Bedrooms"], float),
+                            number(row["Bathrooms"], float), number(row["SqFt"], int), number(row["Rent"], int),
+                            number(row["Available"], int)))
+    with open(sample_dir / "zillow-properties-sanitized.csv", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            samples.append((row["CITY"], row["ZIPCODE"], row["STREET"], number(row["BEDROOMS"], float),
+                            number(row["BATHROOMS"], float), number(row["SQFT"], int), number(row["RENT_COST"], int),
+                            None))
+
+    # rows without a usable city or rent teach nothing
+    return [s for s in samples if s[0] and s[0].upper() != "NONE" and s[6]]
+
+
+# "935 3rd St APT 2" -> "3rd St"
+def street_name(street):
+    street = re.sub(r"^\d+[A-Za-z]?\s+", "", street)
+    return re.sub(r"\s+(APT|Apt|UNIT|Unit|#).*$", "", street).strip()
+
+
+# What the generator knows about one city
+class CityModel:
+    def __init__(self, name, weight, zipcodes, streets, units, rent_ratio):
+        self.name = name
+        self.weight = weight
+        self.zipcodes = zipcodes
+        self.streets = streets
+        self.units = units            # (beds, baths, sqft, rent) of each sampled unit
+        self.rent_ratio = rent_ratio  # city median rent / overall median rent
+
+
+# Per-city distributions learned from the samples
+class SampleModel:
+    def __init__(self, samples):
+        by_city = defaultdict(list)
+        for sample in samples:
+            by_city[sample[0]].append(sample)
+
+        overall_median = statistics.median(s[6] for s in samples)
+        self.all_units = [(s[3], s[4], s[5], s[6]) for s in samples]
+        self.cities = []
+        for name, rows in sorted(by_city.items()):
+            streets = sorted({street_name(s[2]) for s in rows if s[2]} - {""})
+            self.cities.append(CityModel(
+                name,
+                len(rows),
+                sorted({s[1] for s in rows if s[1]}) or ["04101"],
+                streets or ["Main St"],
+                [(s[3], s[4], s[5], s[6]) for s in rows],
+                statistics.median(s[6] for s in rows) / overall_median,
+            ))
+        self.city_weights = [city.weight for city in self.cities]
+
+        # units per building: how many sampled units share a street address
+        buildings = defaultdict(int)
+        for s in samples:
+            buildings[(s[0], s[2])] += 1
+        self.building_sizes = sorted(buildings.values())
+
+        availability = [s[7] for s in samples if s[7] is not None]
+        self.taken_share = sum(availability) / len(availability) if availability else 0.3
+
+    # A unit for `city`: a sampled unit of that city, or for cities with few samples sometimes one
+    # from anywhere with its rent scaled to the city. Rent and size are jittered a little.
+    def unit(self, rng, city):
+        if rng.random() < min(1.0, len(city.units) / 20):
+            beds, baths, sqft, rent = rng.choice(city.units)
+        else:
+            beds, baths, sqft, rent = rng.choice(self.all_units)
+            rent = rent * city.rent_ratio
+        rent = max(300, int(round(rent * rng.lognormvariate(0, 0.08) / 5) * 5))
+        if sqft:
+            sqft = max(150, int(sqft * rng.uniform(0.92, 1.08)))
+        return beds, baths, sqft, rent
+
+
+# Writes rows to <out>/<TABLE>.tsv in the format LOAD DATA reads by default
+class FileSink:
+    def __init__(self, out_dir, table):
+        self.table = table
+        self.path = out_dir / f"{table}.tsv"
+        self.rows = 0
+        self._file = open(self.path, "w", encoding="utf-8", newline="\n")
+
+    @staticmethod
+    def field(value):
+        if value is None:
+            return "\\N"
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        if isinstance(value, datetime):
+            return value.strftime("%Y-%m-%d %H:%M:%S")
+        return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+    def add(self, row):
+        self._file.write("\t".join(self.field(value) for value in row) + "\n")
+        self.rows += 1
+
+    def close(self):
+        self._file.close()
+
+
+# Inserts rows in batches of multi-row INSERTs. `after` lists sinks whose rows must be in the
+# database first (e.g. a price history entry's trigger looks up its PROPERTY row).
+class DbSink:
+    def __init__(self, conn, table, batch_size, after=()):
+        self.table = table
+        self.rows = 0
+        self._conn = conn
+        self._cursor = conn.cursor()
+        self._batch = []
+        self._batch_size = batch_size
+        self._after = after
+        columns = TABLES[table]
+        self._sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+    def add(self, row):
+        self._batch.append(row)
+        self.rows += 1
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        for sink in self._after:
+            sink.flush()
+        if self._batch:
+            self._cursor.executemany(self._sql, self._batch)
+            self._conn.commit()
+            self._batch = []
+
+    def close(self):
+        self.flush()
+        self._cursor.close()
+
+
+def rng_for(seed, table):
+    return random.Random(f"{seed}:{table}")
+
+
+def ago(rng, max_days):
+    return NOW - timedelta(seconds=rng.randint(0, max_days * 86400))
+
+
+# USERS plus the RENTER or LANDLORD row of each, and RENTER_SETTINGS for about half of the renters.
+# Returns the renter and landlord ids.
+def generate_users(args, sinks, password_hash):
+    rng = rng_for(args.seed, "USERS")
+    renters = array("I")
+    landlords = array("I")
+    for user_id in range(1, args.users + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        gender = rng.choices(GENDERS, GENDER_WEIGHTS)[0]
+        sinks["USERS"].add((
+            user_id,
+            f"user{user_id}",
+            password_hash,
+            f"user{user_id}@example.com",
+            f"207-{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+            gender,
+            rng.choice(USER_DESCRIPTIONS),
+            None,
+            (NOW - timedelta(days=rng.randint(18 * 365, 40 * 365))).date(),
+            f"{first} {last}",
+        ))
+        if rng.random() < args.landlord_share:
+            landlords.append(user_id)
+            sinks["LANDLORD"].add((user_id,))
+        else:
+            renters.append(user_id)
+            sinks["RENTER"].add((user_id,))
+            if rng.random() < 0.5:
+                sinks["RENTER_SETTINGS"].add((user_id, rng.choice([5, 10, 25, 50]), rng.choices(GENDERS, GENDER_WEIGHTS)[0]))
+    return renters, landlords
+
+
+# ADDRESS, PROPERTY and PROP_PRICE_HISTORY. Buildings are placed in cities in proportion to the
+# samples, and each gets as many units as a sampled building had.
+def generate_properties(args, sinks, model, landlords):
+    rng = rng_for(args.seed, "PROPERTY")
+    history_rng = rng_for(args.seed, "PROP_PRICE_HISTORY")
+    property_id = 0
+    addr_id = 0
+    while property_id < args.properties:
+        addr_id += 1
+        city = rng.choices(model.cities, model.city_weights)[0]
+        sinks["ADDRESS"].add((
+            addr_id,
+            f"{rng.randint(1, 999)} {rng.choice(city.streets)}",
+            city.name,
+            "ME",
+            rng.choice(city.zipcodes),
+        ))
+
+        # a building has one owner, or none for scraped listings; a few landlords own a lot
+        landlord_id = None
+        if landlords and rng.random() < args.owned_share:
+            landlord_id = landlords[int(len(landlords) * rng.random() ** 2)]
+
+        units = min(rng.choice(model.building_sizes), args.properties - property_id)
+        for unit in range(units):
+            property_id += 1
+            beds, baths, sqft, rent = model.unit(rng, city)
+            sinks["PROPERTY"].add((
+                property_id,
+                rent,
+                landlord_id,
+                sqft,
+                baths,
+                beds,
+                1 if rng.random() < model.taken_share else 0,
+                f"Apt {unit + 1}" if units > 1 else None,
+                addr_id,
+            ))
+            generate_price_history(history_rng, sinks["PROP_PRICE_HISTORY"], args.history_per_property, property_id, rent)
+
+
+# A property's rent changes, oldest first, ending at its current rent
+def generate_price_history(rng, sink, mean_entries, property_id, rent):
+    entries = 1 + min(int(rng.expovariate(1 / max(mean_entries - 1, 0.01))), 20)
+    started = ago(rng, 180)
+    changes = [(started, rent)]
+    for _ in range(entries - 1):
+        started -= timedelta(days=rng.randint(30, 200))
+        rent = max(300, int(round(rent * (1 - rng.gauss(0.03, 0.04)) / 5) * 5))
+        changes.append((started, rent))
+    for started, cost in reversed(changes):
+        sink.add((property_id, cost, started))
+
+
+# REVIEW: renters review distinct properties, mostly favourably
+def generate_reviews(args, sinks, renters):
+    rng = rng_for(args.seed, "REVIEW")
+    if not renters or not args.reviews:
+        return
+    mean = args.reviews / len(renters)
+    remaining = args.reviews
+    for user_id in renters:
+        if remaining <= 0:
+            break
+        count = min(int(rng.expovariate(1 / mean)) if mean else 0, remaining, args.properties)
+        for property_id in rng.sample(range(1, args.properties + 1), count):
+            sinks["REVIEW"].add((user_id, property_id, rng.choice(REVIEW_COMMENTS), float(rng.choices([1, 2, 3, 4, 5], [5, 8, 17, 35, 35])[0])))
+        remaining -= count
+
+
+# INTERUSER: each renter has swiped on a few other renters, liking some and blocking a few
+def generate_swipes(args, sinks, renters):
+    rng = rng_for(args.seed, "INTERUSER")
+    if len(renters) < 2:
+        return
+    for renter_id in renters:
+        count = min(int(rng.expovariate(1 / args.swipes_per_renter)) if args.swipes_per_renter else 0, len(renters) - 1)
+        # one extra candidate in case the renter draws themselves
+        others = [other for other in rng.sample(renters, min(count + 1, len(renters))) if other != renter_id]
+        for other in others[:count]:
+            sinks["INTERUSER"].add((renter_id, other, rng.random() < 0.4, rng.random() < 0.02))
+
+
+# MESSAGE with the CONVERSATION summary of each pair and every user's USER_UNREAD total.
+# The last few messages of some conversations are left unread by their recipient.
+def generate_messages(args, sinks):
+    rng = rng_for(args.seed, "MESSAGE")
+    unread_by_user = array("I", bytes(4 * (args.users + 1)))
+    msg_id = 0
+    for user_lo in range(1, args.users):
+        partners = min(int(rng.expovariate(1 / args.conversations_per_user)) if args.conversations_per_user else 0, args.users - user_lo)
+        for user_hi in sorted(rng.sample(range(user_lo + 1, args.users + 1), partners)):
+            sent_at = ago(rng, 365)
+            messages = 1 + int(rng.expovariate(1 / max(args.messages_per_conversation - 1, 0.01)))
+            unread_tail = rng.choice([0, 0, 0, 1, 2])
+            pair = (user_lo, user_hi)
+            unread = {user_lo: 0, user_hi: 0}
+            for n in range(messages):
+                msg_id += 1
+                sender = rng.choice(pair)
+                recipient = user_hi if sender == user_lo else user_lo
+                sent_at = min(sent_at + timedelta(minutes=rng.randint(1, 60 * 24 * 3)), NOW)
+                is_read = n < messages - unread_tail
+                if not is_read:
+                    unread[recipient] += 1
+                sinks["MESSAGE"].add((msg_id, sender, recipient, sent_at, rng.choice(MESSAGE_TEXTS), is_read))
+            sinks["CONVERSATION"].add((user_lo, user_hi, msg_id, sent_at, unread[user_lo], unread[user_hi]))
+            unread_by_user[user_lo] += unread[user_lo]
+            unread_by_user[user_hi] += unread[user_hi]
+
+    for user_id in range(1, args.users + 1):
+        if unread_by_user[user_id]:
+            sinks["USER_UNREAD"].add((user_id, unread_by_user[user_id]))
+
+
+def generate(args, sinks, model, password_hash):
+    renters, landlords = generate_users(args, sinks, password_hash)
+    generate_properties(args, sinks, model, landlords)
+    generate_reviews(args, sinks, renters)
+    generate_swipes(args, sinks, renters)
+    generate_messages(args, sinks)
+
+
+# The statements of a .sql file from SQL/, split on its DELIMITER changes the way the mysql
+# client does, without their trailing delimiter
+def sql_statements(path):
+    delimiter = ";"
+    statement = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.upper().startswith("DELIMITER "):
+                delimiter = stripped.split()[1]
+                continue
+            if not statement and (not stripped or stripped.startswith("--")):
+                continue
+            statement.append(line)
+            code = re.sub(r"\s--\s.*$", "", stripped).rstrip()
+            if code.endswith(delimiter):
+                sql = "".join(statement).rstrip()
+                sql = re.sub(r"\s--\s[^\n]*$", "", sql).rstrip()
+                yield sql[: -len(delimiter)]
+                statement = []
+    if "".join(statement).strip():
+        yield "".join(statement)
+
+
+# Runs a .sql file from SQL/. USE statements are skipped so the file always runs against the
+# connection's current database.
+def run_sql_file(cursor, path):
+    for sql in sql_statements(path):
+        if not re.match(r"USE\s", sql, re.I):
+            cursor.execute(sql)
+
+
+# Creates `database` with the application's tables, indexes, procedures and triggers
+def create_schema(conn, database):
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` DEFAULT CHARACTER SET utf8mb4 DEFAULT COLLATE utf8mb4_0900_ai_ci")
+    cursor.execute(f"USE `{database}`")
+    for name in ("ALL_TABLE.sql", "ADD_INDEXES.sql", "ADD_STORED.SQL"):
+        run_sql_file(cursor, SQL_DIR / name)
+    conn.commit()
+    cursor.close()
+
+
+def connect(database=None):
+    import mysql.connector
+
+    return mysql.connector.connect(
+        host = os.getenv("DB_HOST"),
+        user = os.getenv("DB_USER"),
+        password = os.getenv("DB_PASSWORD"),
+        database = database,
+        autocommit = False
+    )
+
+
+# Drops and regenerates a scratch database for the benchmarks: the schema plus a dataset of
+# `properties` listings, made by running this script with --load --create-schema.
+# Refuses the application's own database (DB_NAME).
+def prepare_database(database, properties, seed):
+    if database == os.getenv("DB_NAME"):
+        sys.exit(f"--database {database} is the application's database; use a scratch database")
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+    cursor.close()
+    conn.close()
+
+    subprocess.run([
+        sys.executable, str(Path(__file__).resolve()),
+        "--load", "--create-schema", "--database", database,
+        "--properties", str(properties), "--seed", str(seed),
+    ], check=True)
+
+
+# A werkzeug scrypt hash of BENCH_PASSWORD (what /api/signup stores), with a salt taken from the
+# seed so the output stays reproducible
+def password_hash(seed):
+    import hashlib
+
+    salt = f"bench{seed:011d}"[-16:]
+    digest = hashlib.scrypt(BENCH_PASSWORD.encode(), salt=salt.encode(), n=32768, r=8, p=1, maxmem=132 * 1024 * 1024)
+    return f"scrypt:32768:8:1${salt}${digest.hex()}"
+
+
+def write_load_script(out_dir, sinks):
+    lines = [
+        "-- Bulk loads the generated files: mysql --local-infile=1 -D <database> < load.sql",
+        "SET FOREIGN_KEY_CHECKS = 0;",
+        "SET UNIQUE_CHECKS = 0;",
+    ]
+    for table, columns in TABLES.items():
+        path = sinks[table].path.resolve().as_posix()
+        lines.append(
+            f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {table} CHARACTER SET utf8mb4 "
+            f"({', '.join(columns)});"
+        )
+    lines += [
+        "SET UNIQUE_CHECKS = 1;",
+        "SET FOREIGN_KEY_CHECKS = 1;",
+        "CALL REFRESH_ALL_DEALS();",
+        "ANALYZE TABLE ADDRESS, PROPERTY, PROP_PRICE_HISTORY, REVIEW, INTERUSER, MESSAGE, CONVERSATION, USERS;",
+    ]
+    (out_dir / "load.sql").write_text("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic MainePad-Finder dataset learned from the sample CSVs.")
+    parser.add_argument("--properties", type=int, default=10000, help="PROPERTY rows (10k to 10M)")
+    parser.add_argument("--users", type=int, help="USERS rows (default: properties / 5, at least 1000)")
+    parser.add_argument("--landlord-share", type=float, default=0.1, help="fraction of users who are landlords")
+    parser.add_argument("--owned-share", type=float, default=0.7, help="fraction of buildings with a landlord account")
+    parser.add_argument("--reviews", type=int, help="REVIEW rows (default: properties / 2)")
+    parser.add_argument("--history-per-property", type=float, default=3, help="mean PROP_PRICE_HISTORY entries per property")
+    parser.add_argument("--swipes-per-renter", type=float, default=10, help="mean INTERUSER rows per renter")
+    parser.add_argument("--conversations-per-user", type=float, default=1.5, help="mean conversations started per user")
+    parser.add_argument("--messages-per-conversation", type=float, default=6, help="mean messages per conversation")
+    parser.add_argument("--seed", type=int, default=42)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="write <TABLE>.tsv files and load.sql to this directory")
+    target.add_argument("--load", action="store_true", help="insert straight into the database")
+    parser.add_argument("--database", default=os.getenv("DB_NAME"), help="database for --load (default: DB_NAME from .env)")
+    parser.add_argument("--create-schema", action="store_true", help="with --load, create the database and schema first")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per INSERT with --load")
+    args = parser.parse_args()
+
+    if args.users is None:
+        args.users = max(1000, args.properties // 5)
+    if args.reviews is None:
+        args.reviews = args.properties // 2
+
+    model = SampleModel(read_samples())
+    started = time.perf_counter()
+
+    if args.out:
+        out_dir = Path(args.out)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        sinks = {table: FileSink(out_dir, table) for table in TABLES}
+        generate(args, sinks, model, password_hash(args.seed))
+        for sink in sinks.values():
+            sink.close()
+        write_load_script(out_dir, sinks)
+    else:
+        conn = connect()
+        if args.create_schema:
+            create_schema(conn, args.database)
+        cursor = conn.cursor()
+        cursor.execute(f"USE `{args.database}`")
+        cursor.execute("SELECT COUNT(*) FROM PROPERTY")
+        if cursor.fetchone()[0]:
+            sys.exit(f"{args.database}.PROPERTY already has rows; generate into an empty database")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        cursor.execute("SET UNIQUE_CHECKS = 0")
+
+        # triggers on PROP_PRICE_HISTORY and REVIEW read the PROPERTY and ADDRESS rows
+        depends_on = {"PROPERTY": ["ADDRESS"], "PROP_PRICE_HISTORY": ["PROPERTY"], "REVIEW": ["PROPERTY"]}
+        sinks = {}
+        for table in TABLES:
+            after = [sinks[name] for name in depends_on.get(table, [])]
+            sinks[table] = DbSink(conn, table, args.batch_size, after)
+        generate(args, sinks, model, password_hash(args.seed))
+        for sink in sinks.values():
+            sink.close()
+
+        cursor.execute("SET UNIQUE_CHECKS = 1")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        cursor.callproc("REFRESH_ALL_DEALS")
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    rows = {table: sink.rows for table, sink in sinks.items()}
+    print(json.dumps({
+        "seed": args.seed,
+        "cities": len(model.cities),
+        "seconds": round(time.perf_counter() - started, 1),
+        "rows": rows,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+# End-to-end HTTP load test of the backend.
+#
+# Builds a scratch database with generate_dataset.py, starts app.py against it, and runs virtual
+# users in parallel. Each one signs up and logs in as a new renter, runs the flow
+# search (/api/properties) -> listing -> review -> matchmake (+ feedback) -> message -> thread
+# a few times, then starts over as another new renter until the run ends. Throughput, p50/p95/p99
+# latency and the error rate of every endpoint are printed and written to a JSON file, together
+# with the commit, so runs can be compared:
+#
+#   py benchmarks/load_test.py --properties 100000 --concurrency 32 --duration 60 --json before.json
+#   py benchmarks/load_test.py --reuse-database --concurrency 32 --duration 60 --json after.json --compare before.json
+#
+# Connection settings come from the root .env; the scratch database (--database) is dropped and
+# recreated unless --reuse-database is given, and may not be DB_NAME. The server runs on plain HTTP
+# with Flask's threaded server; point --base-url at a server you started yourself to test anything else.
+import argparse
+import json
+import os
+import random
+import ssl
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import generate_dataset  # noqa: E402
+
+load_dotenv()
+
+BACKEND_DIR = generate_dataset.ROOT / "mainepadfinder-app" / "backend"
+
+# Statuses that are a normal answer for the flow rather than an error
+EXPECTED = {
+    "GET /api/matchmake": {404},   # nobody left to match with
+}
+
+
+# Latencies and statuses per endpoint, shared by all virtual users
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.flows = 0
+        self.recording = False
+
+    def add(self, name, seconds, status):
+        if not self.recording:
+            return
+        with self._lock:
+            self.latencies[name].append(seconds * 1000)
+            self.statuses[name][status] += 1
+            if status == 0 or (status >= 400 and status not in EXPECTED.get(name, ())):
+                self.errors[name] += 1
+
+    def flow_done(self):
+        if self.recording:
+            with self._lock:
+                self.flows += 1
+
+
+# One simulated user with their own session cookie
+class VirtualUser:
+    def __init__(self, base_url, results, rng, cities, context):
+        self.base_url = base_url
+        self.results = results
+        self.rng = rng
+        self.cities = cities
+        self.context = context
+        self.token = None
+
+    # Sends a request and records it under `name`. Returns (status, parsed JSON body or None).
+    def call(self, name, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header("Accept-Encoding", "identity")
+        if data is not None:
+            request.add_header("Content-Type", "application/json")
+        if self.token:
+            # the token cookie is Secure, so it is sent by hand rather than through a cookie jar
+            request.add_header("Cookie", f"token={self.token}")
+
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30, context=self.context) as response:
+                status, payload, headers = response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            status, payload, headers = e.code, e.read(), e.headers
+        except OSError:
+            self.results.add(name, time.perf_counter() - started, 0)
+            return 0, None
+        self.results.add(name, time.perf_counter() - started, status)
+
+        for cookie in headers.get_all("Set-Cookie") or []:
+            if cookie.startswith("token="):
+                self.token = cookie.split(";", 1)[0].split("=", 1)[1] or None
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+    def sign_up(self, username):
+        self.call("POST /api/signup", "POST", "/api/signup", {
+            "username": username,
+            "password": generate_dataset.BENCH_PASSWORD,
+            "email": f"{username}@example.com",
+            "phoneNumber": "207-555-0100",
+            "gender": self.rng.choice(["M", "F"]),
+            "birthDate": "2003-05-01",
+            "displayName": username,
+            "userType": "Renter",
+        })
+        status, _ = self.call("POST /api/login", "POST", "/api/login", {
+            "username": username,
+            "password": generate_dataset.BENCH_PASSWORD,
+        })
+        return status == 200
+
+    # A search with a random mix of filters, like the Properties page sends
+    def search_filters(self):
+        rng = self.rng
+        filters = {"sort": rng.choice(["rent_asc", "rent_asc", "rent_desc", "newest"])}
+        if rng.random() < 0.8:
+            filters["city"] = rng.choices(self.cities[0], self.cities[1])[0]
+        if rng.random() < 0.5:
+            filters["minRent"] = rng.choice([500, 800, 1000, 1200])
+        if rng.random() < 0.5:
+            filters["maxRent"] = rng.choice([1500, 2000, 2500, 3000])
+        if rng.random() < 0.3:
+            filters["minBeds"] = rng.choice([1, 2, 3])
+        if rng.random() < 0.2:
+            filters["minBaths"] = rng.choice([1, 2])
+        return filters
+
+    def flow(self):
+        rng = self.rng
+        filters = self.search_filters()
+        _, found = self.call("POST /api/properties", "POST", "/api/properties", filters)
+        properties = (found or {}).get("properties") or []
+        if found and found.get("nextCursor") and rng.random() < 0.3:
+            _, page = self.call("POST /api/properties", "POST", "/api/properties", dict(filters, cursor=found["nextCursor"]))
+            properties = (page or {}).get("properties") or properties
+
+        if properties:
+            property_id = rng.choice(properties)["id"]
+            self.call("GET /api/listing/<id>", "GET", f"/api/listing/{property_id}")
+            if rng.random() < 0.3:
+                self.call("POST /api/listing/<id>/review", "POST", f"/api/listing/{property_id}/review", {
+                    "stars": rng.randint(1, 5),
+                    "comments": "Load test review",
+                })
+
+        status, partner = self.call("GET /api/matchmake", "GET", "/api/matchmake")
+        if status == 200 and partner:
+            self.call("POST /api/matchmake/feedback", "POST", "/api/matchmake/feedback", {
+                "partner_id": partner["USER_ID"],
+                "liked": rng.random() < 0.5,
+            })
+            # partners are messaged by the USERNAME the matchmake response includes; one without it
+            # is skipped rather than counted as a failed send
+            other = partner.get("USERNAME")
+            if other:
+                self.call("POST /api/messages/send", "POST", "/api/messages/send", {
+                    "otherUsername": other,
+                    "text": rng.choice(generate_dataset.MESSAGE_TEXTS),
+                })
+                self.call("GET /api/messages/thread", "GET", "/api/messages/thread?otherUsername=" + urllib.parse.quote(other))
+
+        self.results.flow_done()
+
+
+# Each session signs up a new renter, logs in and runs `flows` flows as them
+def run_user(user, name, stop, flows, think_time):
+    session = 0
+    while not stop.is_set():
+        session += 1
+        if not user.sign_up(f"{name}_{session}"):
+            stop.wait(1)
+            continue
+        for _ in range(flows):
+            if stop.is_set():
+                break
+            user.flow()
+            if think_time:
+                stop.wait(user.rng.uniform(0, 2 * think_time))
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def summarize(results, seconds):
+    endpoints = {}
+    for name in sorted(results.latencies):
+        values = sorted(results.latencies[name])
+        count = len(values)
+        endpoints[name] = {
+            "count": count,
+            "rps": round(count / seconds, 2),
+            "errors": results.errors[name],
+            "errorRate": round(results.errors[name] / count, 4),
+            "meanMs": round(statistics.fmean(values), 2),
+            "p50Ms": round(percentile(values, 50), 2),
+            "p95Ms": round(percentile(values, 95), 2),
+            "p99Ms": round(percentile(values, 99), 2),
+            "maxMs": round(values[-1], 2),
+            "statuses": {str(status): n for status, n in sorted(results.statuses[name].items())},
+        }
+    requests = sum(e["count"] for e in endpoints.values())
+    errors = sum(e["errors"] for e in endpoints.values())
+    return {
+        "requests": requests,
+        "rps": round(requests / seconds, 2),
+        "errors": errors,
+        "errorRate": round(errors / requests, 4) if requests else 0.0,
+        "flows": results.flows,
+    }, endpoints
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=generate_dataset.ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_server(args):
+    env = dict(os.environ, DB_NAME=args.database)
+    server = subprocess.Popen(
+        [sys.executable, "-c", f"import app; app.app.run(host='127.0.0.1', port={args.port}, threaded=True, debug=False)"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit("the backend exited during startup")
+        try:
+            urllib.request.urlopen(base_url + "/api/cache-stats", timeout=2).close()
+            return server, base_url
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    sys.exit("the backend did not start within 30 seconds")
+
+
+def print_report(summary, endpoints, previous=None):
+    print(f"{summary['requests']} requests, {summary['rps']} req/s, {summary['flows']} flows, error rate {summary['errorRate']:.2%}")
+    print(f"{'endpoint':<32} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, e in endpoints.items():
+        line = f"{name:<32} {e['count']:>7} {e['rps']:>8} {e['p50Ms']:>8} {e['p95Ms']:>8} {e['p99Ms']:>8} {e['errors']:>7}"
+        before = (previous or {}).get("endpoints", {}).get(name)
+        if before:
+            line += f"   p95 {e['p95Ms'] - before['p95Ms']:+.1f} ms, req/s {e['rps'] - before['rps']:+.1f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend with realistic user flows.")
+    parser.add_argument("--database", default="MAINEPAD_BENCH", help="scratch database the backend runs against")
+    parser.add_argument("--properties", type=int, default=100000, help="dataset size passed to generate_dataset.py")
+    parser.add_argument("--reuse-database", action="store_true", help="keep the database from an earlier run")
+    parser.add_argument("--base-url", help="test an already running backend instead of starting one")
+    parser.add_argument("--insecure", action="store_true", help="with an https --base-url, skip certificate checks")
+    parser.add_argument("--port", type=int, default=5050, help="port for the started backend")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users running at once")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to measure")
+    parser.add_argument("--warmup", type=float, default=10, help="seconds to run before measuring")
+    parser.add_argument("--flows-per-session", type=int, default=5, help="flows each signed up user runs before the next signs up")
+    parser.add_argument("--think-time", type=float, default=0, help="mean pause in seconds between a user's flows")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="show the change against an earlier --json file")
+    args = parser.parse_args()
+
+    server = None
+    if args.base_url:
+        base_url = args.base_url.rstrip("/")
+    else:
+        if not args.reuse_database:
+            generate_dataset.prepare_database(args.database, args.properties, args.seed)
+        server, base_url = start_server(args)
+
+    context = ssl._create_unverified_context() if args.insecure else None
+    model = generate_dataset.SampleModel(generate_dataset.read_samples())
+    cities = ([city.name for city in model.cities], model.city_weights)
+
+    results = Results()
+    stop = threading.Event()
+    run_id = f"{int(time.time()) % 100000:05d}"
+    threads = []
+    for n in range(args.concurrency):
+        user = VirtualUser(base_url, results, random.Random(f"{args.seed}:{n}"), cities, context)
+        thread = threading.Thread(target=run_user, args=(user, f"load{run_id}_{n}", stop, args.flows_per_session, args.think_time), daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    try:
+        time.sleep(args.warmup)
+        results.recording = True
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        results.recording = False
+        measured = time.perf_counter() - started
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=30)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    summary, endpoints = summarize(results, measured)
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(summary, endpoints, previous)
+
+    if args.json:
+        settings = {key: value for key, value in vars(args).items() if key not in ("json", "compare")}
+        with open(args.json, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "startedAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "settings": settings,
+                "summary": summary,
+                "endpoints": endpoints,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# Measures what the ADD_PROP_PRICE_HISTORY trigger costs on the PROPERTY update path, with the
+# old trigger (an entry on every update) and the current one (an entry only when RENT_COST changes,
+# preceded by the price it changed from when the property has no history yet).
+#
+# Both runs replay the same mix of updates that update_property() makes: mostly CAN_RENT toggles and
+# some rent changes, each committed on its own. The script works in a scratch database that it
+# creates and drops, so it never touches the application's tables.
+#
+#   py benchmarks/price_history_trigger.py --properties 2000 --updates 5000 --rent-changes 0.1
+#
+# Connection settings come from the root .env (DB_HOST, DB_USER, DB_PASSWORD); the user needs
+# permission to create a database.
+#
+# No results have been recorded yet: the script has not been run against a MySQL server.
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+import mysql.connector
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRIGGERS = {
+    # the trigger as first written: every PROPERTY update adds a history entry
+    "before": """
+        CREATE TRIGGER ADD_PROP_PRICE_HISTORY
+        BEFORE UPDATE ON PROPERTY
+        FOR EACH ROW
+        BEGIN
+            INSERT INTO PROP_PRICE_HISTORY (PROPERTY_ID, RENT_COST)
+            VALUES (NEW.PROPERTY_ID, NEW.RENT_COST);
+        END
+    """,
+    # the current trigger (SQL/Functions and Triggers/ADD_PROP_PRICE_HISTORY.sql)
+    "after": """
+        CREATE TRIGGER ADD_PROP_PRICE_HISTORY
+        BEFORE UPDATE ON PROPERTY
+        FOR EACH ROW
+        BEGIN
+            IF NEW.RENT_COST <> OLD.RENT_COST THEN
+                IF NOT EXISTS (SELECT 1 FROM PROP_PRICE_HISTORY WHERE PROPERTY_ID = OLD.PROPERTY_ID) THEN
+                    INSERT INTO PROP_PRICE_HISTORY (PROPERTY_ID, RENT_COST)
+                    VALUES (OLD.PROPERTY_ID, OLD.RENT_COST);
+                END IF;
+                INSERT INTO PROP_PRICE_HISTORY (PROPERTY_ID, RENT_COST)
+                VALUES (NEW.PROPERTY_ID, NEW.RENT_COST);
+            END IF;
+        END
+    """,
+}
+
+# Only the columns the trigger and the updates touch
+TABLES = [
+    """
+    CREATE TABLE PROPERTY (
+        PROPERTY_ID INT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+        RENT_COST INT UNSIGNED NOT NULL,
+        CAN_RENT BOOL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE PROP_PRICE_HISTORY (
+        ENTRY_ID INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        PROPERTY_ID INT UNSIGNED NOT NULL,
+        RENT_COST INT UNSIGNED NOT NULL,
+        PRICE_START DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        INDEX IDX_PRICE_HISTORY_PROPERTY_START (PROPERTY_ID, PRICE_START),
+        FOREIGN KEY (PROPERTY_ID) REFERENCES PROPERTY (PROPERTY_ID)
+    )
+    """,
+]
+
+
+def connect():
+    return mysql.connector.connect(
+        host = os.getenv("DB_HOST"),
+        user = os.getenv("DB_USER"),
+        password = os.getenv("DB_PASSWORD"),
+        autocommit = True
+    )
+
+
+# The starting rents and the updates to replay as (property_id, column, value);
+# both triggers get the same ones
+def make_updates(seed, properties, updates, rent_changes):
+    rng = random.Random(seed)
+    initial = [rng.randrange(600, 3000, 25) for _ in range(properties)]
+    rents = dict(enumerate(initial, start=1))
+    plan = []
+    for _ in range(updates):
+        property_id = rng.randint(1, properties)
+        if rng.random() < rent_changes:
+            rents[property_id] += rng.choice((-50, -25, 25, 50))
+            plan.append((property_id, "RENT_COST", rents[property_id]))
+        else:
+            plan.append((property_id, "CAN_RENT", rng.randint(0, 1)))
+    return initial, plan
+
+
+def run(cur, trigger, initial, plan):
+    for sql in ("DROP TRIGGER IF EXISTS ADD_PROP_PRICE_HISTORY",
+                "DROP TABLE IF EXISTS PROP_PRICE_HISTORY",
+                "DROP TABLE IF EXISTS PROPERTY"):
+        cur.execute(sql)
+    for sql in TABLES:
+        cur.execute(sql)
+    cur.execute(TRIGGERS[trigger])
+
+    cur.executemany(
+        "INSERT INTO PROPERTY (RENT_COST, CAN_RENT) VALUES (%s, 0)",
+        [(rent,) for rent in initial],
+    )
+
+    timings = []
+    for property_id, column, value in plan:
+        started = time.perf_counter()
+        cur.execute(f"UPDATE PROPERTY SET {column} = %s WHERE PROPERTY_ID = %s", (value, property_id))
+        timings.append((time.perf_counter() - started) * 1000)
+
+    cur.execute("SELECT COUNT(*) FROM PROP_PRICE_HISTORY")
+    entries = cur.fetchone()[0]
+    cur.execute("ANALYZE TABLE PROP_PRICE_HISTORY")
+    cur.fetchall()
+    cur.execute(
+        """
+        SELECT DATA_LENGTH + INDEX_LENGTH
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'PROP_PRICE_HISTORY'
+        """
+    )
+    size = cur.fetchone()[0]
+
+    timings.sort()
+    return {
+        "trigger": trigger,
+        "updates": len(timings),
+        "totalSeconds": round(sum(timings) / 1000, 3),
+        "meanMs": round(statistics.fmean(timings), 3),
+        "p50Ms": round(timings[len(timings) // 2], 3),
+        "p95Ms": round(timings[int(len(timings) * 0.95)], 3),
+        "historyEntries": entries,
+        "historyBytes": int(size),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the PROPERTY update path with the old and current price history trigger.")
+    parser.add_argument("--properties", type=int, default=2000, help="properties to create")
+    parser.add_argument("--updates", type=int, default=5000, help="updates to replay per trigger")
+    parser.add_argument("--rent-changes", type=float, default=0.1, help="fraction of updates that change the rent")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", default="MAINEPAD_BENCH", help="scratch database, dropped afterwards")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    initial, plan = make_updates(args.seed, args.properties, args.updates, args.rent_changes)
+
+    db = connect()
+    cur = db.cursor()
+    cur.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+    cur.execute(f"USE `{args.database}`")
+    try:
+        results = [run(cur, trigger, initial, plan) for trigger in ("before", "after")]
+    finally:
+        cur.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        cur.close()
+        db.close()
+
+    print(f"{'trigger':<8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'entries':>9} {'bytes':>11}")
+    for r in results:
+        print(f"{r['trigger']:<8} {r['meanMs']:>9} {r['p50Ms']:>9} {r['p95Ms']:>9} {r['historyEntries']:>9} {r['historyBytes']:>11}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Micro-benchmark of turning search rows into a JSON response body: the row-shaping loop and
+# Flask's default JSON provider that get_properties()/get_property_deals() used before, against
+# serializers.py with the standard library encoder and, if it is installed, orjson.
+# Rows are synthetic and shaped like the MySQL results (Decimal and datetime values included),
+# so no database is needed.
+#
+#   py benchmarks/serialize_bench.py --rows 100 --repeat 2000
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "mainepadfinder-app", "backend"))
+import serializers  # noqa: E402
+
+
+def make_rows(count, seed):
+    rng = random.Random(seed)
+    listed = datetime(2025, 1, 1)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "PROPERTY_ID": i + 1,
+            "UNIT_LABEL": rng.choice([None, None, f"Apt {rng.randint(1, 40)}"]),
+            "RENT_COST": rng.randrange(600, 3000, 25),
+            "BEDROOMS": rng.choice([None, 0.0, 1.0, 2.0, 3.0]),
+            "BATHROOMS": rng.choice([None, 1.0, 1.5, 2.0]),
+            "CAN_RENT": rng.randint(0, 1),
+            "SQFT": rng.choice([None, rng.randint(300, 2000)]),
+            "CITY": rng.choice(["Portland", "Bangor", "Lewiston", "South Portland"]),
+            "STATE_CODE": "ME",
+            "STREET": f"{rng.randint(1, 999)} Main St",
+            "ZIPCODE": "04101",
+            "city_avg_rent": Decimal(rng.randrange(100000, 250000)) / 100,
+            "rent_pct_of_city_avg": Decimal(rng.randint(40, 99)),
+            "LISTED_AT": listed + timedelta(hours=i),
+        })
+    return rows
+
+
+# The loop get_properties() used before serializers.py. Both shapes also carry a DECIMAL and a
+# DATETIME column so the encoders' fallback for those types is part of the measurement.
+def old_shape(rows):
+    properties = []
+    for row in rows:
+        title = row["UNIT_LABEL"]
+        if not title:
+            pieces = []
+            if row["BEDROOMS"] is not None:
+                pieces.append(f"{row['BEDROOMS']} bed")
+            if row["BATHROOMS"] is not None:
+                pieces.append(f"{row['BATHROOMS']} bath")
+            title = " • ".join(pieces) if pieces else "Untitled unit"
+
+        properties.append({
+            "id": row["PROPERTY_ID"],
+            "title": title,
+            "rent": row["RENT_COST"],
+            "beds": row["BEDROOMS"],
+            "baths": row["BATHROOMS"],
+            "canRent": bool(row["CAN_RENT"]),
+            "sqft": row["SQFT"],
+            "city": row["CITY"],
+            "state": row["STATE_CODE"],
+            "addressLine1": row["STREET"],
+            "addressLine2": None,
+            "zipCode": row["ZIPCODE"],
+            "cityAvgRent": row["city_avg_rent"],
+            "listedAt": row["LISTED_AT"],
+        })
+    return properties
+
+
+def new_shape(rows):
+    cards = []
+    for row in rows:
+        card = serializers.property_card(row)
+        card["cityAvgRent"] = row["city_avg_rent"]
+        card["listedAt"] = row["LISTED_AT"]
+        cards.append(card)
+    return cards
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the old and new JSON serialization paths for search results.")
+    parser.add_argument("--rows", type=int, default=100, help="rows per response")
+    parser.add_argument("--repeat", type=int, default=2000, help="responses encoded per variant")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+    app = Flask(__name__)
+    flask_default = DefaultJSONProvider(app)
+    stdlib = json.JSONEncoder(default=serializers.to_json_value, separators=(",", ":"), ensure_ascii=False)
+
+    variants = {
+        "old loop + Flask default provider": lambda: flask_default.dumps({"properties": old_shape(rows)}).encode(),
+        "serializers + json": lambda: stdlib.encode({"properties": new_shape(rows)}).encode(),
+    }
+    if serializers.orjson is not None:
+        variants["serializers + orjson"] = lambda: serializers.dumps({"properties": new_shape(rows)})
+
+    with app.app_context():
+        results = []
+        for name, encode in variants.items():
+            seconds = min(timeit.repeat(encode, number=args.repeat, repeat=3))
+            results.append({
+                "variant": name,
+                "usPerResponse": round(seconds / args.repeat * 1e6, 1),
+                "bytes": len(encode()),
+            })
+
+    baseline = results[0]["usPerResponse"]
+    print(f"{args.rows} rows per response, best of 3 x {args.repeat}")
+    print(f"{'variant':<36} {'us/response':>12} {'speedup':>8} {'bytes':>8}")
+    for r in results:
+        r["speedup"] = round(baseline / r["usPerResponse"], 2)
+        print(f"{r['variant']:<36} {r['usPerResponse']:>12} {r['speedup']:>7}x {r['bytes']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,93 @@
-from flask import Flask, request, jsonify, g
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
+from werkzeug.local import LocalProxy
+import base64
+import json
+import math
 import os
-import mysql.connector
 import secrets
+import database
+from cache import TTLCache
+from search_index import PropertySearchIndex
+from cities import CityDirectory, city_key
+from messaging import create_broker, user_channel
+from trends import PriceTrends
+from versions import VersionCounters
+from compression import ResponseCompressor, etag_variants
+from metrics import RequestMetrics
+import serializers
 
 load_dotenv()
 
 app = Flask(__name__)
+app.json = serializers.JSONProvider(app)  # faster encoder for jsonify(), with Decimal/datetime support (see serializers.py)
 CORS(app, supports_credentials=True, origins=["https://localhost:5173"])  # allows frontend to communicate with backend
 
+# Per-route latency and SQL counts, served at /metrics (see metrics.py)
+request_metrics = RequestMetrics()
+request_metrics.init_app(app)
+
+# gzip/brotli for JSON responses above COMPRESS_MIN_SIZE bytes (see compression.py)
+compressor = ResponseCompressor()
+compressor.init_app(app)
+
 
 # Connects the backend to the MySQL database
+# Each request checks out its own connection and cursor from a bounded pool (see database.py),
+# and hands them back when the request is torn down. `db` and `cursor` resolve to the current
+# request's connection and cursor, so threaded servers never share one connection.
 # Author: Ashley Pike
-db = mysql.connector.connect(
-    host = os.getenv("DB_HOST"),
-    user = os.getenv("DB_USER"),
-    password = os.getenv("DB_PASSWORD"),
-    database = os.getenv("DB_NAME"),
-    ssl_ca = os.getenv("CA_PATH")
+database.init_app(app)
+db = LocalProxy(database.get_db)
+cursor = LocalProxy(database.get_cursor)
+
+# Returned when every pooled connection is busy for longer than DB_POOL_TIMEOUT
+@app.errorhandler(database.PoolExhaustedError)
+def pool_exhausted(e):
+    return jsonify({"error": "Server is busy, please try again."}), 503
+
+# Recently validated session tokens, mapped to (user_id, expires_at, role).
+# Entries live at most SESSION_CACHE_TTL seconds, so a logout handled by another
+# server process is picked up within that window.
+session_cache = TTLCache(
+    max_size=int(os.getenv("SESSION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("SESSION_CACHE_TTL", "60"))
 )
-cursor = db.cursor(dictionary=True)
+
+# Looks up a session token in the database along with the user's role
+def load_session(token, now):
+    cursor.execute(
+        """
+        SELECT
+            S.USER_ID,
+            S.EXPIRES_AT,
+            CASE
+                WHEN L.USER_ID IS NOT NULL THEN 'Landlord'
+                WHEN R.USER_ID IS NOT NULL THEN 'Renter'
+                ELSE 'Unknown'
+            END AS ROLE
+        FROM SESSIONS AS S
+        LEFT JOIN LANDLORD AS L ON L.USER_ID = S.USER_ID
+        LEFT JOIN RENTER AS R ON R.USER_ID = S.USER_ID
+        WHERE S.TOKEN = %s AND S.EXPIRES_AT > %s
+        """,
+        (token, now)
+    )
+    session_data = cursor.fetchone()
+
+    if not session_data:
+        return None
+
+    # EXPIRES_AT is stored as a UTC DATETIME without timezone information
+    expires_at = session_data["EXPIRES_AT"].replace(tzinfo=timezone.utc)
+    return (session_data["USER_ID"], expires_at, session_data["ROLE"])
 
 # This decorator wraps a function with a check to see if the user has a valid token before proceeding
+# The session cache is checked first so most requests skip the SESSIONS lookup
 # Author: Ashley Pike
 def login_required(f):
     @wraps(f)
@@ -37,13 +99,17 @@ def login_required(f):
         
         now = datetime.now(timezone.utc)
 
-        cursor.execute("SELECT USER_ID FROM SESSIONS WHERE TOKEN = %s AND EXPIRES_AT > %s", (token, now))
-        session_data = cursor.fetchone()
+        session_data = session_cache.get(token)
+        if session_data is None or session_data[1] <= now:
+            session_data = load_session(token, now)
 
-        if not session_data:
-            return jsonify({"error": "Invalid or expired session."}), 401
+            if not session_data:
+                session_cache.pop(token)
+                return jsonify({"error": "Invalid or expired session."}), 401
+
+            session_cache.set(token, session_data, ttl=(session_data[1] - now).total_seconds())
         
-        g.user_id = session_data["USER_ID"]
+        g.user_id, g.session_expires_at, g.user_role = session_data
 
         return f(*args, **kwargs)
     return decorated_function
@@ -105,6 +171,9 @@ def login():
 
     db.commit()
 
+    # INSERT_SESSION removes the user's previous sessions, so drop them from the cache too
+    session_cache.discard_if(lambda cached_token, session_data: session_data[0] == userID)
+
     return response, 200
 
 
@@ -119,11 +188,207 @@ def logout():
     if token:
         cursor.execute("DELETE FROM SESSIONS WHERE TOKEN = %s", (token,))
         db.commit()
+        session_cache.pop(token)
 
     response = jsonify({"message": "Logged out"})
     response.set_cookie("token", "", expires=0, secure=True, httponly=True, samesite="None")
     return response, 200
 
+# Encoded JSON bodies of recent /api/properties and /api/properties/deals responses, keyed on
+# the endpoint and its normalized filters. "weight" in the stats is the cached bytes.
+property_cache = TTLCache(
+    max_size=int(os.getenv("PROPERTY_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("PROPERTY_CACHE_TTL", "30")),
+    max_weight=int(os.getenv("PROPERTY_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    weigh=len
+)
+
+# Versions of the data behind /api/listing/<id>, /api/properties/deals and /api/profile/properties,
+# which their ETags are built from (see versions.py):
+#   ("property", id)    a listing's own row, rating and price trend
+#   ("landlords",)      any landlord's contact details, shown on every listing
+#   ("landlord", id)    the properties a landlord owns
+#   ("city", key)       the best deals of one city; ("cities",) changes with any of them
+data_versions = VersionCounters()
+
+# Cache-Control of each conditional endpoint, sent with both 200 and 304 responses.
+# Listings and a landlord's own properties are revalidated on every use; the best deals may be
+# reused for as long as the search cache keeps them.
+LISTING_CACHE_CONTROL = "public, no-cache"
+DEALS_CACHE_CONTROL = f"public, max-age={int(property_cache.ttl)}"
+PROFILE_PROPERTIES_CACHE_CONTROL = "private, no-cache"
+
+# Adds the ETag and Cache-Control headers to a response
+def conditional_headers(response, etag, cache_control):
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+# A 304 Not Modified response when the request's If-None-Match already names `etag`, otherwise None.
+# The client may hold the ETag of a compressed copy, which has the encoding appended.
+def not_modified(etag, cache_control):
+    for variant in etag_variants(etag):
+        if variant in request.if_none_match:
+            return conditional_headers(app.response_class(status=304), variant, cache_control)
+    return None
+
+# Canonical city names and aliases, used to turn a city filter into an exact or prefix match
+city_directory = CityDirectory()
+
+# Turns the "city" filter of a search into ("exact", canonical name) when it names a known city
+# or alias, ("prefix", text) otherwise, or None when there is no city filter.
+# Both forms can be answered from IDX_CITY, unlike the old LIKE '%city%'.
+def resolve_city_filter(city):
+    if not city or not str(city).strip():
+        return None
+
+    city_directory.ensure_loaded(cursor)
+    canonical = city_directory.resolve(city)
+    if canonical:
+        return ("exact", canonical)
+    return ("prefix", " ".join(str(city).split()))
+
+# Adds the SQL condition for a resolved city filter on `column` to sql/params
+def city_filter_sql(column, city_filter, params):
+    mode, value = city_filter
+    if mode == "exact":
+        params.append(value)
+        return f"{column} = %s"
+
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    params.append(escaped + "%")
+    return f"{column} LIKE %s"
+
+# Cache key part for a resolved city filter, so "  portland" and "Portland" share a cache entry
+def city_filter_key(city_filter):
+    if city_filter is None:
+        return None
+    return (city_filter[0], city_key(city_filter[1]))
+
+# Makes 1, 1.0 and "1" share a cache entry; anything that isn't a number is kept as is
+def normalize_number(value):
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return int(number) if number.is_integer() else number
+
+# Drops cached search and deal results that a change to a property in `city` could affect:
+# results for that exact city, results for a prefix of it, and unfiltered results.
+# The city's deals version is bumped too, so deal ETags clients hold stop matching.
+# With no city, the whole cache is cleared and every version is bumped.
+def invalidate_property_cache(city=None):
+    if city is None:
+        property_cache.clear()
+        data_versions.bump_all()
+        return
+
+    changed_city = city_key(city)
+    data_versions.bump(("city", changed_city), ("cities",))
+
+    def affected(key, body):
+        if key[1] is None:
+            return True
+        mode, value = key[1]
+        return changed_city == value if mode == "exact" else changed_city.startswith(value)
+
+    property_cache.discard_if(affected)
+
+# Suggests canonical city names starting with ?prefix= for the search box typeahead
+@app.get("/api/cities/suggest")
+def suggest_cities():
+    prefix = (request.args.get("prefix") or "").strip()
+    try:
+        limit = max(1, min(int(request.args.get("limit", 10)), 50))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    if not prefix:
+        return jsonify([]), 200
+
+    city_directory.ensure_loaded(cursor)
+    return jsonify(city_directory.suggest(prefix, limit)), 200
+
+# In-memory copy of PROPERTY ⨝ ADDRESS used to answer /api/properties without MySQL (see search_index.py)
+search_index = PropertySearchIndex()
+
+def json_body_response(body):
+    return app.response_class(body, status=200, mimetype="application/json")
+
+# Reports hit/miss counters for the in-process caches
+@app.get("/api/cache-stats")
+def cache_stats():
+    return jsonify({
+        "sessions": session_cache.stats(),
+        "properties": property_cache.stats(),
+        "searchIndex": dict(search_index.stats, rows=search_index.size, ready=search_index.is_ready()),
+        "messageStream": message_broker.stats(),
+        "priceTrends": price_trends.stats(),
+        "versions": data_versions.stats(),
+        "compression": compressor.stats()
+    }), 200
+
+# Prometheus metrics: per-route latency histograms, status codes, SQL statements per request,
+# database time and rows fetched, plus the connection pool and response compression totals.
+@app.get("/metrics")
+def metrics():
+    return request_metrics.response()
+
+request_metrics.add_value("db_pool_in_use", "gauge", "Pooled database connections checked out.", lambda: database.pool.stats["in_use"])
+request_metrics.add_value("db_pool_timeouts_total", "counter", "Requests that found no free database connection.", lambda: database.pool.stats["timeouts"])
+request_metrics.add_value(
+    "compression_bytes_saved_total", "counter", "Response bytes saved by gzip/brotli.",
+    lambda: sum(e["bytesIn"] - e["bytesOut"] for e in compressor.encodings.values())
+)
+request_metrics.add_value(
+    "compression_cpu_seconds_total", "counter", "CPU time spent compressing responses.",
+    lambda: sum(e["cpuSeconds"] for e in compressor.encodings.values())
+)
+
+# The slowest statements seen since startup, grouped by normalized SQL, with the routes that ran
+# them and the EXPLAIN plan of the first slow run: /api/admin/slow-queries?limit=20&order=total
+# Only accepted from the local machine.
+@app.get("/api/admin/slow-queries")
+def slow_queries_report():
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Forbidden"}), 403
+
+    order = request.args.get("order", "total")
+    if order not in ("total", "max", "count"):
+        return jsonify({"error": "order must be total, max or count"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 500))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    return jsonify({
+        "thresholdMs": database.slow_query_log.threshold_ms,
+        "queries": database.slow_query_log.report(limit, order)
+    }), 200
+
+# Lets the CSV importer (add_properties.py) clear cached search results after a bulk load.
+# Only accepted from the local machine.
+@app.post("/api/cache/invalidate")
+def invalidate_cache():
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Forbidden"}), 403
+
+    data = request.get_json(silent=True) or {}
+    cities = data.get("cities")
+
+    if cities:
+        for city in cities:
+            invalidate_property_cache(city)
+    else:
+        invalidate_property_cache()
+
+    # Bulk loads change too many rows to patch one by one, so reload the search index
+    search_index.refresh_in_background()
+
+    return jsonify({"message": "Cache invalidated"}), 200
+
 # This functions returns information about logged in user
 # Author: Ashley Pike
 @app.get("/api/me")
@@ -157,44 +422,80 @@ def get_prof_details():
     if not prof_details:
         return jsonify({"error": "Profile not found."}), 404
 
-    cursor.execute("SELECT USER_ID FROM LANDLORD WHERE USER_ID = %s", (g.user_id,))
-    isLandlord = cursor.fetchone()
-    prof_details["IS_LANDLORD"] = True if isLandlord else False
+    prof_details["IS_LANDLORD"] = get_user_role(g.user_id) == "Landlord"
     
     return jsonify(prof_details), 200
 
 # Retrieves information about the properties owned by the person currently logged in.
+# Answers 304 without a query while the landlord's properties are unchanged.
 # Author: Jeffrey Fosgate (Created December 6, 2025)
 @app.get("/api/profile/properties")
 @login_required
 def get_my_properties():
+    etag = data_versions.etag("profile-properties", ("landlord", g.user_id))
+    unchanged = not_modified(etag, PROFILE_PROPERTIES_CACHE_CONTROL)
+    if unchanged:
+        return unchanged
+
     cursor.execute("SELECT * FROM PROPERTY WHERE LANDLORD_ID = %s", (g.user_id,))
     my_properties = cursor.fetchall()
-    return jsonify(my_properties), 200
+    return conditional_headers(jsonify(my_properties), etag, PROFILE_PROPERTIES_CACHE_CONTROL), 200
 
 # Selects a matchmaking partner for the user currently logged in
+# The next eligible renter is picked in one query: users this user has already swiped on,
+# and users who have blocked this user, are skipped with index lookups on INTERUSER's primary key,
+# and RENTER_SETTINGS.GENDER_PREFERRED narrows the scan to IDX_USERS_GENDER.
+# MATCHMADE is 1 when the partner has already liked this user; USERNAME is what the
+# messaging endpoints take as otherUsername.
 # Author: Jeffrey Fosgate (Created December 7, 2025 -- Last Updated December 8, 2025)
 @app.get("/api/matchmake")
 @login_required
 def select_matchmaking_partner():
-    cursor.execute("SELECT USER_ID FROM USERS WHERE USER_ID != %s", (g.user_id,))
-    other_users = cursor.fetchall()
-    for user in [other_user["USER_ID"] for other_user in other_users]:
-        cursor.execute("SELECT * FROM INTERUSER WHERE RENTER_ID = %s AND CONNECTION_ID = %s AND SWIPED = 1", (user, g.user_id, ))
-        user_connection = cursor.fetchone()
-        if not user_connection:        
-            cursor.execute("SELECT PICTURE_URL, DISPLAY_NAME FROM USERS WHERE USER_ID = %s", (user, ))
-            other_user_account = cursor.fetchone()
-            other_user_account["MATCHMADE"] = 0
-            return jsonify(other_user_account), 200
-        else:
-            if not user_connection["BLOCKED"]:
-                cursor.execute("SELECT PICTURE_URL, DISPLAY_NAME FROM USERS WHERE USER_ID = %s", (user, ))
-                other_user_account = cursor.fetchone()
-                other_user_account["MATCHMADE"] = 1
-                return jsonify(other_user_account), 200
-            
-    return jsonify({"error": "Could not find a matchmaking partner."}), 404
+    cursor.execute("SELECT GENDER_PREFERRED FROM RENTER_SETTINGS WHERE USER_ID = %s", (g.user_id,))
+    settings = cursor.fetchone()
+    gender_preferred = settings["GENDER_PREFERRED"] if settings else None
+
+    sql = """
+        SELECT
+            U.USER_ID,
+            U.USERNAME,
+            U.PICTURE_URL,
+            U.DISPLAY_NAME,
+            EXISTS (
+                SELECT 1 FROM INTERUSER AS THEIRS
+                WHERE THEIRS.RENTER_ID = U.USER_ID
+                  AND THEIRS.CONNECTION_ID = %s
+                  AND THEIRS.SWIPED = 1
+                  AND THEIRS.BLOCKED = 0
+            ) AS MATCHMADE
+        FROM USERS AS U
+        JOIN RENTER AS R ON R.USER_ID = U.USER_ID
+        WHERE U.USER_ID != %s
+          AND NOT EXISTS (
+              SELECT 1 FROM INTERUSER AS MINE
+              WHERE MINE.RENTER_ID = %s AND MINE.CONNECTION_ID = U.USER_ID
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM INTERUSER AS THEIRS
+              WHERE THEIRS.RENTER_ID = U.USER_ID AND THEIRS.CONNECTION_ID = %s AND THEIRS.BLOCKED = 1
+          )
+    """
+    params = [g.user_id, g.user_id, g.user_id, g.user_id]
+
+    # '?' (or no setting) means the user has no gender preference
+    if gender_preferred and gender_preferred != "?":
+        sql += " AND U.GENDER = %s"
+        params.append(gender_preferred)
+
+    sql += " ORDER BY U.USER_ID LIMIT 1"
+
+    cursor.execute(sql, tuple(params))
+    other_user_account = cursor.fetchone()
+
+    if not other_user_account:
+        return jsonify({"error": "Could not find a matchmaking partner."}), 404
+
+    return jsonify(other_user_account), 200
 
 # Manages feedback provided by the matchmaker.
 # Author: Jeffrey Fosgate (Created December 8, 2025)
@@ -224,14 +525,17 @@ def matchmaking_feedback():
 
     return jsonify({"message": "Feedback received"}), 200
 
+# Price trends (up/down/flat and percent change) for search results and listings, read for
+# a whole page of properties in one query and cached per property (see trends.py)
+price_trends = PriceTrends()
+
 # Is the chosen property (prop_id) trending UP (0) or DOWN (1)? Return (-1) if this cannot be discerned due to insufficient data.
 # Author: Jeffrey Fosgate (December 7, 2025)
 def prop_price_trending(prop_id):
-    cursor.execute("SELECT * FROM PROP_PRICE_HISTORY WHERE PROPERTY_ID = %s ORDER BY PRICE_START DESC", prop_id)
-    prop_hist_data = cursor.fetchall()
-    if len(prop_hist_data) < 2:
+    trend = price_trends.get(cursor, prop_id)
+    if trend is None or trend["direction"] == "flat":
         return -1
-    elif prop_hist_data[0] > prop_hist_data[1]: # If this property's most recent price is higher than it was before...
+    elif trend["direction"] == "up": # If this property's most recent price is higher than it was before...
         return 0
     else:
         return 1
@@ -239,7 +543,11 @@ def prop_price_trending(prop_id):
     #Yunlong
 
 #check role
+#the role of the logged-in user is resolved together with the session in login_required
+#and kept on g, so role checks inside a request do not query LANDLORD/RENTER again
 def get_user_role(user_id: int) -> str:
+    if g.get("user_id") == user_id and g.get("user_role"):
+        return g.user_role
 
     # check Landlord
     cursor.execute("SELECT 1 FROM LANDLORD WHERE USER_ID = %s", (user_id,))
@@ -305,7 +613,8 @@ def add_property():
         return jsonify({"error": f"Missing fields: {', '.join(missing)}"}), 400
 
     street = data["street"]
-    city = data["city"]
+    city_directory.ensure_loaded(cursor)
+    city = city_directory.canonicalize(data["city"])
     state_code = data["stateCode"]
     zip_code = data["zipCode"]
     unit_label = data["unitLabel"]
@@ -353,11 +662,21 @@ def add_property():
             ),
         )
         property_id = cursor.lastrowid
+
+        # keep the materialized best deals for this city in step with the new listing
+        cursor.callproc("REFRESH_CITY_DEALS", (city,))
         db.commit()
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
 
+    # the search index is updated before the cached results are dropped, so a search that
+    # starts after the invalidation can't cache a result built from the old index
+    city_directory.add(city)
+    search_index.refresh_property(cursor, property_id)
+    invalidate_property_cache(city)
+    data_versions.bump(("landlord", g.user_id))
+
     return jsonify({"message": "Property created", "propertyId": property_id}), 201
 
 #Update property details, for rentcoset and canrent
@@ -394,11 +713,28 @@ def update_property(property_id: int):
     """
 
     cursor.execute(sql, tuple(params))
-    db.commit()
 
     if cursor.rowcount == 0:
+        db.commit()
         return jsonify({"error": "Property not found or not owned by this landlord."}), 404
 
+    cursor.execute(
+        "SELECT A.CITY FROM PROPERTY AS P JOIN ADDRESS AS A ON P.ADDR_ID = A.ADDR_ID WHERE P.PROPERTY_ID = %s",
+        (property_id,)
+    )
+    updated = cursor.fetchone()
+
+    # rent and availability both feed the city's average rent, so refresh that city's best deals
+    if updated:
+        cursor.callproc("REFRESH_CITY_DEALS", (updated["CITY"],))
+    db.commit()
+
+    # index and trends first, then the cached results (see add_property)
+    search_index.refresh_property(cursor, property_id)
+    price_trends.forget(property_id)
+    invalidate_property_cache(updated["CITY"] if updated else None)
+    data_versions.bump(("property", property_id), ("landlord", g.user_id))
+
     return jsonify({"message": "Property updated"}), 200
 
 #get user settings
@@ -482,11 +818,131 @@ def update_settings():
 
     db.commit()
 
+    # landlords' contact details are shown on their listings
+    if role == "Landlord" and any([email, phone_number, display_name]):
+        data_versions.bump(("landlords",))
+
     return jsonify({"message": "Settings updated"}), 200
 
 
+# Page sizes for /api/properties. Clients may ask for fewer rows, never more than the maximum.
+PROPERTY_PAGE_SIZE = 50
+PROPERTY_MAX_PAGE_SIZE = 100
+
+# Sort orders supported by /api/properties. Every order ends in PROPERTY_ID so it is stable,
+# and each one is served by an index (IDX_RENT_ID for rent, the primary key for newest).
+#   order by   - the ORDER BY clause
+#   after      - the keyset condition that continues after the last row of the previous page
+#   key        - the values from a row that the next page continues after
+#   key size   - how many values `key` returns, checked when a cursor is read back
+PROPERTY_SORTS = {
+    "rent_asc": {
+        "order by": "P.RENT_COST ASC, P.PROPERTY_ID ASC",
+        "after": "P.RENT_COST >= %s AND (P.RENT_COST > %s OR P.PROPERTY_ID > %s)",
+        "key": lambda row: [row["RENT_COST"], row["PROPERTY_ID"]],
+        "key size": 2,
+    },
+    "rent_desc": {
+        "order by": "P.RENT_COST DESC, P.PROPERTY_ID DESC",
+        "after": "P.RENT_COST <= %s AND (P.RENT_COST < %s OR P.PROPERTY_ID < %s)",
+        "key": lambda row: [row["RENT_COST"], row["PROPERTY_ID"]],
+        "key size": 2,
+    },
+    "newest": {
+        "order by": "P.PROPERTY_ID DESC",
+        "after": "P.PROPERTY_ID < %s",
+        "key": lambda row: [row["PROPERTY_ID"]],
+        "key size": 1,
+    },
+}
+
+# Turns the sort key of the last row on a page into an opaque cursor string
+def encode_page_cursor(sort, key):
+    raw = json.dumps({"sort": sort, "key": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+# Reads a cursor made by encode_page_cursor, raising ValueError if it is malformed
+# or was issued for a different sort order
+def decode_page_cursor(cursor_token, sort):
+    try:
+        padded = cursor_token + "=" * (-len(cursor_token) % 4)
+        decoded = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = decoded["key"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+    if decoded.get("sort") != sort or not isinstance(key, list):
+        raise ValueError("Cursor does not match the requested sort")
+    if len(key) != PROPERTY_SORTS[sort]["key size"]:
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in key):
+        raise ValueError("Invalid cursor")
+
+    return key
+
+# Expands a keyset key into the parameters used by a sort's "after" condition
+def page_cursor_params(sort, key):
+    if sort == "newest":
+        return [key[0]]
+    return [key[0], key[0], key[1]]
+
+# Runs a property search against MySQL. Returns up to `limit` rows in the order of `sort`,
+# continuing after `after_key` when given.
+def search_properties_sql(city_filter, min_rent, max_rent, min_beds, min_baths, sort, limit, after_key):
+    # Base query: join PROPERTY + ADDRESS, we add the WHERE condition when needed 
+    sql = """
+        SELECT 
+            P.PROPERTY_ID,
+            P.UNIT_LABEL,
+            P.RENT_COST,
+            P.BEDROOMS,
+            P.BATHROOMS,
+            P.CAN_RENT,
+            P.SQFT,
+            A.CITY,
+            A.STATE_CODE,
+            A.STREET,
+            A.ZIPCODE
+        FROM PROPERTY AS P
+        JOIN ADDRESS AS A
+        ON P.ADDR_ID = A.ADDR_ID
+        WHERE 1=1
+    """
+
+    params = []
+
+    if city_filter:
+        sql += " AND " + city_filter_sql("A.CITY", city_filter, params)
+
+    if min_rent is not None:
+        sql += " AND P.RENT_COST >= %s"
+        params.append(min_rent)
+
+    if max_rent is not None:
+        sql += " AND P.RENT_COST <= %s"
+        params.append(max_rent)
+
+    if min_beds is not None:
+        sql += " AND P.BEDROOMS >= %s"
+        params.append(min_beds)
+
+    if min_baths is not None:
+        sql += " AND P.BATHROOMS >= %s"
+        params.append(min_baths)
+
+    if after_key is not None:
+        sql += " AND " + PROPERTY_SORTS[sort]["after"]
+        params.extend(page_cursor_params(sort, after_key))
+
+    sql += " ORDER BY " + PROPERTY_SORTS[sort]["order by"] + " LIMIT %s"
+    params.append(limit)
+
+    cursor.execute(sql, tuple(params))
+    return cursor.fetchall()
+
 # This function retrieves property listings from the database, joining with address information
 # and applying filters based on the request body.
+# Results come back one page at a time: pass the returned nextCursor back as "cursor" to get the next page.
 # Author: Sophia Priola
 @app.post("/api/properties")
 def get_properties():
@@ -500,101 +956,125 @@ def get_properties():
         min_beds = data.get("minBeds")
         min_baths = data.get("minBaths")
 
-        # Base query: join PROPERTY + ADDRESS, we add the WHERE condition when needed 
-        sql = """
-            SELECT 
-                P.PROPERTY_ID,
-                P.UNIT_LABEL,
-                P.RENT_COST,
-                P.BEDROOMS,
-                P.BATHROOMS,
-                P.CAN_RENT,
-                P.SQFT,
-                A.CITY,
-                A.STATE_CODE,
-                A.STREET,
-                A.ZIPCODE
-            FROM PROPERTY AS P
-            JOIN ADDRESS AS A
-            ON P.ADDR_ID = A.ADDR_ID
-            WHERE 1=1
-        """
-
-        params = []
-
-        if city:
-            sql += " AND A.CITY LIKE %s"
-            params.append(f"%{city}%")
-
-        if min_rent is not None:
-            sql += " AND P.RENT_COST >= %s"
-            params.append(min_rent)
+        sort = data.get("sort") or "rent_asc"
+        if sort not in PROPERTY_SORTS:
+            return jsonify({"error": f"Unknown sort: {sort}"}), 400
 
-        if max_rent is not None:
-            sql += " AND P.RENT_COST <= %s"
-            params.append(max_rent)
+        try:
+            limit = int(data.get("limit") or PROPERTY_PAGE_SIZE)
+        except (TypeError, ValueError):
+            return jsonify({"error": "limit must be a number"}), 400
+        limit = max(1, min(limit, PROPERTY_MAX_PAGE_SIZE))
+
+        after_key = None
+        if data.get("cursor"):
+            try:
+                after_key = decode_page_cursor(str(data["cursor"]), sort)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+        city_filter = resolve_city_filter(city)
+
+        cache_key = (
+            "properties",
+            city_filter_key(city_filter),
+            normalize_number(min_rent),
+            normalize_number(max_rent),
+            normalize_number(min_beds),
+            normalize_number(min_baths),
+            sort,
+            limit,
+            data.get("cursor") or None,
+        )
+        # read before the search, so the result isn't cached if an invalidation runs meanwhile
+        generation = property_cache.generation
+        cached = property_cache.get(cache_key)
+        if cached is not None:
+            return json_body_response(cached)
+
+        # Ask for one extra row to find out whether another page exists.
+        # The in-memory index answers the search when it is loaded and fresh, otherwise MySQL does
+        # (and a rebuild of the index is started in the background).
+        rows = None
+        if search_index.is_ready():
+            try:
+                rows = search_index.search(
+                    city_filter, min_rent, max_rent, min_beds, min_baths, sort, limit + 1, after_key
+                )
+            except (TypeError, ValueError):
+                rows = None
+        else:
+            search_index.refresh_in_background()
 
-        if min_beds is not None:
-            sql += " AND P.BEDROOMS >= %s"
-            params.append(min_beds)
+        if rows is None:
+            search_index.record_fallback()
+            rows = search_properties_sql(
+                city_filter, min_rent, max_rent, min_beds, min_baths, sort, limit + 1, after_key
+            )
 
-        if min_baths is not None:
-            sql += " AND P.BATHROOMS >= %s"
-            params.append(min_baths)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_page_cursor(sort, PROPERTY_SORTS[sort]["key"](rows[-1]))
 
-        cursor.execute(sql, tuple(params))
-        rows = cursor.fetchall()
+        # one query for the whole page's price trends (or none if they are all cached)
+        trends = price_trends.get_many(cursor, [row["PROPERTY_ID"] for row in rows])
 
         # Shape results into what the frontend expects
-        properties = []
-        for row in rows:
-            title = row["UNIT_LABEL"]
-            if not title:
-                pieces = []
-                if row["BEDROOMS"] is not None:
-                    pieces.append(f"{row['BEDROOMS']} bed")
-                if row["BATHROOMS"] is not None:
-                    pieces.append(f"{row['BATHROOMS']} bath")
-                title = " • ".join(pieces) if pieces else "Untitled unit"
-
-            properties.append({
-                "id": row["PROPERTY_ID"],
-                "title": title,
-                "rent": row["RENT_COST"],
-                "beds": row["BEDROOMS"],
-                "baths": row["BATHROOMS"],
-                "canRent": bool(row["CAN_RENT"]),
-                "sqft": row["SQFT"],
-                "city": row["CITY"],
-                "state": row["STATE_CODE"],
-                "addressLine1": row["STREET"],
-                "addressLine2": None,         
-                "zipCode": row["ZIPCODE"],
-            })
+        properties = [serializers.property_card(row, trends.get(row["PROPERTY_ID"])) for row in rows]
 
-        return jsonify(properties), 200
+        body = serializers.dumps({"properties": properties, "nextCursor": next_cursor})
+        property_cache.set(cache_key, body, generation=generation)
+        return json_body_response(body)
 
     except Exception as e:
         print("Error in /api/properties:", e)
         return jsonify({"error": "Failed to load properties"}), 500
     
 
-# This function retrieves a single property listing along with its landlord information
-# Author: Sophia Priola
-@app.get("/api/listing/<int:property_id>")
-def get_listing_with_landlord(property_id):
-    try:
-        # Call the stored procedure
-        cursor.execute("CALL GET_LISTING_WITH_LANDLORD(%s)", (property_id,))
-        row = cursor.fetchone()
+# Most listings /api/listings returns per request
+LISTINGS_MAX_IDS = 100
 
-        while cursor.nextset():
-            pass
+# Loads listings with their landlord's contact information in one query, keyed by PROPERTY_ID.
+# The rating is PROPERTY.PROPERTY_RATING, which the UPDATE_PROPERTY_RATING trigger keeps
+# current, so no per-row AVG(STARS) is needed, and price trends are read for all ids together.
+# Ids that don't exist are left out.
+def load_listings(property_ids):
+    if not property_ids:
+        return {}
 
-        if not row:
-            return jsonify({"error": "Listing not found"}), 404
+    placeholders = ", ".join(["%s"] * len(property_ids))
+    cursor.execute(
+        f"""
+        SELECT
+            P.PROPERTY_ID,
+            P.UNIT_LABEL,
+            P.RENT_COST,
+            P.BEDROOMS,
+            P.BATHROOMS,
+            P.SQFT,
+            P.CAN_RENT,
+            P.PROPERTY_RATING,
+            A.CITY,
+            A.STATE_CODE,
+            A.ZIPCODE,
+            -- landlord contact information, NULL for scraped properties
+            U.DISPLAY_NAME AS LANDLORD_NAME,
+            U.EMAIL        AS LANDLORD_EMAIL,
+            U.PHONE_NUMBER AS LANDLORD_PHONE
+        FROM PROPERTY AS P
+        JOIN ADDRESS AS A
+          ON P.ADDR_ID = A.ADDR_ID
+        LEFT JOIN USERS AS U
+          ON U.USER_ID = P.LANDLORD_ID
+        WHERE P.PROPERTY_ID IN ({placeholders})
+        """,
+        tuple(property_ids),
+    )
 
-        result = {
+    listings = {}
+    for row in cursor.fetchall():
+        listings[row["PROPERTY_ID"]] = {
             "id": row["PROPERTY_ID"],
             "unitLabel": row["UNIT_LABEL"],
             "rent": row["RENT_COST"],
@@ -604,35 +1084,312 @@ def get_listing_with_landlord(property_id):
             "canRent": row["CAN_RENT"],   # 0 = available, 1 = not
             "city": row["CITY"],
             "state": row["STATE_CODE"],
-            "zip": row.get("ZIP_CODE"),
-            "avgRating": row.get("AVG_RATING"),
-            "landlordName": row.get("LANDLORD_NAME"),
-            "landlordEmail": row.get("LANDLORD_EMAIL"),
-            "landlordPhone": row.get("LANDLORD_PHONE"),
+            "zip": row["ZIPCODE"],
+            "avgRating": row["PROPERTY_RATING"],
+            "landlordName": row["LANDLORD_NAME"],
+            "landlordEmail": row["LANDLORD_EMAIL"],
+            "landlordPhone": row["LANDLORD_PHONE"],
         }
 
-        return jsonify(result), 200
+    trends = price_trends.get_many(cursor, list(listings))
+    for property_id, listing in listings.items():
+        listing["trend"] = trends[property_id]
+    return listings
+
+# This function retrieves a single property listing along with its landlord information
+# Answers 304 without a query while the listing and landlord contact details are unchanged.
+# Author: Sophia Priola
+@app.get("/api/listing/<int:property_id>")
+def get_listing_with_landlord(property_id):
+    try:
+        etag = data_versions.etag("listing", ("property", property_id), ("landlords",))
+        unchanged = not_modified(etag, LISTING_CACHE_CONTROL)
+        if unchanged:
+            return unchanged
+
+        listing = load_listings([property_id]).get(property_id)
+
+        if not listing:
+            return jsonify({"error": "Listing not found"}), 404
+
+        return conditional_headers(jsonify(listing), etag, LISTING_CACHE_CONTROL), 200
 
     # If there are errors we print the error message 
     except Exception as e:
         print("Error in /api/listing/<id>:", e)
         return jsonify({"error": "Failed to load listing"}), 500
 
+# Retrieves many listings at once, e.g. a page of property cards: /api/listings?ids=1,2,3
+# Listings come back in the order the ids were given; ids with no listing are reported in "missing"
+@app.get("/api/listings")
+def get_listings():
+    raw_ids = [part.strip() for part in (request.args.get("ids") or "").split(",") if part.strip()]
+    if not raw_ids:
+        return jsonify({"error": "Missing ids parameter"}), 400
+    if not all(part.isdigit() for part in raw_ids):
+        return jsonify({"error": "ids must be a comma-separated list of property ids"}), 400
+
+    property_ids = list(dict.fromkeys(int(part) for part in raw_ids))
+    if len(property_ids) > LISTINGS_MAX_IDS:
+        return jsonify({"error": f"At most {LISTINGS_MAX_IDS} ids per request"}), 400
+
+    try:
+        listings = load_listings(property_ids)
+    except Exception as e:
+        print("Error in /api/listings:", e)
+        return jsonify({"error": "Failed to load listings"}), 500
+
+    return jsonify({
+        "listings": [listings[i] for i in property_ids if i in listings],
+        "missing": [i for i in property_ids if i not in listings]
+    }), 200
+
+
+# Number of points /api/listing/<id>/price-history returns by default, and at most
+PRICE_HISTORY_BUCKETS = 50
+PRICE_HISTORY_MAX_BUCKETS = 500
+
+# Reads an optional ISO date or date-time query parameter, raising ValueError if it is not one.
+# A value with a UTC offset is converted to UTC; the result is naive, like the stored times.
+def datetime_arg(name):
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.replace(tzinfo=None)
+
+# Returns a property's price history between `from` and `to`, downsampled to at most `buckets` points,
+# so a chart gets the same amount of data however long the history is.
+# The range is split into equal buckets; each point gives the price at the end of its bucket and
+# the lowest and highest price in effect during it. Buckets with no price change are left out,
+# the price simply carries over from the previous point (or from startPrice).
+# Every read is a range on IDX_PRICE_HISTORY_PROPERTY_START (PROPERTY_ID, PRICE_START).
+@app.get("/api/listing/<int:property_id>/price-history")
+def get_price_history(property_id):
+    try:
+        start = datetime_arg("from")
+        end = datetime_arg("to")
+        buckets = min(int_arg("buckets") or PRICE_HISTORY_BUCKETS, PRICE_HISTORY_MAX_BUCKETS)
+    except ValueError:
+        return jsonify({"error": "from and to must be ISO dates and buckets a whole number"}), 400
+
+    try:
+        cursor.execute(
+            """
+            SELECT P.PROPERTY_ID, MIN(H.PRICE_START) AS FIRST_START, MAX(H.PRICE_START) AS LAST_START
+            FROM PROPERTY AS P
+            LEFT JOIN PROP_PRICE_HISTORY AS H ON H.PROPERTY_ID = P.PROPERTY_ID
+            WHERE P.PROPERTY_ID = %s
+            GROUP BY P.PROPERTY_ID
+            """,
+            (property_id,),
+        )
+        bounds = cursor.fetchone()
+        if not bounds:
+            return jsonify({"error": "Listing not found"}), 404
+
+        if bounds["FIRST_START"] is None:
+            return jsonify({
+                "propertyId": property_id, "from": None, "to": None,
+                "bucketSeconds": None, "startPrice": None, "points": []
+            }), 200
+
+        # the default range is the whole history (`to` is exclusive)
+        start = start or bounds["FIRST_START"]
+        end = end or bounds["LAST_START"] + timedelta(seconds=1)
+        if end <= start:
+            return jsonify({"error": "to must be after from"}), 400
+
+        width = max(1, math.ceil((end - start).total_seconds() / buckets))
+
+        # the price in effect when the range starts
+        cursor.execute(
+            """
+            SELECT RENT_COST
+            FROM PROP_PRICE_HISTORY
+            WHERE PROPERTY_ID = %s AND PRICE_START < %s
+            ORDER BY PRICE_START DESC, ENTRY_ID DESC
+            LIMIT 1
+            """,
+            (property_id, start),
+        )
+        before = cursor.fetchone()
+        start_price = before["RENT_COST"] if before else None
+
+        # one row per bucket that has entries: its lowest, highest and last price
+        cursor.execute(
+            """
+            SELECT
+                BUCKET,
+                COUNT(*) AS CHANGES,
+                MIN(RENT_COST) AS MIN_RENT,
+                MAX(RENT_COST) AS MAX_RENT,
+                MAX(LAST_RENT) AS LAST_RENT
+            FROM (
+                SELECT
+                    BUCKET,
+                    RENT_COST,
+                    FIRST_VALUE(RENT_COST) OVER (
+                        PARTITION BY BUCKET ORDER BY PRICE_START DESC, ENTRY_ID DESC
+                    ) AS LAST_RENT
+                FROM (
+                    SELECT
+                        FLOOR(TIMESTAMPDIFF(SECOND, %s, PRICE_START) / %s) AS BUCKET,
+                        RENT_COST,
+                        PRICE_START,
+                        ENTRY_ID
+                    FROM PROP_PRICE_HISTORY
+                    WHERE PROPERTY_ID = %s AND PRICE_START >= %s AND PRICE_START < %s
+                ) AS ENTRIES
+            ) AS RANKED
+            GROUP BY BUCKET
+            ORDER BY BUCKET
+            """,
+            (start, width, property_id, start, end),
+        )
+
+        points = []
+        price = start_price
+        for row in cursor.fetchall():
+            bucket_start = start + timedelta(seconds=width * int(row["BUCKET"]))
+            bucket_end = min(bucket_start + timedelta(seconds=width), end)
+
+            # the price carried into the bucket was in effect until its first change
+            low, high = row["MIN_RENT"], row["MAX_RENT"]
+            if price is not None:
+                low, high = min(low, price), max(high, price)
+
+            price = row["LAST_RENT"]
+            points.append({
+                "start": bucket_start.isoformat(),
+                "end": bucket_end.isoformat(),
+                "price": price,
+                "low": low,
+                "high": high,
+                "changes": row["CHANGES"],
+            })
 
-# This function retrieves 'best deal' properties from the BEST_DEAL_PROPERTIES view
+        return jsonify({
+            "propertyId": property_id,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "bucketSeconds": width,
+            "startPrice": start_price,
+            "points": points
+        }), 200
+
+    except Exception as e:
+        print("Error in /api/listing/<id>/price-history:", e)
+        return jsonify({"error": "Failed to load price history"}), 500
+
+# Returns a city's average, lowest and highest recorded rent per month from PRICE_ROLLUP_MONTHLY,
+# which the ADD_PRICE_ROLLUP trigger keeps up to date, optionally for one bedroom count
+# (0 = studio, -1 = unknown). Reads one primary key range instead of the price history.
+@app.get("/api/price-history/monthly")
+def get_monthly_prices():
+    city = (request.args.get("city") or "").strip()
+    if not city:
+        return jsonify({"error": "Missing city parameter"}), 400
+
+    beds = request.args.get("beds")
+    try:
+        beds = int(beds) if beds not in (None, "") else None
+        start = datetime_arg("from")
+        end = datetime_arg("to")
+    except ValueError:
+        return jsonify({"error": "beds must be a whole number and from and to ISO dates"}), 400
+
+    try:
+        city_directory.ensure_loaded(cursor)
+        city = city_directory.canonicalize(city)
+
+        sql = """
+            SELECT
+                MONTH_START,
+                SUM(ENTRIES) AS ENTRIES,
+                SUM(RENT_SUM) AS RENT_SUM,
+                MIN(RENT_MIN) AS RENT_MIN,
+                MAX(RENT_MAX) AS RENT_MAX
+            FROM PRICE_ROLLUP_MONTHLY
+            WHERE CITY = %s
+        """
+        params = [city]
+        if beds is not None:
+            sql += " AND BEDROOMS = %s"
+            params.append(beds)
+        if start is not None:
+            sql += " AND MONTH_START >= %s"
+            params.append(start.date().replace(day=1))
+        if end is not None:
+            sql += " AND MONTH_START <= %s"
+            params.append(end.date())
+        sql += " GROUP BY MONTH_START ORDER BY MONTH_START"
+
+        cursor.execute(sql, tuple(params))
+
+        months = []
+        for row in cursor.fetchall():
+            months.append({
+                "month": row["MONTH_START"].strftime("%Y-%m"),
+                "entries": int(row["ENTRIES"]),
+                "avgRent": round(float(row["RENT_SUM"]) / int(row["ENTRIES"]), 2),
+                "minRent": row["RENT_MIN"],
+                "maxRent": row["RENT_MAX"],
+            })
+
+        return jsonify({"city": city, "bedrooms": beds, "months": months}), 200
+
+    except Exception as e:
+        print("Error in /api/price-history/monthly:", e)
+        return jsonify({"error": "Failed to load monthly prices"}), 500
+
+# This function retrieves 'best deal' properties from the BEST_DEALS table
+# BEST_DEALS is a materialized copy of the BEST_DEAL_PROPERTIES view, refreshed per city by
+# REFRESH_CITY_DEALS whenever a property is added or its rent or availability changes,
+# so this is an index range read on IDX_DEALS_CITY_PCT (or IDX_DEALS_PCT without a city)
 # Author: Sophia Priola 
-@app.route("/api/properties/deals", methods=["POST"])
+@app.route("/api/properties/deals", methods=["GET", "POST"])
 def get_property_deals():
     """
-    Return 'best deal' properties from BEST_DEAL_PROPERTIES view.
-    Optional JSON body:
+    Return 'best deal' properties from the BEST_DEALS table.
+    Optional JSON body (POST) or query string (GET):
     {
-        "city": "Portland"   # if given, limit to that city (LIKE %city%)
+        "city": "Portland"   # if given, limit to that city (or cities starting with it)
     }
+    GET responses carry an ETag, and If-None-Match is answered with 304 while the
+    city's deals are unchanged.
     """
     try:
-        data = request.get_json(silent=True) or {}
-        city = data.get("city")
+        if request.method == "GET":
+            city = request.args.get("city")
+        else:
+            data = request.get_json(silent=True) or {}
+            city = data.get("city")
+
+        city_filter = resolve_city_filter(city)
+
+        # The cache generation and the ETag are both taken before the query. If the deals change
+        # while it runs, the body is returned but not cached, so it is never served later under
+        # a newer ETag.
+        generation = property_cache.generation
+
+        # an exact city's deals only change with that city; other filters can span many cities
+        if city_filter and city_filter[0] == "exact":
+            version_key = ("city", city_key(city_filter[1]))
+        else:
+            version_key = ("cities",)
+        etag = data_versions.etag("deals", version_key)
+        if request.method == "GET":
+            unchanged = not_modified(etag, DEALS_CACHE_CONTROL)
+            if unchanged:
+                return unchanged
+
+        cache_key = ("deals", city_filter_key(city_filter))
+        cached = property_cache.get(cache_key)
+        if cached is not None:
+            return conditional_headers(json_body_response(cached), etag, DEALS_CACHE_CONTROL)
 
         sql = """
             SELECT
@@ -647,45 +1404,24 @@ def get_property_deals():
                 STATE_CODE,
                 city_avg_rent,
                 rent_pct_of_city_avg
-            FROM BEST_DEAL_PROPERTIES
+            FROM BEST_DEALS
         """
         params = []
 
-        if city:
-            sql += " WHERE CITY LIKE %s"
-            params.append(f"%{city}%")
+        if city_filter:
+            sql += " WHERE " + city_filter_sql("CITY", city_filter, params)
 
         sql += " ORDER BY rent_pct_of_city_avg ASC, RENT_COST ASC LIMIT 50"
 
         cursor.execute(sql, tuple(params))
         rows = cursor.fetchall()
 
-        deals = []
-        for row in rows:
-            title = row["UNIT_LABEL"]
-            if not title:
-                pieces = []
-                if row["BEDROOMS"] is not None:
-                    pieces.append(f"{row['BEDROOMS']} bed")
-                if row["BATHROOMS"] is not None:
-                    pieces.append(f"{row['BATHROOMS']} bath")
-                title = " • ".join(pieces) if pieces else "Untitled unit"
-
-            deals.append({
-                "id": row["PROPERTY_ID"],
-                "title": title,
-                "rent": row["RENT_COST"],
-                "beds": row["BEDROOMS"],
-                "baths": row["BATHROOMS"],
-                "canRent": bool(row["CAN_RENT"]),
-                "sqft": row["SQFT"],
-                "city": row["CITY"],
-                "state": row["STATE_CODE"],
-                "cityAvgRent": row["city_avg_rent"],
-                "rentPctOfCityAvg": row["rent_pct_of_city_avg"],
-            })
+        deals = [serializers.deal_card(row) for row in rows]
 
-        return jsonify(deals), 200
+        body = serializers.dumps(deals)
+        if data_versions.etag("deals", version_key) == etag:
+            property_cache.set(cache_key, body, generation=generation)
+        return conditional_headers(json_body_response(body), etag, DEALS_CACHE_CONTROL)
 
     except Exception as e:
         print("Error in /api/properties/deals:", e)
@@ -717,6 +1453,8 @@ def create_or_update_review(property_id):
 
         user_id = g.user_id  # from login_required
 
+        # The UPDATE_PROPERTY_RATING triggers adjust PROPERTY_RATING on both the insert
+        # and the update path of this statement
         cursor.execute(
             """
             INSERT INTO REVIEW (USER_ID, PROPERTY_ID, COMMENTS, STARS)
@@ -727,15 +1465,76 @@ def create_or_update_review(property_id):
             """,
             (user_id, property_id, comments, stars_val),
         )
+        cursor.execute("SELECT LANDLORD_ID FROM PROPERTY WHERE PROPERTY_ID = %s", (property_id,))
+        owner = cursor.fetchone()
         db.commit()
 
+        # the new rating shows on the listing and on its landlord's profile
+        data_versions.bump(("property", property_id))
+        if owner and owner["LANDLORD_ID"] is not None:
+            data_versions.bump(("landlord", owner["LANDLORD_ID"]))
+
         return jsonify({"message": "Review saved successfully"}), 201
 
     except Exception as e:
         print("Error in /api/listing/<id>/review:", e)
         return jsonify({"error": "Failed to save review"}), 500
     
+# Page sizes for /api/messages/thread
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_MAX_PAGE_SIZE = 200
+
+# Columns every message read selects; the thread and the stream return messages in the same shape
+MESSAGE_COLUMNS = """
+    SELECT 
+        M.MSG_ID,
+        M.SENDER_ID,
+        M.RECIPIENT_ID,
+        M.MESSAGE_TEXTS,
+        M.TIME_STAMP,
+        SU.USERNAME AS SENDER_USERNAME
+    FROM MESSAGE AS M
+    JOIN USERS AS SU ON SU.USER_ID = M.SENDER_ID
+"""
+
+# Shapes a MESSAGE row for the frontend (isMine is added per viewer)
+def message_json(row):
+    return {
+        "msgId": row["MSG_ID"],
+        "text": row["MESSAGE_TEXTS"],
+        "senderId": row["SENDER_ID"],
+        "recipientId": row["RECIPIENT_ID"],
+        "senderUsername": row["SENDER_USERNAME"],
+        "sentAt": row["TIME_STAMP"].isoformat(),
+    }
+
+# New messages are published to the sender's and recipient's channels and pushed
+# to their open /api/messages/stream connections (see messaging.py)
+message_broker = create_broker()
+
+# Seconds between keep-alive comments on an idle stream; also how often the
+# stream checks whether the session has expired
+MESSAGE_STREAM_KEEPALIVE = 25
+
+# Most missed messages replayed when a stream reconnects with Last-Event-ID
+MESSAGE_STREAM_CATCHUP = 200
+
+# Reads an optional non-negative integer query parameter, raising ValueError if it is not one
+def int_arg(name):
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    number = int(value)
+    if number < 0:
+        raise ValueError(name)
+    return number
+
 # Return a conersation between the logged-in user and another user 
+# Messages come back oldest first, one page at a time:
+#   no paging parameters  - the latest `limit` messages
+#   before=<msgId>        - the `limit` messages just before that message (to scroll back)
+#   sinceMsgId=<msgId>    - messages newer than that message (to poll for new ones)
+# Both are keyset reads on IDX_MESSAGE_CONVERSATION (USER_LO, USER_HI, MSG_ID)
 # Author: Sophia Priola
 @app.get("/api/messages/thread")
 @login_required
@@ -747,6 +1546,18 @@ def get_message_thread():
     if not other_username:
         return jsonify({"error": "Missing username parameter"}), 400
 
+    try:
+        before = int_arg("before")
+        since_msg_id = int_arg("sinceMsgId")
+        limit = int_arg("limit") or MESSAGE_PAGE_SIZE
+    except ValueError:
+        return jsonify({"error": "before, sinceMsgId and limit must be whole numbers"}), 400
+
+    if before is not None and since_msg_id is not None:
+        return jsonify({"error": "Use either before or sinceMsgId, not both"}), 400
+
+    limit = min(limit, MESSAGE_MAX_PAGE_SIZE)
+
     # look up the other user by username
     cursor.execute(
         "SELECT USER_ID, USERNAME FROM USERS WHERE USERNAME = %s",
@@ -759,39 +1570,33 @@ def get_message_thread():
     other_user_id = other["USER_ID"]
 
     # pull messages in both directions between these two users
-    cursor.execute(
-        """
-        SELECT 
-            M.MSG_ID,
-            M.SENDER_ID,
-            M.RECIPIENT_ID,
-            M.MESSAGE_TEXTS,
-            M.TIME_STAMP,
-            SU.USERNAME AS SENDER_USERNAME
-        FROM MESSAGE AS M
-        JOIN USERS AS SU ON SU.USER_ID = M.SENDER_ID
-        WHERE 
-            (M.SENDER_ID = %s AND M.RECIPIENT_ID = %s)
-            OR
-            (M.SENDER_ID = %s AND M.RECIPIENT_ID = %s)
-        ORDER BY M.TIME_STAMP ASC
-        """,
-        (current_user_id, other_user_id, other_user_id, current_user_id),
-    )
+    # USER_LO/USER_HI are the smaller and larger of SENDER_ID and RECIPIENT_ID,
+    # so both directions of the conversation share one index range
+    sql = MESSAGE_COLUMNS + " WHERE M.USER_LO = %s AND M.USER_HI = %s"
+    params = [min(current_user_id, other_user_id), max(current_user_id, other_user_id)]
+
+    if since_msg_id is not None:
+        sql += " AND M.MSG_ID > %s ORDER BY M.MSG_ID ASC LIMIT %s"
+        params += [since_msg_id, limit]
+    else:
+        if before is not None:
+            sql += " AND M.MSG_ID < %s"
+            params.append(before)
+        sql += " ORDER BY M.MSG_ID DESC LIMIT %s"
+        params.append(limit)
 
+    cursor.execute(sql, tuple(params))
     rows = cursor.fetchall()
 
+    # pages read backwards are flipped so messages are always oldest first
+    if since_msg_id is None:
+        rows.reverse()
+
     messages = []
     for row in rows:
-        messages.append({
-            "msgId": row["MSG_ID"],
-            "text": row["MESSAGE_TEXTS"],
-            "senderId": row["SENDER_ID"],
-            "recipientId": row["RECIPIENT_ID"],
-            "senderUsername": row["SENDER_USERNAME"],
-            "sentAt": row["TIME_STAMP"].isoformat(),
-            "isMine": row["SENDER_ID"] == current_user_id,
-        })
+        message = message_json(row)
+        message["isMine"] = row["SENDER_ID"] == current_user_id
+        messages.append(message)
 
     return jsonify(messages), 200
 
@@ -821,6 +1626,25 @@ def send_message():
         return jsonify({"error": "Recipient not found"}), 404
 
     recipient_id = other["USER_ID"]
+    user_lo, user_hi = min(current_user_id, recipient_id), max(current_user_id, recipient_id)
+
+    # a message to yourself is never unread
+    unread = recipient_id != current_user_id
+    unread_lo = int(unread and recipient_id == user_lo)
+    unread_hi = int(unread and recipient_id == user_hi)
+
+    # bump the conversation's unread counter first; this locks the CONVERSATION row, the same
+    # lock mark_messages_read takes first, so the two can't deadlock on MESSAGE
+    cursor.execute(
+        """
+        INSERT INTO CONVERSATION (USER_LO, USER_HI, UNREAD_LO, UNREAD_HI)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            UNREAD_LO = UNREAD_LO + VALUES(UNREAD_LO),
+            UNREAD_HI = UNREAD_HI + VALUES(UNREAD_HI)
+        """,
+        (user_lo, user_hi, unread_lo, unread_hi),
+    )
 
     # insert the new message
     cursor.execute(
@@ -830,10 +1654,274 @@ def send_message():
         """,
         (current_user_id, recipient_id, text),
     )
+    msg_id = cursor.lastrowid
+
+    cursor.execute(MESSAGE_COLUMNS + " WHERE M.MSG_ID = %s", (msg_id,))
+    row = cursor.fetchone()
+    message = message_json(row)
+
+    cursor.execute(
+        """
+        UPDATE CONVERSATION
+        SET LAST_MSG_ID = %s, LAST_TIME_STAMP = %s
+        WHERE USER_LO = %s AND USER_HI = %s
+        """,
+        (msg_id, row["TIME_STAMP"], user_lo, user_hi),
+    )
+
+    if unread:
+        cursor.execute(
+            """
+            INSERT INTO USER_UNREAD (USER_ID, UNREAD_COUNT)
+            VALUES (%s, 1)
+            ON DUPLICATE KEY UPDATE UNREAD_COUNT = UNREAD_COUNT + 1
+            """,
+            (recipient_id,),
+        )
     db.commit()
 
+    # push the message to both users' open streams (the sender may have other tabs open).
+    # The message is already saved, so a broker failure only delays it until the next thread load.
+    try:
+        message_broker.publish(user_channel(recipient_id), message)
+        if recipient_id != current_user_id:
+            message_broker.publish(user_channel(current_user_id), message)
+    except Exception as e:
+        print("Error publishing message:", e)
+
     return jsonify({"message": "Message sent"}), 201
 
+# Marks the messages the logged-in user received from another user as read, up to and
+# including upToMsgId (or all of them), and lowers the unread counters to match
+@app.post("/api/messages/read")
+@login_required
+def mark_messages_read():
+    current_user_id = g.user_id
+
+    data = request.get_json(silent=True) or {}
+    other_username = (data.get("otherUsername") or "").strip()
+    up_to_msg_id = data.get("upToMsgId")
+
+    if not other_username:
+        return jsonify({"error": "Missing username parameter"}), 400
+    if up_to_msg_id is not None and (type(up_to_msg_id) is not int or up_to_msg_id < 0):
+        return jsonify({"error": "upToMsgId must be a whole number"}), 400
+
+    cursor.execute(
+        "SELECT USER_ID FROM USERS WHERE USERNAME = %s",
+        (other_username,)
+    )
+    other = cursor.fetchone()
+    if not other:
+        return jsonify({"error": "User not found"}), 404
+
+    other_user_id = other["USER_ID"]
+    user_lo, user_hi = min(current_user_id, other_user_id), max(current_user_id, other_user_id)
+    unread_column = "UNREAD_LO" if current_user_id == user_lo else "UNREAD_HI"
+
+    # lock the conversation so a message sent meanwhile is counted exactly once
+    cursor.execute(
+        f"""
+        SELECT {unread_column} AS UNREAD
+        FROM CONVERSATION
+        WHERE USER_LO = %s AND USER_HI = %s
+        FOR UPDATE
+        """,
+        (user_lo, user_hi),
+    )
+    conversation = cursor.fetchone()
+
+    if not conversation or conversation["UNREAD"] == 0:
+        db.commit()
+        return jsonify({"markedRead": 0}), 200
+
+    sql = """
+        UPDATE MESSAGE
+        SET IS_READ = 1
+        WHERE USER_LO = %s AND USER_HI = %s
+          AND RECIPIENT_ID = %s AND SENDER_ID <> RECIPIENT_ID
+          AND IS_READ = 0
+    """
+    params = [user_lo, user_hi, current_user_id]
+    if up_to_msg_id is not None:
+        sql += " AND MSG_ID <= %s"
+        params.append(up_to_msg_id)
+
+    cursor.execute(sql, tuple(params))
+    marked = cursor.rowcount
+
+    if marked:
+        cursor.execute(
+            f"""
+            UPDATE CONVERSATION
+            SET {unread_column} = {unread_column} - LEAST({unread_column}, %s)
+            WHERE USER_LO = %s AND USER_HI = %s
+            """,
+            (marked, user_lo, user_hi),
+        )
+        cursor.execute(
+            """
+            UPDATE USER_UNREAD
+            SET UNREAD_COUNT = UNREAD_COUNT - LEAST(UNREAD_COUNT, %s)
+            WHERE USER_ID = %s
+            """,
+            (marked, current_user_id),
+        )
+    db.commit()
+
+    return jsonify({"markedRead": marked}), 200
+
+# Page sizes for /api/messages/inbox
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
+
+# Lists the logged-in user's conversations, most recent first, from the CONVERSATION table.
+# Pages with before=<lastMsgId of the last conversation shown>; nextCursor is that value
+# for the next page, or null after the last one.
+@app.get("/api/messages/inbox")
+@login_required
+def get_inbox():
+    current_user_id = g.user_id
+
+    try:
+        before = int_arg("before")
+        limit = min(int_arg("limit") or INBOX_PAGE_SIZE, INBOX_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "before and limit must be whole numbers"}), 400
+
+    # The user can be on either side of the pair, so read each side's recency index
+    # separately and merge; each half stops after limit + 1 rows
+    before_sql = " AND LAST_MSG_ID < %s" if before is not None else ""
+    side_params = [current_user_id] + ([before] if before is not None else []) + [limit + 1]
+
+    cursor.execute(
+        f"""
+        SELECT
+            C.OTHER_ID,
+            C.LAST_MSG_ID,
+            C.LAST_TIME_STAMP,
+            C.UNREAD,
+            U.USERNAME,
+            U.DISPLAY_NAME,
+            U.PICTURE_URL,
+            M.MESSAGE_TEXTS,
+            M.SENDER_ID
+        FROM (
+            (SELECT USER_HI AS OTHER_ID, LAST_MSG_ID, LAST_TIME_STAMP, UNREAD_LO AS UNREAD
+             FROM CONVERSATION
+             WHERE USER_LO = %s{before_sql}
+             ORDER BY LAST_MSG_ID DESC
+             LIMIT %s)
+            UNION ALL
+            (SELECT USER_LO AS OTHER_ID, LAST_MSG_ID, LAST_TIME_STAMP, UNREAD_HI AS UNREAD
+             FROM CONVERSATION
+             WHERE USER_HI = %s AND USER_LO <> USER_HI{before_sql}
+             ORDER BY LAST_MSG_ID DESC
+             LIMIT %s)
+        ) AS C
+        JOIN USERS AS U ON U.USER_ID = C.OTHER_ID
+        LEFT JOIN MESSAGE AS M ON M.MSG_ID = C.LAST_MSG_ID
+        ORDER BY C.LAST_MSG_ID DESC
+        LIMIT %s
+        """,
+        tuple(side_params + side_params + [limit + 1]),
+    )
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]["LAST_MSG_ID"]
+
+    conversations = []
+    for row in rows:
+        conversations.append({
+            "otherUserId": row["OTHER_ID"],
+            "otherUsername": row["USERNAME"],
+            "displayName": row["DISPLAY_NAME"],
+            "pictureUrl": row["PICTURE_URL"],
+            "lastMsgId": row["LAST_MSG_ID"],
+            "lastMessage": row["MESSAGE_TEXTS"],
+            "lastSentAt": row["LAST_TIME_STAMP"].isoformat(),
+            "lastIsMine": row["SENDER_ID"] == current_user_id,
+            "unreadCount": row["UNREAD"],
+        })
+
+    return jsonify({"conversations": conversations, "nextCursor": next_cursor}), 200
+
+# Returns how many messages the logged-in user has not read, from the USER_UNREAD counter
+@app.get("/api/messages/unread-count")
+@login_required
+def get_unread_count():
+    cursor.execute(
+        "SELECT UNREAD_COUNT FROM USER_UNREAD WHERE USER_ID = %s",
+        (g.user_id,)
+    )
+    row = cursor.fetchone()
+
+    return jsonify({"unreadCount": row["UNREAD_COUNT"] if row else 0}), 200
+
+# Formats one message as a Server-Sent Event; the id lets the browser resume with Last-Event-ID
+def message_event(message, user_id):
+    data = dict(message, isMine=message["senderId"] == user_id)
+    return f"id: {message['msgId']}\nevent: message\ndata: {serializers.dumps(data).decode()}\n\n"
+
+# Streams the logged-in user's new messages as Server-Sent Events, so the Messages page
+# does not have to poll /api/messages/thread.
+# Waiting for messages blocks on the broker subscription, so an idle stream uses no CPU and
+# never touches the database. The request's database connection is handed back before
+# streaming starts; it is only used to replay messages missed while reconnecting.
+@app.get("/api/messages/stream")
+@login_required
+def message_stream():
+    user_id = g.user_id
+    expires_at = g.session_expires_at
+
+    # subscribe before reading missed messages so nothing sent in between is lost
+    subscription = message_broker.subscribe(user_channel(user_id))
+
+    missed = []
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    if last_event_id.isdigit():
+        try:
+            cursor.execute(
+                MESSAGE_COLUMNS + """
+                WHERE (M.RECIPIENT_ID = %s OR M.SENDER_ID = %s) AND M.MSG_ID > %s
+                ORDER BY M.MSG_ID ASC
+                LIMIT %s
+                """,
+                (user_id, user_id, int(last_event_id), MESSAGE_STREAM_CATCHUP),
+            )
+            missed = [message_json(row) for row in cursor.fetchall()]
+        except Exception:
+            subscription.close()
+            raise
+
+    def events():
+        try:
+            yield "retry: 3000\n\n"
+            sent = 0
+            for message in missed:
+                sent = message["msgId"]
+                yield message_event(message, user_id)
+
+            while not subscription.overflowed:
+                message = subscription.get(timeout=MESSAGE_STREAM_KEEPALIVE)
+                if message is None:
+                    if datetime.now(timezone.utc) >= expires_at:
+                        return
+                    yield ": keep-alive\n\n"
+                elif message["msgId"] > sent:
+                    yield message_event(message, user_id)
+        finally:
+            subscription.close()
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # Arguments for running app.py
 # Author: Ashley Pike
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+# A small thread-safe cache that evicts the least recently used entry once it is full
+# and treats entries older than their time-to-live as missing.
+# If `weigh` is given (e.g. len for cached bytes), the total weight of all entries is tracked
+# and kept under `max_weight` as well.
+# Hit and miss counts are kept so the cache's usefulness can be checked at /api/cache-stats.
+#
+# `generation` changes whenever entries are cleared or discarded. A reader that computes a value
+# to cache reads it first and passes it to set(), which then drops the value if an invalidation
+# ran in between, so a result computed from data that has since changed is never stored.
+class TTLCache:
+    def __init__(self, max_size, ttl, max_weight=None, weigh=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self._weigh = weigh
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        self.stale_sets = 0
+
+    def _weight_of(self, value):
+        return self._weigh(value) if self._weigh else 0
+
+    # Removes key from the cache; the lock must already be held
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self.weight -= self._weight_of(value)
+        return value
+
+    # Returns the cached value for key, or None if it is missing or expired
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires = entry
+            if expires <= now:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    # Stores value under key. `ttl` overrides the default lifetime (in seconds) for this entry.
+    # When `generation` is given and the cache has been invalidated since it was read, nothing is stored.
+    def set(self, key, value, ttl=None, generation=None):
+        lifetime = self.ttl if ttl is None else min(ttl, self.ttl)
+        if lifetime <= 0:
+            return
+
+        weight = self._weight_of(value)
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_sets += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + lifetime)
+            self.weight += weight
+            while len(self._entries) > self.max_size or (
+                self.max_weight is not None and self.weight > self.max_weight
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    # Removes a single key
+    def pop(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            return self._remove(key)
+
+    # Removes every entry whose (key, value) matches the predicate
+    def discard_if(self, predicate):
+        with self._lock:
+            self.generation += 1
+            stale = [key for key, (value, _) in self._entries.items() if predicate(key, value)]
+            for key in stale:
+                self._remove(key)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.weight = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxSize": self.max_size,
+                "weight": self.weight,
+                "maxWeight": self.max_weight,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "staleSets": self.stale_sets,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,78 @@
+from bisect import bisect_left
+import threading
+import time
+
+# Seconds before the directory reloads the city list from MySQL
+CITY_DIRECTORY_MAX_AGE = 600
+
+
+# Lowercases and collapses whitespace so "  south  PORTLAND" and "South Portland" compare equal
+def city_key(city):
+    return " ".join(str(city).split()).casefold()
+
+
+# The canonical spelling of every city in ADDRESS plus the aliases in CITY_ALIAS
+# (e.g. "S. Portland" -> "South Portland"), kept as a sorted array of lookup keys so
+# exact lookups and prefix suggestions are a binary search.
+class CityDirectory:
+    def __init__(self, max_age=CITY_DIRECTORY_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        self._canonical = {}    # key -> canonical city name (cities and aliases)
+        self._keys = []         # sorted keys of _canonical
+
+    # Loads the city list if it has not been loaded yet or has gone stale
+    def ensure_loaded(self, cur):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.max_age:
+            return
+
+        # DISTINCT over an indexed column is answered from IDX_CITY
+        cur.execute("SELECT DISTINCT CITY FROM ADDRESS")
+        cities = [row["CITY"] for row in cur.fetchall()]
+        cur.execute("SELECT ALIAS, CITY FROM CITY_ALIAS")
+        aliases = [(row["ALIAS"], row["CITY"]) for row in cur.fetchall()]
+        self.load(cities, aliases)
+
+    def load(self, cities, aliases=()):
+        canonical = {city_key(city): city for city in cities if city and city.strip()}
+        for alias, city in aliases:
+            canonical.setdefault(city_key(alias), canonical.get(city_key(city), city))
+
+        with self._lock:
+            self._canonical = canonical
+            self._keys = sorted(canonical)
+            self.loaded_at = time.monotonic()
+
+    # Registers a city that was just added, so it is suggested without waiting for a reload
+    def add(self, city):
+        key = city_key(city)
+        with self._lock:
+            if self.loaded_at is None or key in self._canonical:
+                return
+            self._canonical[key] = " ".join(str(city).split())
+            self._keys.insert(bisect_left(self._keys, key), key)
+
+    # Returns the canonical name for a city or alias, or None if it is not a known city
+    def resolve(self, city):
+        return self._canonical.get(city_key(city))
+
+    # Returns the canonical spelling to store for a city: the known city or alias it matches,
+    # otherwise the input with its whitespace tidied
+    def canonicalize(self, city):
+        return self.resolve(city) or " ".join(str(city).split())
+
+    # Returns up to `limit` canonical city names whose name (or an alias) starts with prefix
+    def suggest(self, prefix, limit=10):
+        key = city_key(prefix)
+        suggestions = []
+        with self._lock:
+            position = bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position].startswith(key):
+                city = self._canonical[self._keys[position]]
+                if city not in suggestions:
+                    suggestions.append(city)
+                    if len(suggestions) == limit:
+                        break
+                position += 1
+        return suggestions
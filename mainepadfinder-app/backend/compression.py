@@ -0,0 +1,184 @@
+from flask import request
+from dotenv import load_dotenv
+import os
+import threading
+import time
+import zlib
+
+load_dotenv()
+
+# brotli is optional (pip install brotli); without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compression settings, configurable from .env
+# COMPRESS_MIN_SIZE      - responses smaller than this many bytes are sent as they are
+# COMPRESS_LEVEL         - gzip level, 1 (fastest) to 9 (smallest)
+# COMPRESS_BROTLI_QUALITY - brotli quality, 0 (fastest) to 11 (smallest)
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+# Bodies are compressed and sent this many bytes at a time, so a large response is never
+# held in memory in both its plain and compressed form
+CHUNK_SIZE = 64 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/css", "application/javascript")
+
+# Added to a response's ETag for each encoding, since a strong ETag must differ between the
+# plain and compressed bodies
+ETAG_SUFFIXES = {"br": "-br", "gzip": "-gzip"}
+
+
+# Incremental compressors with a common interface: compress(bytes) -> bytes, then finish() -> bytes
+class GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+# Compresses JSON and text responses with gzip, or brotli when it is installed and the client
+# prefers it, as negotiated through Accept-Encoding.
+# Bytes in and out and the CPU time spent compressing are counted per encoding.
+class ResponseCompressor:
+    def __init__(self, min_size=COMPRESS_MIN_SIZE, level=COMPRESS_LEVEL, brotli_quality=COMPRESS_BROTLI_QUALITY):
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self._lock = threading.Lock()
+        self.skipped = 0
+        self.encodings = {
+            name: {"responses": 0, "bytesIn": 0, "bytesOut": 0, "cpuSeconds": 0.0}
+            for name in ETAG_SUFFIXES if name != "br" or brotli is not None
+        }
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+
+    # The encoding to use for the current request, or None.
+    # Client preferences (q-values) decide; brotli wins a tie.
+    def choose_encoding(self, request):
+        best, best_quality = None, 0
+        for name in ("br", "gzip"):
+            if name not in self.encodings:
+                continue
+            quality = request.accept_encodings[name]
+            if quality > best_quality:
+                best, best_quality = name, quality
+        return best
+
+    def _stream(self, name):
+        if name == "br":
+            return BrotliStream(self.brotli_quality)
+        return GzipStream(self.level)
+
+    # Compresses the chunks of a body as they are sent, and records the totals once it is done
+    def _compressed_chunks(self, name, chunks):
+        bytes_in = bytes_out = 0
+        cpu = 0.0
+        stream = self._stream(name)
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                started = time.thread_time()
+                out = stream.compress(chunk)
+                cpu += time.thread_time() - started
+                bytes_in += len(chunk)
+                bytes_out += len(out)
+                if out:
+                    yield out
+
+            started = time.thread_time()
+            out = stream.finish()
+            cpu += time.thread_time() - started
+            bytes_out += len(out)
+            if out:
+                yield out
+        finally:
+            with self._lock:
+                totals = self.encodings[name]
+                totals["responses"] += 1
+                totals["bytesIn"] += bytes_in
+                totals["bytesOut"] += bytes_out
+                totals["cpuSeconds"] += cpu
+
+    def compress_response(self, response):
+        # a 304 stands for whichever encoding the client has, so it varies the same way
+        if response.status_code == 304:
+            response.vary.add("Accept-Encoding")
+            return response
+
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+
+        name = self.choose_encoding(request)
+        if name is None or request.method == "HEAD":
+            return response
+
+        if response.is_streamed:
+            chunks = response.iter_encoded()
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                with self._lock:
+                    self.skipped += 1
+                return response
+            chunks = (body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+
+        response.response = self._compressed_chunks(name, chunks)
+        response.headers["Content-Encoding"] = name
+        response.headers.pop("Content-Length", None)
+
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(etag + ETAG_SUFFIXES[name], weak)
+        return response
+
+    def stats(self):
+        with self._lock:
+            encodings = {}
+            for name, totals in self.encodings.items():
+                encodings[name] = dict(
+                    totals,
+                    bytesSaved=totals["bytesIn"] - totals["bytesOut"],
+                    cpuSeconds=round(totals["cpuSeconds"], 6),
+                    ratio=round(totals["bytesOut"] / totals["bytesIn"], 4) if totals["bytesIn"] else None,
+                )
+            return {
+                "minSize": self.min_size,
+                "level": self.level,
+                "brotliQuality": self.brotli_quality if brotli is not None else None,
+                "skippedSmall": self.skipped,
+                "encodings": encodings,
+            }
+
+
+# Every ETag value the client may hold for a response whose plain ETag is `etag`
+def etag_variants(etag):
+    return [etag] + [etag + suffix for suffix in ETAG_SUFFIXES.values()]
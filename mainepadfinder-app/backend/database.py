@@ -0,0 +1,231 @@
+from flask import g, has_request_context, request
+from dotenv import load_dotenv
+import json
+import os
+import queue
+import threading
+import time
+import mysql.connector
+from slow_queries import SlowQueryLog
+
+load_dotenv()
+
+# Pool settings, configurable from .env
+# DB_POOL_SIZE      - maximum number of open connections
+# DB_POOL_TIMEOUT   - seconds a request waits for a free connection before giving up
+# DB_POOL_PING_AFTER - connections idle longer than this many seconds are pinged before reuse
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+# Opens a new connection to the MySQL database using the settings from .env
+def connect():
+    return mysql.connector.connect(
+        host = os.getenv("DB_HOST"),
+        user = os.getenv("DB_USER"),
+        password = os.getenv("DB_PASSWORD"),
+        database = os.getenv("DB_NAME"),
+        ssl_ca = os.getenv("CA_PATH")
+    )
+
+
+# A bounded pool of MySQL connections shared by all request threads.
+# Connections are opened lazily, reused most-recently-used first, pinged when they
+# have been idle for a while and replaced if the server has dropped them.
+class ConnectionPool:
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, ping_after=POOL_PING_AFTER, connect=connect):
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.stats = {"checkouts": 0, "created": 0, "reconnects": 0, "timeouts": 0, "in_use": 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    # Checks out a connection, waiting up to `timeout` seconds for one to be returned
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count("timeouts")
+            raise PoolExhaustedError(f"No database connection available after {self.timeout}s")
+
+        try:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+                self._count("created")
+            else:
+                conn = self._check(conn, last_used)
+        except Exception:
+            self._slots.release()
+            raise
+
+        self._count("checkouts")
+        self._count("in_use")
+        return conn
+
+    # Makes sure an idle connection is still alive, reconnecting it if it went stale
+    def _check(self, conn, last_used):
+        if time.monotonic() - last_used < self.ping_after:
+            return conn
+
+        try:
+            conn.ping(reconnect=False)
+            return conn
+        except mysql.connector.Error:
+            self._count("reconnects")
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+            self._count("created")
+            return self._connect()
+
+    # Returns a connection to the pool, rolling back anything left uncommitted.
+    # There is no ping here: a connection that went stale is caught by _check when it is next
+    # reused after being idle. One that failed during the request (`broken`) or fails the
+    # rollback is closed instead of pooled.
+    def release(self, conn, broken=False):
+        try:
+            if not broken:
+                try:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    self._idle.put((conn, time.monotonic()))
+                    return
+                except mysql.connector.Error:
+                    pass
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+        finally:
+            self._count("in_use", -1)
+            self._slots.release()
+
+
+pool = ConnectionPool()
+
+# Statements slower than SLOW_QUERY_MS, with their plans (see slow_queries.py)
+slow_query_log = SlowQueryLog()
+
+
+# Returns the connection checked out for the current request, acquiring one on first use
+def get_db():
+    if "db" not in g:
+        g.db = pool.acquire()
+    return g.db
+
+
+# Wraps a cursor to count the statements it runs, the time they take and the rows read from it.
+# The totals go to g.db_stats for the current request (see metrics.py), and statements slower
+# than SLOW_QUERY_MS go to the slow query log; everything else is passed through to the real cursor.
+class MeteredCursor:
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+        self.broken = False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    # Runs method(*args, **kwargs) for the statement `sql` with `params`.
+    # `explainable` is False for calls whose plan can't be fetched with EXPLAIN.
+    def _timed(self, sql, params, explainable, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except (mysql.connector.OperationalError, mysql.connector.InterfaceError):
+            # lost connection and the like: the pool must not hand this connection out again
+            self.broken = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            stats = g.get("db_stats")
+            if stats is not None:
+                stats["queries"] += 1
+                stats["seconds"] += elapsed
+            if slow_query_log.enabled() and elapsed * 1000 >= slow_query_log.threshold_ms:
+                route = request.url_rule.rule if has_request_context() and request.url_rule else None
+                slow_query_log.record(sql, params, elapsed * 1000, route, self._explain if explainable else None)
+
+    # The EXPLAIN FORMAT=JSON plan of a statement, read on a separate cursor so the
+    # statement's own results are left alone
+    def _explain(self, sql, params):
+        cur = self._conn.cursor(buffered=True)
+        try:
+            cur.execute("EXPLAIN FORMAT=JSON " + sql, params)
+            row = cur.fetchone()
+            return json.loads(row[0]) if row else None
+        except (mysql.connector.Error, ValueError) as e:
+            return {"error": str(e)}
+        finally:
+            cur.close()
+
+    def _fetched(self, rows):
+        stats = g.get("db_stats")
+        if stats is not None:
+            stats["rows"] += rows
+
+    def execute(self, operation, params=None, **kwargs):
+        return self._timed(operation, params, True, self._cursor.execute, operation, params, **kwargs)
+
+    def executemany(self, operation, seq_params, **kwargs):
+        return self._timed(operation, None, False, self._cursor.executemany, operation, seq_params, **kwargs)
+
+    def callproc(self, procname, args=(), **kwargs):
+        return self._timed(f"CALL {procname}", args, False, self._cursor.callproc, procname, args, **kwargs)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._fetched(1)
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._cursor.fetchmany(size)
+        self._fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._fetched(len(rows))
+        return rows
+
+
+# Returns the dictionary cursor for the current request.
+# The cursor is buffered so a partially read result never blocks the next statement.
+def get_cursor():
+    if "cursor" not in g:
+        conn = get_db()
+        g.cursor = MeteredCursor(conn.cursor(dictionary=True, buffered=True), conn)
+    return g.cursor
+
+
+# Closes the request's cursor and hands its connection back to the pool
+def close_db(exception=None):
+    cursor = g.pop("cursor", None)
+    broken = cursor is not None and cursor.broken
+    if cursor is not None:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+
+    conn = g.pop("db", None)
+    if conn is not None:
+        pool.release(conn, broken)
+
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
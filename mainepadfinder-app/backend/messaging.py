@@ -0,0 +1,175 @@
+from dotenv import load_dotenv
+import json
+import os
+import queue
+import threading
+import time
+
+load_dotenv()
+
+# Broker settings, configurable from .env
+# MESSAGE_BROKER_URL     - empty for the in-process broker, or redis://host:port/db to share
+#                          messages between several server processes (needs the redis package)
+# MESSAGE_STREAM_BACKLOG - events buffered per connected client before it is dropped and has to reconnect
+MESSAGE_BROKER_URL = os.getenv("MESSAGE_BROKER_URL", "")
+MESSAGE_STREAM_BACKLOG = int(os.getenv("MESSAGE_STREAM_BACKLOG", "100"))
+
+CHANNEL_PREFIX = "messages:user:"
+
+# Seconds the Redis broker waits before subscribing again after losing its connection,
+# doubled after each failed attempt up to the maximum
+REDIS_RETRY_SECONDS = 1.0
+REDIS_RETRY_MAX_SECONDS = 30.0
+
+
+# The channel a user's new messages are published on
+def user_channel(user_id):
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+
+# One listener on a channel (one open /api/messages/stream connection).
+# Events wait in a bounded queue; a listener that falls too far behind is marked
+# as overflowed so the stream can end and the client can reconnect and catch up.
+class Subscription:
+    def __init__(self, broker, channel, backlog):
+        self.channel = channel
+        self.overflowed = False
+        self._broker = broker
+        self._events = queue.Queue(maxsize=backlog)
+
+    def deliver(self, event):
+        try:
+            self._events.put_nowait(event)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            return False
+
+    # Waits up to `timeout` seconds for the next event, returning None if none arrived.
+    # The wait blocks the thread, so an idle listener uses no CPU.
+    def get(self, timeout):
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+# Publish/subscribe between request threads of this process
+class LocalBroker:
+    name = "local"
+
+    def __init__(self, backlog=MESSAGE_STREAM_BACKLOG):
+        self.backlog = backlog
+        self._channels = {}
+        self._lock = threading.Lock()
+        self.counts = {"published": 0, "delivered": 0, "dropped": 0}
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.backlog)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            listeners = self._channels.get(subscription.channel)
+            if listeners is not None:
+                listeners.discard(subscription)
+                if not listeners:
+                    del self._channels[subscription.channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            listeners = list(self._channels.get(channel, ()))
+            self.counts["published"] += 1
+
+        delivered = sum(1 for listener in listeners if listener.deliver(event))
+
+        with self._lock:
+            self.counts["delivered"] += delivered
+            self.counts["dropped"] += len(listeners) - delivered
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self.counts,
+                broker=self.name,
+                channels=len(self._channels),
+                subscribers=sum(len(listeners) for listeners in self._channels.values())
+            )
+
+
+# Publishes through Redis so every server process sees every message.
+# Each process keeps one Redis subscription for all user channels and hands
+# incoming events to its own listeners through a LocalBroker.
+# If the connection drops, the subscription is made again with backoff; events published
+# in the meantime are missed, and clients catch up from the thread endpoint (sinceMsgId).
+class RedisBroker(LocalBroker):
+    name = "redis"
+
+    def __init__(self, url, backlog=MESSAGE_STREAM_BACKLOG):
+        import redis
+
+        super().__init__(backlog)
+        self.counts.update(reconnects=0, malformed=0)
+        self._redis_error = redis.RedisError
+        self._redis = redis.Redis.from_url(url)
+        # the first subscription is made here so a bad MESSAGE_BROKER_URL fails at startup
+        pubsub = self._subscribe()
+        threading.Thread(target=self._listen, args=(pubsub,), daemon=True).start()
+
+    def _subscribe(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(CHANNEL_PREFIX + "*")
+        return pubsub
+
+    # Hands Redis events to local listeners for the life of the process, subscribing again
+    # whenever the connection is lost
+    def _listen(self, pubsub):
+        delay = REDIS_RETRY_SECONDS
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = self._subscribe()
+                    print("Redis message subscription restored")
+                delay = REDIS_RETRY_SECONDS
+                for item in pubsub.listen():
+                    self._receive(item)
+            except self._redis_error as e:
+                print(f"Redis message subscription lost, retrying in {delay:g}s:", e)
+
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except self._redis_error:
+                    pass
+                pubsub = None
+            with self._lock:
+                self.counts["reconnects"] += 1
+            time.sleep(delay)
+            delay = min(delay * 2, REDIS_RETRY_MAX_SECONDS)
+
+    # Passes one pub/sub message on; one that can't be read is logged and skipped
+    def _receive(self, item):
+        try:
+            channel = item["channel"].decode()
+            event = json.loads(item["data"])
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            print("Skipping malformed Redis message:", e)
+            with self._lock:
+                self.counts["malformed"] += 1
+            return
+        super().publish(channel, event)
+
+    def publish(self, channel, event):
+        self._redis.publish(channel, json.dumps(event))
+
+
+# Returns the broker configured by MESSAGE_BROKER_URL
+def create_broker(url=MESSAGE_BROKER_URL):
+    if url:
+        return RedisBroker(url)
+    return LocalBroker()
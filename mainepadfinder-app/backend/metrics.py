@@ -0,0 +1,141 @@
+from flask import Response, g, request
+from bisect import bisect_left
+import threading
+import time
+
+# Upper bounds of the histogram buckets: request latency in seconds, and SQL statements per request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+PREFIX = "mainepad"
+
+
+# A Prometheus-style histogram: a count per bucket (values <= its bound), plus the sum and count.
+# Callers hold the registry's lock.
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # (le, cumulative count) pairs, ending with +Inf
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            yield bound, total
+
+
+# Everything recorded for one route and method
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.statuses = {}
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def labels(**pairs):
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs.items()) + "}"
+
+
+# Per-route request metrics: latency, status codes, and the SQL each request ran (statements,
+# time spent in the database and rows read, as counted by database.MeteredCursor).
+# Routes are labelled with their URL rule, e.g. /api/listing/<int:property_id>, so the number
+# of series stays bounded. Recording takes one lock and a few additions per request.
+class RequestMetrics:
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+        self.values = []
+
+    def init_app(self, app):
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+
+    # Adds a single value to /metrics, read from `read()` at scrape time.
+    # `kind` is its Prometheus type, "gauge" or "counter".
+    def add_value(self, name, kind, help_text, read):
+        self.values.append((f"{PREFIX}_{name}", kind, help_text, read))
+
+    def start_request(self):
+        g.request_started = time.perf_counter()
+        g.db_stats = {"queries": 0, "seconds": 0.0, "rows": 0}
+
+    def finish_request(self, response):
+        started = g.get("request_started")
+        if started is None:
+            return response
+
+        elapsed = time.perf_counter() - started
+        db_stats = g.db_stats
+        key = (request.method, request.url_rule.rule if request.url_rule else "<unmatched>")
+
+        with self._lock:
+            route = self._routes.get(key)
+            if route is None:
+                route = self._routes[key] = RouteMetrics()
+            route.latency.observe(elapsed)
+            route.queries.observe(db_stats["queries"])
+            route.db_seconds += db_stats["seconds"]
+            route.rows += db_stats["rows"]
+            route.statuses[response.status_code] = route.statuses.get(response.status_code, 0) + 1
+
+        return response
+
+    def _histogram_lines(self, name, routes, pick):
+        for (method, rule), route in routes:
+            histogram = pick(route)
+            for bound, count in histogram.cumulative():
+                yield f"{name}_bucket{labels(method=method, route=rule, le=bound)} {count}"
+            yield f"{name}_sum{labels(method=method, route=rule)} {histogram.sum}"
+            yield f"{name}_count{labels(method=method, route=rule)} {histogram.count}"
+
+    # The metrics in the Prometheus text exposition format
+    def render(self):
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+
+            name = f"{PREFIX}_http_requests_total"
+            lines += [f"# HELP {name} Requests handled, by route, method and status code.", f"# TYPE {name} counter"]
+            for (method, rule), route in routes:
+                for status, count in sorted(route.statuses.items()):
+                    lines.append(f"{name}{labels(method=method, route=rule, status=status)} {count}")
+
+            name = f"{PREFIX}_http_request_duration_seconds"
+            lines += [f"# HELP {name} Time from the start of a request until its response was returned.", f"# TYPE {name} histogram"]
+            lines += self._histogram_lines(name, routes, lambda route: route.latency)
+
+            name = f"{PREFIX}_db_queries_per_request"
+            lines += [f"# HELP {name} SQL statements run per request.", f"# TYPE {name} histogram"]
+            lines += self._histogram_lines(name, routes, lambda route: route.queries)
+
+            name = f"{PREFIX}_db_seconds_total"
+            lines += [f"# HELP {name} Time spent running SQL statements.", f"# TYPE {name} counter"]
+            for (method, rule), route in routes:
+                lines.append(f"{name}{labels(method=method, route=rule)} {route.db_seconds}")
+
+            name = f"{PREFIX}_db_rows_fetched_total"
+            lines += [f"# HELP {name} Rows read from query results.", f"# TYPE {name} counter"]
+            for (method, rule), route in routes:
+                lines.append(f"{name}{labels(method=method, route=rule)} {route.rows}")
+
+        for name, kind, help_text, read in self.values:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {read()}"]
+
+        return "\n".join(lines) + "\n"
+
+    def response(self):
+        return Response(self.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,332 @@
+from dotenv import load_dotenv
+import os
+import threading
+import time
+import numpy as np
+import database
+from cities import city_key
+
+load_dotenv()
+
+# Seconds before a loaded index is considered stale and rebuilt from MySQL.
+# Writes made through this process are applied straight away; the rebuild picks up
+# writes made by other processes (other workers, the CSV importer).
+SEARCH_INDEX_MAX_AGE = float(os.getenv("SEARCH_INDEX_MAX_AGE", "300"))
+
+PROPERTY_COLUMNS = """
+    SELECT
+        P.PROPERTY_ID,
+        P.UNIT_LABEL,
+        P.RENT_COST,
+        P.BEDROOMS,
+        P.BATHROOMS,
+        P.CAN_RENT,
+        P.SQFT,
+        A.CITY,
+        A.STATE_CODE,
+        A.STREET,
+        A.ZIPCODE
+    FROM PROPERTY AS P
+    JOIN ADDRESS AS A
+    ON P.ADDR_ID = A.ADDR_ID
+"""
+
+
+# NULL numbers are stored as NaN so every comparison against them is false, like in SQL
+def to_float(value):
+    return np.nan if value is None else float(value)
+
+
+# Everything _reset() creates, which load() swaps in from a freshly built index
+INDEX_ATTRIBUTES = (
+    "size", "ids", "rent", "beds", "baths", "sqft", "can_rent", "city_codes", "live",
+    "unit_labels", "states", "streets", "zipcodes", "city_names", "city_lookup", "positions",
+    "_dirty", "_orders", "_postings",
+)
+
+
+# An in-memory copy of PROPERTY joined with ADDRESS that answers /api/properties searches
+# with vectorized NumPy masks instead of a MySQL query.
+# Numeric columns are arrays (one slot per row), text columns are plain lists, and each
+# city has a posting list of the row positions in that city.
+# Full sorts only happen when the index is built, away from the lock searches take; a single
+# row that changes is moved to its place in the existing sort orders.
+class PropertySearchIndex:
+    def __init__(self, max_age=SEARCH_INDEX_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._building = False
+        # rows refreshed while a rebuild runs (PROPERTY_ID -> row, or None once deleted),
+        # applied again on top of the rebuilt index since its read may predate them
+        self._refreshed = None
+        self.loaded_at = None
+        self.stats = {"builds": 0, "searches": 0, "fallbacks": 0, "upserts": 0}
+        self._reset(0)
+
+    def _reset(self, capacity):
+        self.size = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.rent = np.zeros(capacity, dtype=np.float64)
+        self.beds = np.zeros(capacity, dtype=np.float64)
+        self.baths = np.zeros(capacity, dtype=np.float64)
+        self.sqft = np.zeros(capacity, dtype=np.float64)
+        self.can_rent = np.zeros(capacity, dtype=np.int8)
+        self.city_codes = np.zeros(capacity, dtype=np.int32)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.unit_labels = []
+        self.states = []
+        self.streets = []
+        self.zipcodes = []
+        self.city_names = []        # code -> city as stored in ADDRESS
+        self.city_lookup = {}       # normalized city -> code
+        self.positions = {}         # PROPERTY_ID -> row position
+        self._dirty = True
+        self._orders = {}
+        self._postings = {}
+
+    # True when the index has been loaded and is recent enough to serve searches
+    def is_ready(self):
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.max_age
+
+    # Starts a rebuild on a background thread unless one is already running
+    def refresh_in_background(self):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self.rebuild, daemon=True).start()
+
+    # Reloads every property from MySQL using a connection of its own
+    def rebuild(self):
+        with self._lock:
+            self._refreshed = {}
+        try:
+            conn = database.pool.acquire()
+            try:
+                cur = conn.cursor(dictionary=True)
+                cur.execute(PROPERTY_COLUMNS)
+                rows = cur.fetchall()
+                cur.close()
+            finally:
+                database.pool.release(conn)
+            self.load(rows)
+        except Exception as e:
+            print("Error rebuilding property search index:", e)
+        finally:
+            with self._lock:
+                self._building = False
+                self._refreshed = None
+
+    # Replaces the index contents with the given PROPERTY ⨝ ADDRESS rows.
+    # The new index is built and sorted on the side, then swapped in; properties refreshed
+    # since the rebuild started are applied again on top of it.
+    def load(self, rows):
+        staged = PropertySearchIndex(self.max_age)
+        staged._reset(max(len(rows), 1024))
+        for row in rows:
+            staged._put(row)
+        staged._prepare()
+
+        with self._lock:
+            for name in INDEX_ATTRIBUTES:
+                setattr(self, name, getattr(staged, name))
+            for property_id, row in (self._refreshed or {}).items():
+                self._apply(property_id, row)
+            if self._refreshed is not None:
+                self._refreshed.clear()
+            self.loaded_at = time.monotonic()
+            self.stats["builds"] += 1
+
+    def _city_code(self, city):
+        key = city_key(city)
+        code = self.city_lookup.get(key)
+        if code is None:
+            code = len(self.city_names)
+            self.city_names.append(city)
+            self.city_lookup[key] = code
+        return code
+
+    def _grow(self):
+        capacity = max(len(self.ids) * 2, 1024)
+        for name in ("ids", "rent", "beds", "baths", "sqft", "can_rent", "city_codes", "live"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    # Writes one row into its existing slot, or appends it; the lock must already be held
+    def _put(self, row):
+        position = self.positions.get(row["PROPERTY_ID"])
+        old = None if position is None else (self.rent[position], int(self.city_codes[position]))
+        if position is None:
+            if self.size == len(self.ids):
+                self._grow()
+            position = self.size
+            self.size += 1
+            self.positions[row["PROPERTY_ID"]] = position
+            self.unit_labels.append(None)
+            self.states.append(None)
+            self.streets.append(None)
+            self.zipcodes.append(None)
+
+        self.ids[position] = row["PROPERTY_ID"]
+        self.rent[position] = to_float(row["RENT_COST"])
+        self.beds[position] = to_float(row["BEDROOMS"])
+        self.baths[position] = to_float(row["BATHROOMS"])
+        self.sqft[position] = to_float(row["SQFT"])
+        self.can_rent[position] = row["CAN_RENT"] or 0
+        self.city_codes[position] = self._city_code(row["CITY"])
+        self.live[position] = True
+        self.unit_labels[position] = row["UNIT_LABEL"]
+        self.states[position] = row["STATE_CODE"]
+        self.streets[position] = row["STREET"]
+        self.zipcodes[position] = row["ZIPCODE"]
+        if not self._dirty:
+            self._reorder(position, old)
+
+    # Moves one added or changed row to its place in the sort orders and city posting lists,
+    # given its (rent, city code) before the change or None if it is new; the lock must already be held
+    def _reorder(self, position, old):
+        rent, city = self.rent[position], int(self.city_codes[position])
+        if old is not None and old[0] == rent and old[1] == city:
+            return
+
+        rent_order = self._orders["rent_asc"]
+        if old is not None:
+            rent_order = rent_order[rent_order != position]
+        # rent ascending, then PROPERTY_ID ascending among equal rents
+        sorted_rent = self.rent[rent_order]
+        start = np.searchsorted(sorted_rent, rent, side="left")
+        end = np.searchsorted(sorted_rent, rent, side="right")
+        at = start + np.searchsorted(self.ids[rent_order[start:end]], self.ids[position])
+        rent_order = np.insert(rent_order, at, position)
+        self._orders["rent_asc"] = rent_order
+        self._orders["rent_desc"] = rent_order[::-1]
+
+        if old is None:
+            newest = self._orders["newest"]
+            at = np.searchsorted(-self.ids[newest], -self.ids[position])
+            self._orders["newest"] = np.insert(newest, at, position)
+        elif old[1] != city:
+            postings = self._postings[old[1]]
+            self._postings[old[1]] = postings[postings != position]
+        if old is None or old[1] != city:
+            postings = self._postings.get(city, np.zeros(0, dtype=np.int64))
+            self._postings[city] = np.insert(postings, np.searchsorted(postings, position), position)
+
+    # Writes a refreshed row, or marks a deleted property as gone; the lock must already be held
+    def _apply(self, property_id, row):
+        if row:
+            self._put(row)
+        elif property_id in self.positions:
+            self.live[self.positions[property_id]] = False
+
+    # Re-reads one property after it was added or updated in this process
+    def refresh_property(self, cur, property_id):
+        if self.loaded_at is None and self._refreshed is None:
+            return
+
+        cur.execute(PROPERTY_COLUMNS + " WHERE P.PROPERTY_ID = %s", (property_id,))
+        row = cur.fetchone()
+
+        with self._lock:
+            self._apply(property_id, row)
+            if self._refreshed is not None:
+                self._refreshed[property_id] = row
+            self.stats["upserts"] += 1
+
+    # Counts a search that had to be answered by MySQL instead
+    def record_fallback(self):
+        with self._lock:
+            self.stats["fallbacks"] += 1
+
+    # Builds the sort orders and city posting lists after a bulk load; the lock must already be held
+    # (or the index not yet shared)
+    def _prepare(self):
+        if not self._dirty:
+            return
+
+        n = self.size
+        ids = self.ids[:n]
+        rent_order = np.lexsort((ids, self.rent[:n]))
+        self._orders = {
+            "rent_asc": rent_order,
+            "rent_desc": rent_order[::-1],
+            "newest": np.argsort(-ids, kind="stable"),
+        }
+
+        by_city = np.argsort(self.city_codes[:n], kind="stable")
+        codes, starts = np.unique(self.city_codes[:n][by_city], return_index=True)
+        self._postings = dict(zip(codes.tolist(), np.split(by_city, starts[1:])))
+        self._dirty = False
+
+    # Returns up to `limit` rows matching the filters in the requested order, continuing
+    # after `after_key` (see PROPERTY_SORTS in app.py). Rows have the same keys as the SQL search.
+    # `city_filter` is ("exact", city) or ("prefix", text), as made by resolve_city_filter in app.py.
+    # Raises ValueError for filter values that are not numbers so the caller can fall back to SQL.
+    def search(self, city_filter=None, min_rent=None, max_rent=None, min_beds=None, min_baths=None,
+               sort="rent_asc", limit=50, after_key=None):
+        with self._lock:
+            self._prepare()
+            n = self.size
+            mask = self.live[:n].copy()
+
+            if city_filter:
+                mode, value = city_filter
+                needle = city_key(value)
+                if mode == "exact":
+                    codes = [self.city_lookup[needle]] if needle in self.city_lookup else []
+                else:
+                    codes = [code for key, code in self.city_lookup.items() if key.startswith(needle)]
+
+                in_city = np.zeros(n, dtype=bool)
+                for code in codes:
+                    if code in self._postings:
+                        in_city[self._postings[code]] = True
+                mask &= in_city
+
+            if min_rent is not None:
+                mask &= self.rent[:n] >= float(min_rent)
+            if max_rent is not None:
+                mask &= self.rent[:n] <= float(max_rent)
+            if min_beds is not None:
+                mask &= self.beds[:n] >= float(min_beds)
+            if min_baths is not None:
+                mask &= self.baths[:n] >= float(min_baths)
+
+            if after_key is not None:
+                ids = self.ids[:n]
+                if sort == "newest":
+                    mask &= ids < after_key[0]
+                else:
+                    rent = self.rent[:n]
+                    last_rent, last_id = float(after_key[0]), after_key[1]
+                    if sort == "rent_asc":
+                        mask &= (rent > last_rent) | ((rent == last_rent) & (ids > last_id))
+                    else:
+                        mask &= (rent < last_rent) | ((rent == last_rent) & (ids < last_id))
+
+            order = self._orders[sort]
+            selected = order[mask[order]][:limit]
+            self.stats["searches"] += 1
+            return [self._row(position) for position in selected.tolist()]
+
+    # Rebuilds a result row from the columns, using the same Python types MySQL returns
+    def _row(self, position):
+        def number(column, cast):
+            value = column[position]
+            return None if np.isnan(value) else cast(value)
+
+        return {
+            "PROPERTY_ID": int(self.ids[position]),
+            "UNIT_LABEL": self.unit_labels[position],
+            "RENT_COST": int(self.rent[position]),
+            "BEDROOMS": number(self.beds, float),
+            "BATHROOMS": number(self.baths, float),
+            "CAN_RENT": int(self.can_rent[position]),
+            "SQFT": number(self.sqft, int),
+            "CITY": self.city_names[self.city_codes[position]],
+            "STATE_CODE": self.states[position],
+            "STREET": self.streets[position],
+            "ZIPCODE": self.zipcodes[position],
+        }
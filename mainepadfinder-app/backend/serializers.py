@@ -0,0 +1,113 @@
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+import json
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is an optional, much faster encoder; without it the standard library is used
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Converts the values MySQL returns that JSON has no type for.
+# DECIMAL columns become numbers (whole numbers stay integers) rather than strings.
+def to_json_value(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Encodes obj as UTF-8 JSON bytes, compact and in insertion order unless `sort_keys` or
+# `indent` (two spaces per level) is asked for. Both encoders give the same output for these
+# options; non-ASCII text is always written as UTF-8 rather than \u escapes.
+if orjson is not None:
+    ENCODER = "orjson"
+
+    def dumps(obj, sort_keys=False, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=to_json_value, option=option)
+else:
+    ENCODER = "json"
+    _encoder = json.JSONEncoder(default=to_json_value, separators=(",", ":"), ensure_ascii=False)
+
+    def dumps(obj, sort_keys=False, indent=False):
+        if not sort_keys and not indent:
+            return _encoder.encode(obj).encode()
+        return json.dumps(
+            obj, default=to_json_value, ensure_ascii=False, sort_keys=sort_keys,
+            indent=2 if indent else None, separators=(",", ": ") if indent else (",", ":")
+        ).encode()
+
+
+# Flask's JSON provider switched to dumps() above, so jsonify() gets the same encoder and
+# Decimal/datetime handling as the list endpoints.
+# The provider's sort_keys and compact settings are honored as Flask does (compact=None means
+# indented in debug mode); ensure_ascii is not, as orjson can't escape non-ASCII text.
+class JSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        sort_keys = kwargs.get("sort_keys", self.sort_keys)
+        return dumps(obj, sort_keys=sort_keys, indent=bool(kwargs.get("indent"))).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(dumps(obj, sort_keys=self.sort_keys, indent=indent), mimetype=self.mimetype)
+
+
+# Card title for a unit without a UNIT_LABEL, e.g. "2.0 bed • 1.0 bath".
+# Only a handful of bed/bath combinations exist, so each title string is built once.
+@lru_cache(maxsize=256)
+def beds_baths_title(beds, baths):
+    if beds is not None and baths is not None:
+        return f"{beds} bed • {baths} bath"
+    if beds is not None:
+        return f"{beds} bed"
+    if baths is not None:
+        return f"{baths} bath"
+    return "Untitled unit"
+
+
+# Shapes a PROPERTY ⨝ ADDRESS search row into a property card for the frontend
+def property_card(row, trend=None):
+    return {
+        "id": row["PROPERTY_ID"],
+        "title": row["UNIT_LABEL"] or beds_baths_title(row["BEDROOMS"], row["BATHROOMS"]),
+        "rent": row["RENT_COST"],
+        "beds": row["BEDROOMS"],
+        "baths": row["BATHROOMS"],
+        "canRent": bool(row["CAN_RENT"]),
+        "sqft": row["SQFT"],
+        "city": row["CITY"],
+        "state": row["STATE_CODE"],
+        "addressLine1": row["STREET"],
+        "addressLine2": None,
+        "zipCode": row["ZIPCODE"],
+        "trend": trend,
+    }
+
+
+# Shapes a BEST_DEALS row into a deal card for the frontend
+def deal_card(row):
+    return {
+        "id": row["PROPERTY_ID"],
+        "title": row["UNIT_LABEL"] or beds_baths_title(row["BEDROOMS"], row["BATHROOMS"]),
+        "rent": row["RENT_COST"],
+        "beds": row["BEDROOMS"],
+        "baths": row["BATHROOMS"],
+        "canRent": bool(row["CAN_RENT"]),
+        "sqft": row["SQFT"],
+        "city": row["CITY"],
+        "state": row["STATE_CODE"],
+        "cityAvgRent": row["city_avg_rent"],
+        "rentPctOfCityAvg": row["rent_pct_of_city_avg"],
+    }
@@ -0,0 +1,248 @@
+from dotenv import load_dotenv
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+load_dotenv()
+
+# Slow query settings, configurable from .env
+# SLOW_QUERY_MS         - statements that take longer than this are logged; 0 turns logging off
+# SLOW_QUERY_LOG        - optional file that each slow statement is appended to as a JSON line
+# SLOW_QUERY_MAX_FINGERPRINTS - distinct statements kept for the report; the least seen are dropped
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "")
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "500"))
+
+# Statements MySQL can EXPLAIN
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT", "REPLACE")
+
+STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+SQL_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+
+
+# Normalizes a statement so every run of the same query shape shares one fingerprint:
+# comments and extra whitespace are dropped, literals and placeholders become ?, and
+# IN lists of any length become (...). get_properties() builds one shape per filter combination.
+def normalize_sql(sql):
+    sql = SQL_COMMENT.sub(" ", sql)
+    sql = STRING_LITERAL.sub("?", sql)
+    sql = PLACEHOLDER.sub("?", sql)
+    sql = NUMBER_LITERAL.sub("?", sql)
+    sql = VALUE_LIST.sub("(...)", sql)
+    return " ".join(sql.split())
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+# Parameters are logged by type only, never by value: strings and bytes keep their length
+def redact_params(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: redact_value(value) for name, value in params.items()}
+    return [redact_value(value) for value in params]
+
+
+def redact_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+# The tables an EXPLAIN FORMAT=JSON plan reads, with the access type and index of each,
+# e.g. [{"table": "P", "access": "range", "key": "IDX_RENT_ADDR", "rows": 120}]
+def plan_tables(plan):
+    tables = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if "table_name" in node and "access_type" in node:
+                tables.append({
+                    "table": node["table_name"],
+                    "access": node["access_type"],
+                    "key": node.get("key"),
+                    "rows": node.get("rows_examined_per_scan"),
+                })
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan)
+    return tables
+
+
+# Aggregated slow statements, keyed by fingerprint.
+# The first slow run of each fingerprint also captures its EXPLAIN FORMAT=JSON plan.
+class SlowQueryLog:
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, log_path=SLOW_QUERY_LOG, max_fingerprints=SLOW_QUERY_MAX_FINGERPRINTS):
+        self.threshold_ms = threshold_ms
+        self.log_path = log_path
+        self.max_fingerprints = max_fingerprints
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def enabled(self):
+        return self.threshold_ms > 0
+
+    # Records one slow statement. `explain` is called with the statement and its parameters
+    # to fetch the plan, only if this fingerprint has none yet.
+    def record(self, sql, params, elapsed_ms, route=None, explain=None):
+        normalized = normalize_sql(sql)
+        key = fingerprint(normalized)
+        redacted = redact_params(params)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k]["count"])]
+                entry = self._entries[key] = {
+                    "fingerprint": key,
+                    "sql": normalized,
+                    "count": 0,
+                    "totalMs": 0.0,
+                    "maxMs": 0.0,
+                    "routes": {},
+                    "params": redacted,
+                    "plan": None,
+                    "tables": None,
+                    "explained": False,
+                }
+            entry["count"] += 1
+            entry["totalMs"] += elapsed_ms
+            entry["maxMs"] = max(entry["maxMs"], elapsed_ms)
+            entry["lastSeen"] = time.time()
+            if route:
+                entry["routes"][route] = entry["routes"].get(route, 0) + 1
+            needs_plan = explain is not None and not entry["explained"]
+            entry["explained"] = entry["explained"] or needs_plan
+
+        plan = None
+        if needs_plan and normalized.split(" ", 1)[0].upper() in EXPLAINABLE:
+            plan = explain(sql, params)
+            with self._lock:
+                entry["plan"] = plan
+                entry["tables"] = plan_tables(plan) if plan else None
+
+        if self.log_path:
+            line = {
+                "time": time.time(),
+                "fingerprint": key,
+                "sql": normalized,
+                "ms": round(elapsed_ms, 3),
+                "route": route,
+                "params": redacted,
+            }
+            if plan:
+                line["plan"] = plan
+            with self._lock, open(self.log_path, "a") as f:
+                f.write(json.dumps(line, default=str) + "\n")
+
+    # The top `limit` fingerprints ordered by "total", "max" or "count"
+    def report(self, limit=20, order="total"):
+        with self._lock:
+            entries = [dict(entry, routes=dict(entry["routes"])) for entry in self._entries.values()]
+        return top_entries(entries, limit, order)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+SORT_KEYS = {"total": "totalMs", "max": "maxMs", "count": "count"}
+
+
+def top_entries(entries, limit, order):
+    entries.sort(key=lambda entry: entry[SORT_KEYS[order]], reverse=True)
+    for entry in entries:
+        entry["meanMs"] = round(entry["totalMs"] / entry["count"], 3)
+        entry["totalMs"] = round(entry["totalMs"], 3)
+        entry["maxMs"] = round(entry["maxMs"], 3)
+        entry.pop("explained", None)
+    return entries[:limit]
+
+
+# Aggregates a SLOW_QUERY_LOG file the same way the in-process report does
+def report_from_file(path, limit, order):
+    entries = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            entry = entries.setdefault(item["fingerprint"], {
+                "fingerprint": item["fingerprint"],
+                "sql": item["sql"],
+                "count": 0,
+                "totalMs": 0.0,
+                "maxMs": 0.0,
+                "routes": {},
+                "params": item.get("params"),
+                "plan": None,
+                "tables": None,
+            })
+            entry["count"] += 1
+            entry["totalMs"] += item["ms"]
+            entry["maxMs"] = max(entry["maxMs"], item["ms"])
+            entry["lastSeen"] = item["time"]
+            if item.get("route"):
+                entry["routes"][item["route"]] = entry["routes"].get(item["route"], 0) + 1
+            if item.get("plan") and entry["plan"] is None:
+                entry["plan"] = item["plan"]
+                entry["tables"] = plan_tables(item["plan"])
+    return top_entries(list(entries.values()), limit, order)
+
+
+def format_report(entries):
+    lines = []
+    for rank, entry in enumerate(entries, start=1):
+        lines.append(
+            f"{rank:>3}. {entry['fingerprint']}  count={entry['count']}  total={entry['totalMs']}ms  "
+            f"mean={entry['meanMs']}ms  max={entry['maxMs']}ms"
+        )
+        lines.append(f"     {entry['sql'][:300]}")
+        if entry["routes"]:
+            lines.append("     routes: " + ", ".join(f"{route} ({n})" for route, n in entry["routes"].items()))
+        for table in entry["tables"] or []:
+            note = "  <- full scan" if table["access"] == "ALL" else ""
+            lines.append(f"     {table['table']}: {table['access']} key={table['key']} rows={table['rows']}{note}")
+    return "\n".join(lines)
+
+
+# Prints the top slow statements from a SLOW_QUERY_LOG file:
+#   py slow_queries.py slow.jsonl --top 10 --order max
+def main():
+    parser = argparse.ArgumentParser(description="Report the slowest statements in a slow query log file.")
+    parser.add_argument("path", nargs="?", default=SLOW_QUERY_LOG, help="log file (default: SLOW_QUERY_LOG from .env)")
+    parser.add_argument("--top", type=int, default=20, help="statements to show")
+    parser.add_argument("--order", choices=sorted(SORT_KEYS), default="total", help="rank by total, max or count")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of text")
+    args = parser.parse_args()
+
+    if not args.path:
+        parser.error("no log file given and SLOW_QUERY_LOG is not set")
+
+    entries = report_from_file(args.path, args.top, args.order)
+    if args.json:
+        json.dump(entries, sys.stdout, indent=2, default=str)
+        print()
+    else:
+        print(format_report(entries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the backend modules are imported the way app.py imports them, from the backend directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,89 @@
+import pytest
+import cache
+from cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_their_ttl(clock):
+    c = TTLCache(max_size=10, ttl=30)
+    c.set("a", 1)
+    c.set("b", 2, ttl=5)
+
+    clock[0] += 10
+    assert c.get("a") == 1
+    assert c.get("b") is None
+
+    clock[0] += 20
+    assert c.get("a") is None
+    assert c.stats()["size"] == 0
+
+
+def test_ttl_override_is_capped_by_the_default(clock):
+    c = TTLCache(max_size=10, ttl=30)
+    c.set("a", 1, ttl=300)
+    clock[0] += 31
+    assert c.get("a") is None
+
+
+def test_least_recently_used_is_evicted():
+    c = TTLCache(max_size=2, ttl=30)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+
+    assert (c.get("a"), c.get("b"), c.get("c")) == (1, None, 3)
+    assert c.stats()["evictions"] == 1
+
+
+def test_weight_is_kept_under_the_maximum():
+    c = TTLCache(max_size=10, ttl=30, max_weight=10, weigh=len)
+    c.set("a", b"xxxxxx")
+    c.set("b", b"yyyyyy")
+    c.set("huge", b"z" * 11)
+
+    assert c.get("a") is None
+    assert c.get("b") == b"yyyyyy"
+    assert c.get("huge") is None
+    assert c.weight == 6
+
+
+def test_set_after_clear_is_dropped():
+    c = TTLCache(max_size=10, ttl=30)
+    generation = c.generation
+    # an invalidation lands while the value is being computed
+    c.clear()
+    c.set("a", "stale", generation=generation)
+
+    assert c.get("a") is None
+    assert c.stats()["staleSets"] == 1
+
+
+def test_set_after_discard_is_dropped():
+    c = TTLCache(max_size=10, ttl=30)
+    c.set("portland", 1)
+    c.set("bangor", 2)
+    generation = c.generation
+
+    assert c.discard_if(lambda key, value: key == "portland") == 1
+    c.set("portland", "stale", generation=generation)
+
+    assert c.get("portland") is None
+    assert c.get("bangor") == 2
+
+
+def test_set_with_current_generation_is_stored():
+    c = TTLCache(max_size=10, ttl=30)
+    c.clear()
+    c.set("a", 1, generation=c.generation)
+    assert c.get("a") == 1
+    # pop leaves the generation alone: it drops one entry the caller knows about
+    generation = c.generation
+    c.pop("a")
+    assert c.generation == generation
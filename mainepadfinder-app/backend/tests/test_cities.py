@@ -0,0 +1,51 @@
+from cities import CityDirectory, city_key
+
+
+def directory():
+    cities = CityDirectory()
+    cities.load(
+        ["Portland", "South Portland", "Bangor", "Bar Harbor", "  ", None],
+        [("S. Portland", "South Portland"), ("So Portland", "south portland")],
+    )
+    return cities
+
+
+def test_city_key_ignores_case_and_spacing():
+    assert city_key("  south  PORTLAND ") == city_key("South Portland") == "south portland"
+
+
+def test_resolve_cities_and_aliases():
+    cities = directory()
+    assert cities.resolve("portland") == "Portland"
+    assert cities.resolve("s.  portland") == "South Portland"
+    assert cities.resolve("So Portland") == "South Portland"
+    assert cities.resolve("Portland, ME") is None
+
+
+def test_canonicalize_tidies_unknown_cities():
+    cities = directory()
+    assert cities.canonicalize("s. portland") == "South Portland"
+    assert cities.canonicalize("  Cape   Elizabeth ") == "Cape Elizabeth"
+
+
+def test_suggest_by_prefix_without_duplicates():
+    cities = directory()
+    assert cities.suggest("ba") == ["Bangor", "Bar Harbor"]
+    assert cities.suggest("s") == ["South Portland"]
+    assert cities.suggest("BA", limit=1) == ["Bangor"]
+    assert cities.suggest("x") == []
+
+
+def test_added_city_is_suggested():
+    cities = directory()
+    cities.add("  Bath ")
+    cities.add("bangor")
+
+    assert cities.suggest("ba") == ["Bangor", "Bar Harbor", "Bath"]
+    assert cities.resolve("bath") == "Bath"
+
+
+def test_add_before_load_is_ignored():
+    cities = CityDirectory()
+    cities.add("Bath")
+    assert cities.resolve("Bath") is None
@@ -0,0 +1,52 @@
+import base64
+import json
+import pytest
+import app
+from app import decode_page_cursor, encode_page_cursor
+
+
+def handmade(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("sort, key", [
+    ("rent_asc", [1500, 42]),
+    ("rent_desc", [1500.5, 42]),
+    ("newest", [42]),
+])
+def test_round_trip(sort, key):
+    assert decode_page_cursor(encode_page_cursor(sort, key), sort) == key
+
+
+def test_cursor_from_another_sort():
+    with pytest.raises(ValueError):
+        decode_page_cursor(encode_page_cursor("rent_asc", [1500, 42]), "rent_desc")
+
+
+@pytest.mark.parametrize("token", ["", "not base64!", handmade([1, 2]), handmade({"sort": "rent_asc"})])
+def test_malformed(token):
+    with pytest.raises(ValueError):
+        decode_page_cursor(token, "rent_asc")
+
+
+@pytest.mark.parametrize("sort, key", [
+    ("rent_asc", [1500]),
+    ("rent_desc", []),
+    ("rent_asc", [1500, 42, 7]),
+    ("newest", [42, 1]),
+    ("newest", []),
+    ("rent_asc", [1500, "42"]),
+    ("newest", [True]),
+    ("rent_asc", 1500),
+])
+def test_key_must_fit_the_sort(sort, key):
+    with pytest.raises(ValueError):
+        decode_page_cursor(handmade({"sort": sort, "key": key}), sort)
+
+
+# rejected with a 400 before the search reaches MySQL or the search index
+@pytest.mark.parametrize("sort, key", [("rent_asc", [5]), ("newest", [5, 6])])
+def test_short_key_is_a_bad_request(sort, key):
+    client = app.app.test_client()
+    response = client.post("/api/properties", json={"sort": sort, "cursor": handmade({"sort": sort, "key": key})})
+    assert response.status_code == 400
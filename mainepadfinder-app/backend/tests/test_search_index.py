@@ -0,0 +1,136 @@
+import random
+import pytest
+from search_index import PropertySearchIndex
+
+CITIES = ["Portland", "South Portland", "Bangor", "Augusta"]
+
+SORT_KEYS = {
+    "rent_asc": lambda row: (row["RENT_COST"], row["PROPERTY_ID"]),
+    "rent_desc": lambda row: (-row["RENT_COST"], -row["PROPERTY_ID"]),
+    "newest": lambda row: -row["PROPERTY_ID"],
+}
+
+
+def make_row(rng, property_id):
+    return {
+        "PROPERTY_ID": property_id,
+        "UNIT_LABEL": f"Apt {property_id}",
+        "RENT_COST": rng.randrange(800, 1400, 50),
+        "BEDROOMS": float(rng.randint(0, 3)),
+        "BATHROOMS": float(rng.randint(1, 2)),
+        "CAN_RENT": rng.randint(0, 1),
+        "SQFT": rng.choice([None, 600, 900]),
+        "CITY": rng.choice(CITIES),
+        "STATE_CODE": "ME",
+        "STREET": f"{property_id} Main St",
+        "ZIPCODE": "04101",
+    }
+
+
+# A cursor that answers refresh_property's single-row read from a dict of rows
+class RowCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self._row = None
+
+    def execute(self, sql, params):
+        self._row = self.rows.get(params[0])
+
+    def fetchone(self):
+        return self._row
+
+
+# Every page of a search, following each page's last row like /api/properties does
+def all_pages(index, sort, limit=7, **filters):
+    pages, after_key = [], None
+    while True:
+        page = index.search(sort=sort, limit=limit, after_key=after_key, **filters)
+        pages.extend(page)
+        if len(page) < limit:
+            return pages
+        last = page[-1]
+        after_key = [last["PROPERTY_ID"]] if sort == "newest" else [last["RENT_COST"], last["PROPERTY_ID"]]
+
+
+def expected(rows, sort, city=None, min_rent=None):
+    matching = [
+        row for row in rows.values()
+        if (city is None or row["CITY"] == city) and (min_rent is None or row["RENT_COST"] >= min_rent)
+    ]
+    return [row["PROPERTY_ID"] for row in sorted(matching, key=SORT_KEYS[sort])]
+
+
+def ids(rows):
+    return [row["PROPERTY_ID"] for row in rows]
+
+
+@pytest.fixture
+def rows():
+    rng = random.Random(7)
+    return {property_id: make_row(rng, property_id) for property_id in range(1, 61)}
+
+
+@pytest.mark.parametrize("sort", sorted(SORT_KEYS))
+def test_paging_visits_every_row_once_in_order(rows, sort):
+    index = PropertySearchIndex()
+    index.load(list(rows.values()))
+
+    assert ids(all_pages(index, sort)) == expected(rows, sort)
+    assert ids(all_pages(index, sort, city_filter=("exact", "portland"), min_rent=1000)) == \
+        expected(rows, sort, city="Portland", min_rent=1000)
+
+
+def test_prefix_city_filter(rows):
+    index = PropertySearchIndex()
+    index.load(list(rows.values()))
+
+    found = {row["CITY"] for row in index.search(city_filter=("prefix", "port"), limit=100)}
+    assert found == {"Portland"}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_refreshed_rows_keep_the_same_order_as_a_rebuild(rows, seed):
+    rng = random.Random(seed)
+    index = PropertySearchIndex()
+    index.load(list(rows.values()))
+    cur = RowCursor(rows)
+
+    next_id = max(rows) + 1
+    for _ in range(40):
+        if rng.random() < 0.3:
+            property_id = next_id
+            next_id += 1
+            rows[property_id] = make_row(rng, property_id)
+        else:
+            property_id = rng.choice(list(rows))
+            # rent ties, city moves and unchanged rows are all moved through _reorder
+            rows[property_id] = dict(rows[property_id], RENT_COST=rng.randrange(800, 1400, 50), CITY=rng.choice(CITIES))
+        index.refresh_property(cur, property_id)
+
+    rebuilt = PropertySearchIndex()
+    rebuilt.load(list(rows.values()))
+    for sort in SORT_KEYS:
+        assert ids(all_pages(index, sort)) == ids(all_pages(rebuilt, sort)) == expected(rows, sort)
+        for city in CITIES:
+            filters = {"city_filter": ("exact", city)}
+            assert ids(all_pages(index, sort, **filters)) == expected(rows, sort, city=city)
+
+
+def test_refresh_during_a_rebuild_is_not_lost(rows):
+    index = PropertySearchIndex()
+    index.load(list(rows.values()))
+    cur = RowCursor(rows)
+
+    # the rebuild read its rows before these changes were made
+    snapshot = [dict(row) for row in rows.values()]
+    index._refreshed = {}
+    rows[5] = dict(rows[5], RENT_COST=5000)
+    index.refresh_property(cur, 5)
+    del rows[6]
+    index.refresh_property(cur, 6)
+    index.load(snapshot)
+
+    by_id = {row["PROPERTY_ID"]: row for row in index.search(limit=100)}
+    assert by_id[5]["RENT_COST"] == 5000
+    assert 6 not in by_id
+    assert ids(all_pages(index, "rent_asc")) == expected(rows, "rent_asc")
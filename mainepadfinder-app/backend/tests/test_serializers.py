@@ -0,0 +1,68 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+from flask import Flask, jsonify
+import serializers
+
+
+def test_mysql_values_are_encoded():
+    row = {
+        "RENT_COST": Decimal("1500"),
+        "AVG_RENT": Decimal("1487.2500"),
+        "CREATED": datetime(2025, 12, 6, 14, 30),
+        "MOVE_IN": date(2026, 1, 1),
+        "TAGS": ("pets", "parking"),
+        "CITY": "Saint-Agathe-du-Québec",
+    }
+
+    assert json.loads(serializers.dumps(row)) == {
+        "RENT_COST": 1500,
+        "AVG_RENT": 1487.25,
+        "CREATED": "2025-12-06T14:30:00",
+        "MOVE_IN": "2026-01-01",
+        "TAGS": ["pets", "parking"],
+        "CITY": "Saint-Agathe-du-Québec",
+    }
+    # whole DECIMAL values stay integers, and text is written as UTF-8
+    assert b'"RENT_COST":1500,' in serializers.dumps(row)
+    assert "Québec".encode() in serializers.dumps(row)
+
+
+def test_unknown_types_are_rejected():
+    with pytest.raises(TypeError):
+        serializers.dumps({"value": object()})
+
+
+def test_compact_and_in_insertion_order_by_default():
+    assert serializers.dumps({"b": 1, "a": [1, 2]}) == b'{"b":1,"a":[1,2]}'
+
+
+def test_sort_keys_and_indent():
+    assert serializers.dumps({"b": 1, "a": 2}, sort_keys=True) == b'{"a":2,"b":1}'
+    assert serializers.dumps({"b": [1]}, indent=True) == b'{\n  "b": [\n    1\n  ]\n}'
+
+
+def test_jsonify_follows_the_provider_settings():
+    app = Flask(__name__)
+    app.json = serializers.JSONProvider(app)
+
+    with app.app_context():
+        assert jsonify({"b": Decimal("1.5"), "a": 1}).get_data() == b'{"a":1,"b":1.5}'
+
+        app.json.sort_keys = False
+        assert jsonify(b=1, a=2).get_data() == b'{"b":1,"a":2}'
+
+        app.json.compact = False
+        assert jsonify([1]).get_data() == b'[\n  1\n]'
+
+
+def test_property_card_titles():
+    row = {
+        "PROPERTY_ID": 1, "UNIT_LABEL": None, "RENT_COST": 1200, "BEDROOMS": 2.0, "BATHROOMS": None,
+        "CAN_RENT": 0, "SQFT": None, "CITY": "Portland", "STATE_CODE": "ME", "STREET": "1 Main St",
+        "ZIPCODE": "04101",
+    }
+    assert serializers.property_card(row)["title"] == "2.0 bed"
+    assert serializers.property_card(dict(row, UNIT_LABEL="Apt 2"))["title"] == "Apt 2"
+    assert serializers.beds_baths_title(None, None) == "Untitled unit"
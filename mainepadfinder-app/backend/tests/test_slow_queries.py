@@ -0,0 +1,53 @@
+from slow_queries import fingerprint, normalize_sql, plan_tables, redact_params
+
+
+def test_literals_and_placeholders_share_a_shape():
+    shapes = {
+        normalize_sql("SELECT * FROM PROPERTY WHERE RENT_COST <= %s AND CITY = %s LIMIT %s"),
+        normalize_sql("SELECT * FROM PROPERTY\n  WHERE RENT_COST <= 1500 AND CITY = 'Portland' LIMIT 50"),
+        normalize_sql("SELECT * FROM PROPERTY WHERE RENT_COST <= %(rent)s AND CITY = \"it's\" LIMIT 10"),
+    }
+    assert len(shapes) == 1
+
+
+def test_comments_and_whitespace_are_dropped():
+    sql = """
+        -- best deals
+        SELECT /* hint */ PROPERTY_ID
+        FROM   BEST_DEALS
+    """
+    assert normalize_sql(sql) == "SELECT PROPERTY_ID FROM BEST_DEALS"
+
+
+def test_in_lists_of_any_length_match():
+    short = normalize_sql("SELECT * FROM PROPERTY WHERE PROPERTY_ID IN (%s)")
+    long = normalize_sql("SELECT * FROM PROPERTY WHERE PROPERTY_ID IN (1, 2, 3, 4)")
+    assert short == long == "SELECT * FROM PROPERTY WHERE PROPERTY_ID IN (...)"
+    assert fingerprint(short) == fingerprint(long)
+
+
+def test_identifiers_with_digits_are_kept():
+    assert normalize_sql("SELECT P2.RENT_COST FROM PROPERTY AS P2 WHERE P2.SQFT > 900") == \
+        "SELECT P2.RENT_COST FROM PROPERTY AS P2 WHERE P2.SQFT > ?"
+
+
+def test_different_shapes_get_different_fingerprints():
+    assert fingerprint(normalize_sql("SELECT * FROM PROPERTY WHERE RENT_COST > 1")) != \
+        fingerprint(normalize_sql("SELECT * FROM PROPERTY WHERE RENT_COST < 1"))
+
+
+def test_params_are_redacted():
+    assert redact_params(("secret", 5, None, b"xy")) == ["<str:6>", "<int>", None, "<bytes:2>"]
+    assert redact_params({"city": "Portland"}) == {"city": "<str:8>"}
+    assert redact_params(None) is None
+
+
+def test_plan_tables():
+    plan = {"query_block": {"nested_loop": [
+        {"table": {"table_name": "A", "access_type": "ref", "key": "IDX_CITY", "rows_examined_per_scan": 40}},
+        {"table": {"table_name": "P", "access_type": "ALL", "rows_examined_per_scan": 900}},
+    ]}}
+    assert plan_tables(plan) == [
+        {"table": "A", "access": "ref", "key": "IDX_CITY", "rows": 40},
+        {"table": "P", "access": "ALL", "key": None, "rows": 900},
+    ]
@@ -0,0 +1,91 @@
+import sqlite3
+import pytest
+from trends import PriceTrends, trend_json
+
+
+# Runs the backend's MySQL-style statements (%s placeholders, dictionary rows) on SQLite,
+# which has the same LAG/ROW_NUMBER window functions
+class SQLiteCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self._rows = [dict(row) for row in self._conn.execute(sql.replace("%s", "?"), params)]
+
+    def fetchall(self):
+        return self._rows
+
+
+@pytest.fixture
+def history():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE PROP_PRICE_HISTORY (
+            ENTRY_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            PROPERTY_ID INTEGER NOT NULL,
+            RENT_COST INTEGER NOT NULL,
+            PRICE_START TEXT NOT NULL
+        )
+    """)
+
+    def add(property_id, rent, started):
+        conn.execute(
+            "INSERT INTO PROP_PRICE_HISTORY (PROPERTY_ID, RENT_COST, PRICE_START) VALUES (?, ?, ?)",
+            (property_id, rent, started),
+        )
+
+    yield add, SQLiteCursor(conn)
+    conn.close()
+
+
+def test_rent_changed_once(history):
+    add, cur = history
+    # the starting price ADD_PROP_START_PRICE records, then the change ADD_PROP_PRICE_HISTORY records
+    add(1, 1600, "2025-01-01 00:00:00")
+    add(1, 1500, "2025-06-01 00:00:00")
+
+    assert PriceTrends().get(cur, 1) == {
+        "direction": "down", "changePct": -6.2, "price": 1500, "previousPrice": 1600,
+    }
+
+
+def test_rent_never_changed(history):
+    add, cur = history
+    add(1, 1600, "2025-01-01 00:00:00")
+
+    assert PriceTrends().get(cur, 1) == {
+        "direction": "flat", "changePct": 0.0, "price": 1600, "previousPrice": None,
+    }
+
+
+def test_repeated_prices_are_not_changes(history):
+    add, cur = history
+    add(1, 1400, "2025-01-01 00:00:00")
+    add(1, 1500, "2025-02-01 00:00:00")
+    add(1, 1500, "2025-03-01 00:00:00")
+
+    trend = PriceTrends().get(cur, 1)
+    assert (trend["direction"], trend["price"], trend["previousPrice"]) == ("up", 1500, 1400)
+
+
+def test_same_timestamp_ordered_by_entry(history):
+    add, cur = history
+    # a seed and a change written in the same second
+    add(1, 1600, "2025-01-01 00:00:00")
+    add(1, 1700, "2025-01-01 00:00:00")
+
+    assert PriceTrends().get(cur, 1)["previousPrice"] == 1600
+
+
+def test_batch_with_missing_history(history):
+    add, cur = history
+    add(1, 1000, "2025-01-01 00:00:00")
+    add(1, 1100, "2025-02-01 00:00:00")
+
+    trends = PriceTrends()
+    assert trends.get_many(cur, [1, 2]) == {1: trend_json(1100, 1000), 2: None}
+    # both are cached, including the property without history
+    assert trends.get_many(cur, [1, 2])[2] is None
+    assert trends.queries == 1
@@ -0,0 +1,100 @@
+from dotenv import load_dotenv
+import os
+from cache import TTLCache
+
+load_dotenv()
+
+# How many properties' price pairs are kept, and for how many seconds.
+# Rent changes made through this process drop the property's entry straight away.
+PRICE_TREND_CACHE_SIZE = int(os.getenv("PRICE_TREND_CACHE_SIZE", "50000"))
+PRICE_TREND_CACHE_TTL = float(os.getenv("PRICE_TREND_CACHE_TTL", "300"))
+
+# For each property, the price it is listed at now and the price before its last change.
+# LAG marks the rows where the rent actually changed (repeated rows for the same rent are
+# skipped), and ROW_NUMBER picks the latest of those per property.
+PRICE_PAIRS_SQL = """
+    WITH CHANGES AS (
+        SELECT
+            PROPERTY_ID,
+            RENT_COST,
+            PRICE_START,
+            ENTRY_ID,
+            LAG(RENT_COST) OVER (PARTITION BY PROPERTY_ID ORDER BY PRICE_START, ENTRY_ID) AS PREVIOUS_COST
+        FROM PROP_PRICE_HISTORY
+        WHERE PROPERTY_ID IN ({placeholders})
+    ),
+    LATEST AS (
+        SELECT
+            PROPERTY_ID,
+            RENT_COST,
+            PREVIOUS_COST,
+            ROW_NUMBER() OVER (PARTITION BY PROPERTY_ID ORDER BY PRICE_START DESC, ENTRY_ID DESC) AS RN
+        FROM CHANGES
+        WHERE PREVIOUS_COST IS NULL OR PREVIOUS_COST <> RENT_COST
+    )
+    SELECT PROPERTY_ID, RENT_COST, PREVIOUS_COST
+    FROM LATEST
+    WHERE RN = 1
+"""
+
+
+# Turns a (last, previous) price pair into the `trend` object returned by the API,
+# or None when the property has no price history
+def trend_json(last, previous):
+    if last is None:
+        return None
+
+    if previous is None or previous == last:
+        return {"direction": "flat", "changePct": 0.0, "price": last, "previousPrice": previous}
+
+    return {
+        "direction": "up" if last > previous else "down",
+        "changePct": round((last - previous) * 100.0 / previous, 1) if previous else None,
+        "price": last,
+        "previousPrice": previous,
+    }
+
+
+# Price trends for many properties at once.
+# (last, previous) price pairs are cached per property; the ones not cached are read
+# from PROP_PRICE_HISTORY in a single windowed query.
+class PriceTrends:
+    def __init__(self, max_size=PRICE_TREND_CACHE_SIZE, ttl=PRICE_TREND_CACHE_TTL):
+        self._pairs = TTLCache(max_size=max_size, ttl=ttl)
+        self.queries = 0
+
+    # Returns {property_id: trend} for the given ids
+    def get_many(self, cur, property_ids):
+        pairs = {}
+        missing = []
+        for property_id in dict.fromkeys(property_ids):
+            pair = self._pairs.get(property_id)
+            if pair is None:
+                missing.append(property_id)
+            else:
+                pairs[property_id] = pair
+
+        if missing:
+            cur.execute(
+                PRICE_PAIRS_SQL.format(placeholders=", ".join(["%s"] * len(missing))),
+                tuple(missing),
+            )
+            loaded = {row["PROPERTY_ID"]: (row["RENT_COST"], row["PREVIOUS_COST"]) for row in cur.fetchall()}
+            self.queries += 1
+
+            for property_id in missing:
+                pair = loaded.get(property_id, (None, None))
+                self._pairs.set(property_id, pair)
+                pairs[property_id] = pair
+
+        return {property_id: trend_json(*pair) for property_id, pair in pairs.items()}
+
+    def get(self, cur, property_id):
+        return self.get_many(cur, [property_id])[property_id]
+
+    # Drops a property's cached pair after its rent changed
+    def forget(self, property_id):
+        self._pairs.pop(property_id)
+
+    def stats(self):
+        return dict(self._pairs.stats(), queries=self.queries)
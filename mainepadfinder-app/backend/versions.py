@@ -0,0 +1,62 @@
+from dotenv import load_dotenv
+import itertools
+import os
+import secrets
+import threading
+from cache import TTLCache
+
+load_dotenv()
+
+# How many version counters are kept, and for how many seconds.
+# A counter that expires or is evicted simply gets a new value, which costs clients one full
+# response. The TTL also bounds how long another server process can keep answering 304 for
+# data this process changed, as with the property cache.
+VERSION_CACHE_SIZE = int(os.getenv("VERSION_CACHE_SIZE", "100000"))
+VERSION_CACHE_TTL = float(os.getenv("VERSION_CACHE_TTL", "300"))
+
+
+# Version counters for the data behind cacheable responses, e.g. ("property", 12) or
+# ("city", "portland"). A response's ETag is built from the versions of everything it shows,
+# so it can be checked against If-None-Match without running the response's query.
+#
+# Every value handed out is new for the life of the process, and the process start adds a
+# random prefix, so an ETag never names two different responses. Readers must take the ETag
+# before they query and writers must bump after they commit: then a response may at worst
+# carry an ETag that is already out of date, which only costs the client a refetch.
+class VersionCounters:
+    def __init__(self, max_size=VERSION_CACHE_SIZE, ttl=VERSION_CACHE_TTL):
+        self._versions = TTLCache(max_size=max_size, ttl=ttl)
+        self._epoch = secrets.token_hex(4)
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self.bumps = 0
+
+    # The current version of key, assigning one if it has none
+    def current(self, key):
+        with self._lock:
+            version = self._versions.get(key)
+            if version is None:
+                version = next(self._sequence)
+                self._versions.set(key, version)
+            return version
+
+    # Gives each key a new version after a change to its data
+    def bump(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._versions.set(key, next(self._sequence))
+                self.bumps += 1
+
+    # Gives every key a new version, e.g. after a bulk load
+    def bump_all(self):
+        with self._lock:
+            self._versions.clear()
+            self.bumps += 1
+
+    # A strong ETag value (unquoted) for a response that shows the given keys' data.
+    # `kind` keeps ETags of different endpoints apart.
+    def etag(self, kind, *keys):
+        return "-".join([kind, self._epoch] + [str(self.current(key)) for key in keys])
+
+    def stats(self):
+        return dict(self._versions.stats(), bumps=self.bumps)
@@ -1,7 +1,10 @@
 // Title: mainepadfinder-app/frontend/src/pages/Messages.jsx
 // Author: Sophia Priola
 // This page handles messages between logged in users 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
+
+// how many messages are loaded at a time 
+const THREAD_PAGE_SIZE = 50;
 
 export default function Messages() {
 
@@ -13,6 +16,11 @@ export default function Messages() {
   const [messages, setMessages] = useState([]); // array of messages in the conversation between current user and otherUsername
   const [loadingThread, setLoadingThread] = useState(false); // True when we are loading from the backend 
   const [threadError, setThreadError] = useState(""); // error message if loading fails 
+  const [hasOlder, setHasOlder] = useState(false); // True when the last page was full, so older messages may exist
+  const threadUsernameRef = useRef(""); // username of the conversation currently shown, read by the message stream
+
+  const [conversations, setConversations] = useState([]); // inbox: everyone we have messaged, most recent first
+  const [unreadCount, setUnreadCount] = useState(0); // total unread messages across all conversations
 
   const [messageText, setMessageText] = useState(""); // Text of the message we are sending 
   const [sending, setSending] = useState(false); // True while we are sending message to the backend 
@@ -52,16 +60,98 @@ export default function Messages() {
     loadMe();
   }, []); //empty list means this only runs once 
 
+  // load the inbox (first page of conversations) and the unread total 
+  async function loadInbox() {
+    try {
+      const [inboxResp, unreadResp] = await Promise.all([
+        fetch("https://localhost:5000/api/messages/inbox", { credentials: "include" }),
+        fetch("https://localhost:5000/api/messages/unread-count", { credentials: "include" }),
+      ]);
+      if (inboxResp.ok) {
+        const inbox = await inboxResp.json();
+        setConversations(inbox.conversations);
+      }
+      if (unreadResp.ok) {
+        const unread = await unreadResp.json();
+        setUnreadCount(unread.unreadCount);
+      }
+    } catch (err) {
+      console.error("Error loading inbox:", err);
+    }
+  }
+
+  // tell the backend we have read the conversation up to the given message, then refresh the inbox 
+  async function markRead(username, upToMsgId) {
+    try {
+      await fetch("https://localhost:5000/api/messages/read", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        credentials: "include",
+        body: JSON.stringify({ otherUsername: username, upToMsgId }),
+      });
+    } catch (err) {
+      console.error("Error marking messages read:", err);
+    }
+    loadInbox();
+  }
+
+  // once logged in, load the inbox 
+  useEffect(() => {
+    if (currentUser) loadInbox();
+  }, [currentUser]);
+
+  // once logged in, listen for new messages pushed by the backend instead of polling 
+  useEffect(() => {
+    if (!currentUser) return;
+
+    // the browser reconnects on its own and sends Last-Event-ID so missed messages are replayed
+    const stream = new EventSource("https://localhost:5000/api/messages/stream", {
+      withCredentials: true,
+    });
+
+    stream.addEventListener("message", (event) => {
+      const message = JSON.parse(event.data);
+      const other = threadUsernameRef.current;
+
+      // only messages from the person in the open conversation are shown here;
+      // our own messages are added by handleSendMessage
+      if (message.isMine || !other || message.senderUsername !== other) {
+        loadInbox();
+        return;
+      }
+
+      setMessages((prev) =>
+        prev.some((m) => m.msgId === message.msgId) ? prev : [...prev, message]
+      );
+      // the conversation is open, so the new message has been seen 
+      markRead(other, message.msgId);
+    });
+
+    return () => stream.close();
+  }, [currentUser]);
+
   //load the conversation with the other user by username 
-  async function handleLoadThread(e) {
+  function handleLoadThread(e) {
     // prevent from reloading the page 
     e.preventDefault();
+    loadThread(otherUsername.trim());
+  }
+
+  //open a conversation from the inbox 
+  function handleOpenConversation(username) {
+    setOtherUsername(username);
+    loadThread(username);
+  }
+
+  async function loadThread(username) {
     //reset errors and clear current messages 
     setThreadError("");
     setMessages([]);
+    setHasOlder(false);
+    threadUsernameRef.current = "";
 
     //they must enter the other username 
-    if (!otherUsername.trim()) {
+    if (!username) {
       setThreadError("Please enter a username.");
       return;
     }
@@ -71,7 +161,8 @@ export default function Messages() {
     try {
         // build the URL 
       const url = new URL("https://localhost:5000/api/messages/thread");
-      url.searchParams.set("otherUsername", otherUsername.trim());
+      url.searchParams.set("otherUsername", username);
+      url.searchParams.set("limit", THREAD_PAGE_SIZE);
 
       // GET the thread for these two users 
       const response = await fetch(url.toString(), {
@@ -87,8 +178,15 @@ export default function Messages() {
         setThreadError(data.error || "Could not load messages.");
         setMessages([]);
       } else {
-        //otherwise save the array of messages 
+        //otherwise save the array of messages (the latest page, oldest first)
+        threadUsernameRef.current = username;
         setMessages(data);
+        setHasOlder(data.length === THREAD_PAGE_SIZE);
+
+        // everything up to the newest message is now read 
+        if (data.length > 0) {
+          markRead(username, data[data.length - 1].msgId);
+        }
       }
     } catch (err) {
         //network error
@@ -100,6 +198,38 @@ export default function Messages() {
     }
   }
 
+  //load the page of messages just before the oldest one we have 
+  async function handleLoadOlder() {
+    if (messages.length === 0) return;
+    setThreadError("");
+    setLoadingThread(true);
+    try {
+      const url = new URL("https://localhost:5000/api/messages/thread");
+      url.searchParams.set("otherUsername", otherUsername.trim());
+      url.searchParams.set("before", messages[0].msgId);
+      url.searchParams.set("limit", THREAD_PAGE_SIZE);
+
+      const response = await fetch(url.toString(), {
+        method: "GET",
+        credentials: "include",
+      });
+      const data = await response.json();
+
+      if (!response.ok) {
+        setThreadError(data.error || "Could not load messages.");
+      } else {
+        // older messages go in front of the ones already shown
+        setMessages((prev) => [...data, ...prev]);
+        setHasOlder(data.length === THREAD_PAGE_SIZE);
+      }
+    } catch (err) {
+      console.error("Error loading older messages:", err);
+      setThreadError("Network error while loading messages.");
+    } finally {
+      setLoadingThread(false);
+    }
+  }
+
   //send a new message to the other user 
   async function handleSendMessage(e) {
     e.preventDefault();
@@ -146,11 +276,15 @@ export default function Messages() {
         // Show the success message and clear the message box 
         setSendSuccess("Message sent.");
         setMessageText("");
+        loadInbox();
 
-        // refresh the thread so the new message shows up
+        // fetch only the messages newer than the last one shown, so the new message shows up
         try {
           const url = new URL("https://localhost:5000/api/messages/thread");
           url.searchParams.set("otherUsername", otherUsername.trim());
+          if (messages.length > 0) {
+            url.searchParams.set("sinceMsgId", messages[messages.length - 1].msgId);
+          }
 
           const threadResp = await fetch(url.toString(), {
             method: "GET",
@@ -161,8 +295,16 @@ export default function Messages() {
           if (!threadResp.ok) {
             setThreadError(threadData.error || "Could not load messages.");
             setMessages([]);
+          } else if (messages.length > 0) {
+            // skip anything the message stream already added
+            setMessages((prev) => [
+              ...prev,
+              ...threadData.filter((m) => !prev.some((p) => p.msgId === m.msgId)),
+            ]);
           } else {
+            threadUsernameRef.current = otherUsername.trim();
             setMessages(threadData);
+            setHasOlder(threadData.length === THREAD_PAGE_SIZE);
           }
         } catch (err2) {
           console.error("Error reloading messages thread:", err2);
@@ -217,6 +359,38 @@ export default function Messages() {
         messages.
       </p>
 
+      {/* Inbox: recent conversations with unread counts */}
+      <h3>
+        Inbox{unreadCount > 0 && ` (${unreadCount} unread)`}
+      </h3>
+      {conversations.length === 0 ? (
+        <p style={{ color: "#666" }}>No conversations yet.</p>
+      ) : (
+        <ul style={{ listStyle: "none", padding: 0, maxWidth: "620px" }}>
+          {conversations.map((c) => (
+            <li key={c.otherUserId} style={{ marginBottom: "0.5rem" }}>
+              <button
+                type="button"
+                onClick={() => handleOpenConversation(c.otherUsername)}
+                style={{
+                  width: "100%",
+                  textAlign: "left",
+                  fontWeight: c.unreadCount > 0 ? "bold" : "normal",
+                }}
+              >
+                {c.displayName} (@{c.otherUsername})
+                {c.unreadCount > 0 && ` - ${c.unreadCount} new`}
+                <br />
+                <span style={{ color: "#666" }}>
+                  {c.lastIsMine ? "You: " : ""}
+                  {c.lastMessage}
+                </span>
+              </button>
+            </li>
+          ))}
+        </ul>
+      )}
+
       {/* Choose who to talk to */}
       <form
         onSubmit={handleLoadThread}
@@ -261,6 +435,16 @@ export default function Messages() {
           background: "#fafafa",
         }}
       >
+        {hasOlder && (
+          <button
+            type="button"
+            onClick={handleLoadOlder}
+            disabled={loadingThread}
+            style={{ marginBottom: "0.75rem" }}
+          >
+            {loadingThread ? "Loading..." : "Load older messages"}
+          </button>
+        )}
         {messages.length === 0 ? (
           <p style={{ color: "#666" }}>No messages to show yet.</p>
         ) : (
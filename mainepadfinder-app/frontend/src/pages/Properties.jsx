@@ -1,7 +1,7 @@
 // Title: mainepadfinder-app/frontend/src/pages/Properties.jsx
 // Author: Sophia Priola
 // Properties page allows users to filter and browse rental properties in Maine 
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
 
 // I only want to show 10 properties per page 
@@ -14,13 +14,50 @@ export default function Properties() {
   const [maxRent, setMaxRent] = useState("");
   const [minBeds, setMinBeds] = useState("");
   const [minBaths, setMinBaths] = useState("");
+  const [citySuggestions, setCitySuggestions] = useState([]); // typeahead suggestions for the city box
 
   const [properties, setProperties] = useState([]); // this holds the property data coming from the backend 
   const [page, setPage] = useState(1); //current number of pages 
+  // the backend sends results a page at a time, nextCursor asks it for the rows after the ones we have
+  const [nextCursor, setNextCursor] = useState(null);
+  const [lastSearch, setLastSearch] = useState(null); // the filters used for the results we are showing
   // loads the error state  
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
 
+  // ask the backend for city names starting with what the user has typed so far
+  useEffect(() => {
+    const prefix = city.trim();
+    if (!prefix) {
+      setCitySuggestions([]);
+      return;
+    }
+
+    const controller = new AbortController();
+    const url = new URL("https://localhost:5000/api/cities/suggest");
+    url.searchParams.set("prefix", prefix);
+
+    fetch(url, { credentials: "include", signal: controller.signal })
+      .then((response) => (response.ok ? response.json() : []))
+      .then(setCitySuggestions)
+      .catch(() => {}); // suggestions are optional, ignore errors and aborted requests
+
+    return () => controller.abort();
+  }, [city]);
+
+  // Helper: POST a search to the backend, returns the parsed response
+  async function requestProperties(body) {
+    const response = await fetch("https://localhost:5000/api/properties", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      credentials: "include",
+      body: JSON.stringify(body),
+    });
+    return { response, data: await response.json() };
+  }
+
   // Helper: call backend with either filters or no filters
   async function fetchProperties({ useFilters }) {
     setLoading(true);
@@ -45,33 +82,28 @@ export default function Properties() {
     }
 
     try {
-      //call the backend endpoint to get the property data 
-      const response = await fetch("https://localhost:5000/api/properties", {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        credentials: "include",
-        body: JSON.stringify(body),
-      });
-      // parse the JSON response 
-      const data = await response.json();
+      //call the backend endpoint to get the first page of property data 
+      const { response, data } = await requestProperties(body);
 
       // if the response is not ok we show the error message and clear the data 
       if (!response.ok) {
         setError(data.error || `Request failed with status ${response.status}`);
         setProperties([]);
+        setNextCursor(null);
         setPage(1);
         return;
       }
 
       // if everything is ok we store the properties and reset to the first page 
-      setProperties(data);
+      setProperties(data.properties);
+      setNextCursor(data.nextCursor);
+      setLastSearch(body);
       setPage(1); // reset to first page on new search
     } catch (err) {
       console.error("Error loading properties:", err);
       setError("Could not load properties (network error).");
       setProperties([]);
+      setNextCursor(null);
       setPage(1);
     } finally {
       //turn off the loading at the end 
@@ -106,18 +138,14 @@ export default function Properties() {
 
     try {
       // call the special endpoint that uses the BEST_DEAL_PROPERTIES view
+      // (a GET, so the browser can reuse its copy while the server answers 304 Not Modified)
+      const params = new URLSearchParams();
+      // use current city if provided, otherwise all cities
+      if (city.trim()) params.set("city", city.trim());
       const response = await fetch(
-        "https://localhost:5000/api/properties/deals",
+        `https://localhost:5000/api/properties/deals?${params}`,
         {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-          },
           credentials: "include",
-          body: JSON.stringify({
-            // use current city if provided, otherwise null = all cities
-            city: city.trim() || null,
-          }),
         }
       );
 
@@ -132,6 +160,7 @@ export default function Properties() {
 
       // show the "deal" properties instead of normal search results
       setProperties(data);
+      setNextCursor(null);
       setPage(1);
     } catch (err) {
       console.error("Error loading best deals:", err);
@@ -156,8 +185,36 @@ export default function Properties() {
   };
 
   // go to next page if there are more pags 
-  const handleNextPage = () => {
-    if (page < totalPages) setPage((p) => p + 1);
+  // when we reach the end of what we have loaded, ask the backend for the next batch
+  const handleNextPage = async () => {
+    if (page < totalPages) {
+      setPage((p) => p + 1);
+      return;
+    }
+    if (!nextCursor || !lastSearch) return;
+
+    setLoading(true);
+    setError("");
+    try {
+      const { response, data } = await requestProperties({
+        ...lastSearch,
+        cursor: nextCursor,
+      });
+
+      if (!response.ok) {
+        setError(data.error || `Request failed with status ${response.status}`);
+        return;
+      }
+
+      setProperties((prev) => [...prev, ...data.properties]);
+      setNextCursor(data.nextCursor);
+      setPage((p) => p + 1);
+    } catch (err) {
+      console.error("Error loading more properties:", err);
+      setError("Could not load more properties (network error).");
+    } finally {
+      setLoading(false);
+    }
   };
 
   // helper: interpret availability (0 = available, 1 = not)
@@ -226,7 +283,13 @@ export default function Properties() {
             placeholder="e.g., Portland"
             value={city}
             onChange={(e) => setCity(e.target.value)}
+            list="city-suggestions"
           />
+          <datalist id="city-suggestions">
+            {citySuggestions.map((name) => (
+              <option key={name} value={name} />
+            ))}
+          </datalist>
         </div>
 
         <div style={{ display: "flex", flexDirection: "column" }}>
@@ -323,7 +386,7 @@ export default function Properties() {
               <strong>
                 {startIndex + 1}–{Math.min(startIndex + PAGE_SIZE, totalResults)}
               </strong>{" "}
-              of <strong>{totalResults}</strong> properties (page{" "}
+              of <strong>{totalResults}{nextCursor ? "+" : ""}</strong> properties (page{" "}
               <strong>{page}</strong> of <strong>{totalPages}</strong>)
             </>
           )}
@@ -338,7 +401,7 @@ export default function Properties() {
           </button>
           <button
             onClick={handleNextPage}
-            disabled={page >= totalPages || totalResults === 0}
+            disabled={(page >= totalPages && !nextCursor) || totalResults === 0 || loading}
           >
             Next
           </button>